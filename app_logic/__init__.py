@@ -1,4 +1,12 @@
 # Make the app_logic directory a Python package
-from .monitor import WindowMonitor
+# WindowMonitor is imported on first use so that importing a submodule
+# (e.g. app_logic.metrics) does not pull in the platform window libraries.
 
 __all__ = ['WindowMonitor']
+
+
+def __getattr__(name):
+    if name == 'WindowMonitor':
+        from .monitor import WindowMonitor
+        return WindowMonitor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,5 @@
+# Headless entry point: python -m app_logic --task "..."
+from app_logic.daemon import main
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,474 @@
+# File: app_logic/backends.py
+import abc
+import json
+import time
+import logging
+import threading
+import urllib.error
+import urllib.request
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import config_manager
+from app_logic.metrics import increment, span
+from app_logic.ratelimit import Backoff, TokenBucket, parse_retry_after
+
+DEFAULT_TIMEOUT_SECONDS = 10.0
+DEFAULT_HEDGE_PERCENTILE = 0.9
+# Latency samples kept per backend for the hedge delay
+LATENCY_WINDOW = 50
+# Hedge delay before enough samples exist, as a fraction of the backend timeout
+COLD_HEDGE_FRACTION = 0.5
+MIN_LATENCY_SAMPLES = 5
+# How long a request may wait for quota (rate limit or backoff) before it is dropped
+DEFAULT_MAX_WAIT_SECONDS = 30.0
+
+
+class BackendError(Exception):
+    """
+    A classifier backend failed to produce an answer. status is the HTTP status
+    when known; retry_after is the server's hint (seconds) for when to retry.
+    """
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def throttled(self):
+        """Quota or server overload: back off rather than count towards the circuit breaker."""
+        return self.status == 429 or (self.status is not None and self.status >= 500)
+
+
+class ClassifierBackend(abc.ABC):
+    """A text model that answers relevance prompts."""
+
+    name = "backend"
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT_SECONDS, requests_per_minute=0):
+        self.timeout = timeout
+        # Client-side rate limit (0: unlimited)
+        self.requests_per_minute = requests_per_minute
+
+    def is_configured(self):
+        return True
+
+    @abc.abstractmethod
+    def generate_text(self, prompt, system=None, max_output_tokens=None, stop_when=None):
+        """
+        Return the stripped response text; raise BackendError (or any exception)
+        on failure. system is the system instruction, max_output_tokens caps the
+        answer, and a streaming backend may stop reading once stop_when(text so far)
+        is True.
+        """
+
+
+class GeminiBackend(ClassifierBackend):
+    """Google Gemini through the shared GeminiClient."""
+
+    name = "gemini"
+
+    def is_configured(self):
+        from app_logic.task_checker import get_client
+        return get_client().get_model() is not None
+
+    def generate_text(self, prompt, system=None, max_output_tokens=None, stop_when=None):
+        from app_logic.task_checker import get_client
+        try:
+            result = get_client().generate_text(prompt, timeout=self.timeout, system_instruction=system,
+                                                max_output_tokens=max_output_tokens, stop_when=stop_when)
+        except Exception as e:
+            # google.api_core errors carry the HTTP status as .code
+            status = getattr(e, "code", None)
+            if isinstance(status, int) and not isinstance(status, bool):
+                raise BackendError(f"Gemini: {e}", status=status, retry_after=_gemini_retry_delay(e)) from e
+            raise
+        if result is None:
+            raise BackendError("No Gemini API key configured")
+        return result
+
+
+def _gemini_retry_delay(error):
+    """The RetryInfo delay from a Gemini error, else its Retry-After header, else None."""
+    for detail in getattr(error, "details", None) or ():
+        if isinstance(detail, dict):
+            delay = parse_retry_after(detail.get("retryDelay"))
+        else:
+            retry_delay = getattr(detail, "retry_delay", None)
+            delay = retry_delay.seconds + retry_delay.nanos / 1e9 if retry_delay is not None else None
+        if delay is not None:
+            return delay
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    return parse_retry_after(headers.get("Retry-After")) if headers else None
+
+
+class OpenAICompatibleBackend(ClassifierBackend):
+    """
+    A local or self-hosted model behind an OpenAI-compatible chat completions
+    endpoint (llama.cpp server, Ollama, vLLM, LM Studio, ...).
+    """
+
+    name = "local"
+
+    def __init__(self, base_url, model, api_key=None, timeout=DEFAULT_TIMEOUT_SECONDS, requests_per_minute=0):
+        super().__init__(timeout, requests_per_minute)
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+
+    def is_configured(self):
+        return bool(self.base_url)
+
+    def generate_text(self, prompt, system=None, max_output_tokens=None, stop_when=None):
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": prompt})
+        request_body = {"model": self.model, "messages": messages, "temperature": 0}
+        if max_output_tokens:
+            request_body["max_tokens"] = max_output_tokens
+        body = json.dumps(request_body).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(f"{self.base_url}/chat/completions", data=body, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.load(response)
+        except urllib.error.HTTPError as e:
+            raise BackendError(f"{self.base_url}: {e}", status=e.code,
+                               retry_after=parse_retry_after(e.headers.get("Retry-After"))) from e
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise BackendError(f"{self.base_url}: {e}") from e
+        try:
+            return payload["choices"][0]["message"]["content"].strip()
+        except (KeyError, IndexError, TypeError, AttributeError) as e:
+            raise BackendError(f"Unexpected response from {self.base_url}: {payload!r}") from e
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a backend after consecutive failures.
+    Closed -> open after failure_threshold failures; after reset_seconds one
+    trial request is let through (half-open); success closes it again.
+    """
+
+    def __init__(self, failure_threshold=3, reset_seconds=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if self.clock() - self._opened_at >= self.reset_seconds else "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self.clock() - self._opened_at < self.reset_seconds or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+
+
+class _BackendState:
+    """A backend with its circuit breaker, rate limit, backoff and recent latencies."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.breaker = CircuitBreaker()
+        self.bucket = TokenBucket(backend.requests_per_minute) if backend.requests_per_minute else None
+        self.backoff = Backoff()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Claim the right to send one request now. Returns "ok", "throttled"
+        (backing off or out of rate-limit tokens) or "open" (circuit breaker).
+        """
+        if self.backoff.available_at() > time.monotonic():
+            return "throttled"
+        if self.bucket is not None and not self.bucket.try_acquire():
+            return "throttled"
+        if not self.breaker.allow():
+            if self.bucket is not None:
+                self.bucket.refund()
+            return "open"
+        return "ok"
+
+    def available_at(self):
+        """Monotonic time at which quota allows the next request."""
+        ready = self.backoff.available_at()
+        if self.bucket is not None:
+            ready = max(ready, self.bucket.available_at())
+        return ready
+
+    def record_latency(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def hedge_delay(self, percentile):
+        """How long to wait for this backend before hedging to the next one."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return self.backend.timeout * COLD_HEDGE_FRACTION
+        return samples[min(len(samples) - 1, int(percentile * len(samples)))]
+
+
+class BackendRouter:
+    """
+    Sends a prompt to the first healthy backend. If it hasn't answered by its
+    hedge_percentile latency, the next healthy backend is asked too and the
+    first answer wins; a backend that fails hands over immediately. Backends
+    whose circuit breaker is open are skipped. Total wait is bounded by the
+    slowest backend timeout.
+
+    Quota: each backend has an optional token-bucket rate limit and backs off
+    (exponentially with jitter, or as told by retry-after) after 429/5xx
+    responses. When every backend is throttled the request waits for quota,
+    up to max_wait_seconds, instead of failing. Identical prompts already in
+    flight share one request.
+    """
+
+    def __init__(self, backends, hedge_percentile=DEFAULT_HEDGE_PERCENTILE, max_wait_seconds=DEFAULT_MAX_WAIT_SECONDS):
+        self.states = [_BackendState(backend) for backend in backends]
+        self.hedge_percentile = hedge_percentile
+        self.max_wait_seconds = max_wait_seconds
+        # Room for abandoned (timed-out or out-hedged) calls still running alongside new ones
+        self._executor = ThreadPoolExecutor(max_workers=4 * max(1, len(self.states)),
+                                            thread_name_prefix="keymind-backend")
+        self._lock = threading.Lock()
+        self._in_flight = {}  # (system, prompt, max_output_tokens) -> Future shared by identical requests
+
+        self.coalesced = 0
+        self.throttled = 0
+        self.dropped = 0
+
+    def _call(self, state, prompt, options):
+        start = time.perf_counter()
+        try:
+            with span(f"backend:{state.backend.name}"):
+                result = state.backend.generate_text(prompt, **options)
+        except BackendError as e:
+            if e.throttled:
+                delay = state.backoff.failure(e.retry_after)
+                increment(f"backend_{state.backend.name}_backoffs")
+                logging.warning(f"Classifier backend {state.backend.name} throttled (HTTP {e.status}), "
+                                f"backing off {delay:.1f}s")
+                if e.status == 429:
+                    # Over quota is not a sign of an unhealthy backend
+                    raise
+            state.breaker.record_failure()
+            increment(f"backend_{state.backend.name}_failures")
+            raise
+        except Exception:
+            state.breaker.record_failure()
+            increment(f"backend_{state.backend.name}_failures")
+            raise
+        state.record_latency(time.perf_counter() - start)
+        state.breaker.record_success()
+        state.backoff.success()
+        return result
+
+    def generate_text(self, prompt, system=None, max_output_tokens=None, stop_when=None):
+        """
+        Return the first successful answer, or None if no backend answered in time.
+        Options are passed on to ClassifierBackend.generate_text.
+        """
+        options = {"system": system, "max_output_tokens": max_output_tokens, "stop_when": stop_when}
+        key = (system, prompt, max_output_tokens)
+        with self._lock:
+            shared = self._in_flight.get(key)
+            owner = shared is None
+            if owner:
+                shared = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            increment("ai_coalesced")
+            return shared.result()
+
+        result = None
+        try:
+            result = self._generate(prompt, options)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            shared.set_result(result)
+        return result
+
+    def _generate(self, prompt, options):
+        candidates = [s for s in self.states if s.backend.is_configured()]
+        if not candidates:
+            logging.error("No classifier backend configured")
+            return None
+
+        queue_deadline = time.monotonic() + self.max_wait_seconds
+        while True:
+            result, throttled = self._attempt(prompt, options, candidates)
+            if result is not None or not throttled:
+                return result
+            # Every usable backend is out of quota: wait for the first one to recover
+            ready_at = min(s.available_at() for s in candidates)
+            if ready_at > queue_deadline:
+                with self._lock:
+                    self.dropped += 1
+                increment("ai_dropped")
+                logging.error("Classifier request dropped: no backend has quota left within "
+                              f"{self.max_wait_seconds:.0f}s")
+                return None
+            with self._lock:
+                self.throttled += 1
+            increment("ai_throttled")
+            time.sleep(max(0.0, ready_at - time.monotonic()))
+
+    def _attempt(self, prompt, options, candidates):
+        """
+        One hedged pass over the candidates. Returns (answer, throttled):
+        throttled is True when no answer came back and a backend was skipped or
+        refused for lack of quota, so waiting and retrying may succeed.
+        """
+        deadline = time.monotonic() + max(s.backend.timeout for s in candidates)
+        pending = {}
+        remaining = iter(candidates)
+        throttled = False
+
+        def launch_next():
+            nonlocal throttled
+            for state in remaining:
+                status = state.acquire()
+                if status == "ok":
+                    pending[self._executor.submit(self._call, state, prompt, options)] = state
+                    return state
+                if status == "throttled":
+                    throttled = True
+                    increment(f"backend_{state.backend.name}_throttled")
+            return None
+
+        current = launch_next()
+        if current is None:
+            if not throttled:
+                logging.error("All classifier backends are unavailable (circuit open)")
+            return None, throttled
+        hedge_at = self._hedge_at(current)
+
+        while pending:
+            timeout = max(0.0, min(hedge_at, deadline) - time.monotonic())
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            failed = False
+            for future in done:
+                state = pending.pop(future)
+                try:
+                    result = future.result()
+                except BackendError as e:
+                    logging.error(f"Classifier backend {state.backend.name} failed: {e}")
+                    throttled = throttled or e.throttled
+                    failed = True
+                    continue
+                except Exception as e:
+                    logging.error(f"Classifier backend {state.backend.name} failed: {e}")
+                    failed = True
+                    continue
+                increment(f"backend_{state.backend.name}_answers")
+                return result, False
+
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if failed or now >= hedge_at:
+                # Fail over (a backend errored) or hedge (the current one is slower than usual)
+                following = launch_next()
+                if following is not None and not failed:
+                    increment("backend_hedges")
+                hedge_at = self._hedge_at(following) if following is not None else float("inf")
+
+        for state in pending.values():
+            logging.error(f"Classifier backend {state.backend.name} timed out")
+        # Timed out requests are not retried: the caller's verdict would arrive too late
+        return None, throttled and not pending
+
+    def _hedge_at(self, state):
+        if not self.hedge_percentile:
+            return float("inf")
+        return time.monotonic() + state.hedge_delay(self.hedge_percentile)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            totals = {"coalesced": self.coalesced, "throttled": self.throttled, "dropped": self.dropped}
+        totals["backends"] = {
+            state.backend.name: {"breaker": state.breaker.state,
+                                 "hedge_delay": state.hedge_delay(self.hedge_percentile or 1.0),
+                                 "quota_wait": max(0.0, state.available_at() - now)}
+            for state in self.states}
+        return totals
+
+
+def build_backends(settings):
+    """Create the backends named in settings['classifier_backends'], in preference order."""
+    backends = []
+    for name in settings.get("classifier_backends", ["gemini"]):
+        if name == "gemini":
+            backends.append(GeminiBackend(timeout=settings.get("gemini_timeout_seconds", DEFAULT_TIMEOUT_SECONDS),
+                                          requests_per_minute=settings.get("gemini_requests_per_minute", 0)))
+        elif name == "local":
+            url = settings.get("local_model_url", "")
+            if url:
+                backends.append(OpenAICompatibleBackend(
+                    url, settings.get("local_model_name", ""), settings.get("local_model_api_key", ""),
+                    timeout=settings.get("local_model_timeout_seconds", DEFAULT_TIMEOUT_SECONDS),
+                    requests_per_minute=settings.get("local_model_requests_per_minute", 0)))
+        else:
+            print(f"Ignoring unknown classifier backend {name!r}")
+    return backends
+
+
+_BACKEND_SETTINGS = ("classifier_backends", "gemini_timeout_seconds", "local_model_url", "local_model_name",
+                     "local_model_api_key", "local_model_timeout_seconds", "hedge_percentile",
+                     "gemini_requests_per_minute", "local_model_requests_per_minute", "rate_limit_max_wait_seconds")
+
+_router = None
+_router_config = None
+_router_lock = threading.Lock()
+
+
+def get_router(settings=None):
+    """Return the shared router, rebuilt only when the backend settings change."""
+    global _router, _router_config
+    settings = config_manager.get_settings() if settings is None else settings
+    config = tuple(repr(settings.get(key)) for key in _BACKEND_SETTINGS)
+    with _router_lock:
+        if _router is None or config != _router_config:
+            if _router is not None:
+                _router.close()
+            _router = BackendRouter(build_backends(settings),
+                                    hedge_percentile=settings.get("hedge_percentile", DEFAULT_HEDGE_PERCENTILE),
+                                    max_wait_seconds=settings.get("rate_limit_max_wait_seconds",
+                                                                  DEFAULT_MAX_WAIT_SECONDS))
+            _router_config = config
+        return _router
@@ -0,0 +1,208 @@
+# File: app_logic/batching.py
+import logging
+import threading
+import time
+
+from app_logic.verdict_cache import make_key
+
+DEFAULT_WINDOW_SECONDS = 0.25
+DEFAULT_MAX_BATCH = 8
+DEFAULT_MAX_WORKERS = 2
+
+
+class _Lookup:
+    """A pending or in-flight classification and everyone waiting on it."""
+
+    __slots__ = ("task", "activity", "waiters", "low_priority")
+
+    def __init__(self, task, activity, low_priority=False):
+        self.task = task
+        self.activity = activity
+        self.waiters = []  # (callback, is_current) pairs
+        self.low_priority = low_priority
+
+
+class RelevanceBatcher:
+    """
+    Bounded classification queue shared by all relevance lookups.
+    - Lookups arriving within a short window are coalesced into batched model
+      requests (one request per task per flush)
+    - At most max_workers requests run at once, however fast windows change
+    - Identical lookups that are pending or already in flight share one request
+    - Lookups whose is_current() turns False before dispatch are cancelled
+      without being sent
+    - Low-priority lookups (e.g. prewarming) ride along in foreground batches
+      for the same task, and otherwise use at most one worker at a time
+    Callbacks are invoked on a worker thread. Callers are expected to have
+    missed the verdict cache already; batches skip the cache lookup.
+    """
+
+    def __init__(self, classify_batch=None, window_seconds=DEFAULT_WINDOW_SECONDS,
+                 max_batch=DEFAULT_MAX_BATCH, max_workers=DEFAULT_MAX_WORKERS):
+        if classify_batch is None:
+            from app_logic.task_checker import check_relevance_batch
+
+            def classify_batch(task, activities):
+                return check_relevance_batch(task, activities, cache_lookup=False)
+        self.classify_batch = classify_batch
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self.max_workers = max_workers
+
+        self._cond = threading.Condition()
+        # (task key, activity key) -> _Lookup, in arrival order
+        self._pending = {}
+        self._in_flight = {}
+        self._first_pending_at = None
+        self._workers = []
+        self._low_in_flight = 0
+
+        self.requests_submitted = 0
+        self.deduplicated = 0
+        self.cancelled = 0
+        self.batches_sent = 0
+
+    def submit(self, task, activity, callback, is_current=None, low_priority=False):
+        """
+        Queue a lookup; callback(verdict) fires once its batch has been classified.
+        If is_current is given and returns False by dispatch time, the lookup is
+        dropped and callback is never called.
+        """
+        key = make_key(task, activity)
+        waiter = (callback, is_current)
+        with self._cond:
+            self.requests_submitted += 1
+            lookup = self._in_flight.get(key) or self._pending.get(key)
+            if lookup is not None:
+                lookup.waiters.append(waiter)
+                lookup.low_priority = lookup.low_priority and low_priority
+                self.deduplicated += 1
+                self._cond.notify_all()
+                return
+            lookup = _Lookup(task, activity, low_priority)
+            lookup.waiters.append(waiter)
+            self._pending[key] = lookup
+            if self._first_pending_at is None:
+                self._first_pending_at = time.monotonic()
+            self._ensure_workers()
+            self._cond.notify_all()
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _ensure_workers(self):
+        self._workers = [w for w in self._workers if w.is_alive()]
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._run, name=f"keymind-classifier-{len(self._workers)}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    @staticmethod
+    def _is_wanted(waiter):
+        is_current = waiter[1]
+        if is_current is None:
+            return True
+        try:
+            return bool(is_current())
+        except Exception:
+            return False
+
+    def _drop_stale(self):
+        """Cancel pending lookups that nobody is waiting on any more."""
+        for key in list(self._pending):
+            lookup = self._pending[key]
+            lookup.waiters = [w for w in lookup.waiters if self._is_wanted(w)]
+            if not lookup.waiters:
+                del self._pending[key]
+                self.cancelled += 1
+
+    def _take_batch(self):
+        """Wait for the coalescing window to close, then take up to max_batch lookups for one task."""
+        with self._cond:
+            while True:
+                while not self._pending:
+                    self._cond.wait()
+                # Flush early once a full batch is waiting
+                while self._pending and len(self._pending) < self.max_batch:
+                    remaining = self._first_pending_at + self.window_seconds - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                self._drop_stale()
+                if not self._pending:
+                    self._first_pending_at = None
+                    continue
+
+                foreground = [k for k, lookup in self._pending.items() if not lookup.low_priority]
+                if not foreground and self._low_in_flight:
+                    # Keep the other workers free for foreground lookups
+                    self._cond.wait()
+                    continue
+
+                task_key = (foreground or list(self._pending))[0][0]
+                # Foreground lookups first; low-priority ones for the same task fill the rest
+                keys = sorted((k for k in self._pending if k[0] == task_key),
+                              key=lambda k: self._pending[k].low_priority)[:self.max_batch]
+                batch = []
+                for key in keys:
+                    lookup = self._pending.pop(key)
+                    self._in_flight[key] = lookup
+                    batch.append((key, lookup))
+                self._first_pending_at = time.monotonic() if self._pending else None
+                low_priority = all(lookup.low_priority for _, lookup in batch)
+                if low_priority:
+                    self._low_in_flight += 1
+                return batch, low_priority
+
+    def _run(self):
+        while True:
+            batch, low_priority = self._take_batch()
+            task = batch[0][1].task
+            activities = [lookup.activity for _, lookup in batch]
+            self.batches_sent += 1
+            try:
+                verdicts = self.classify_batch(task, activities)
+            except Exception as e:
+                logging.error(f"Batch classification failed: {e}")
+                verdicts = [None] * len(batch)
+
+            with self._cond:
+                for key, _ in batch:
+                    self._in_flight.pop(key, None)
+                if low_priority:
+                    self._low_in_flight -= 1
+                    self._cond.notify_all()
+
+            for (_, lookup), verdict in zip(batch, verdicts):
+                for callback, _ in lookup.waiters:
+                    try:
+                        callback(verdict)
+                    except Exception as e:
+                        logging.error(f"Relevance callback failed: {e}")
+
+    def stats(self):
+        with self._cond:
+            return {
+                "requests_submitted": self.requests_submitted,
+                "deduplicated": self.deduplicated,
+                "cancelled": self.cancelled,
+                "batches_sent": self.batches_sent,
+                "pending": len(self._pending),
+                "in_flight": len(self._in_flight),
+                "workers": len(self._workers),
+            }
+
+
+_shared_batcher = None
+_shared_lock = threading.Lock()
+
+
+def get_batcher():
+    """Return the process-wide relevance batcher, creating it on first use."""
+    global _shared_batcher
+    with _shared_lock:
+        if _shared_batcher is None:
+            _shared_batcher = RelevanceBatcher()
+        return _shared_batcher
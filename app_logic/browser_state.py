@@ -0,0 +1,449 @@
+# File: app_logic/browser_state.py
+import os
+import sys
+import glob
+import json
+import struct
+import argparse
+import platform
+import threading
+from urllib.parse import urlsplit
+
+from app_logic.canonical import BROWSER_NAMES, SEPARATOR_RE
+
+try:
+    import lz4.block as lz4_block
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+MOZLZ4_MAGIC = b"mozLz40\0"
+SNSS_MAGIC = b"SNSS"
+# Appended to a site so the AI sees "reddit.com (website)" as the activity
+SITE_SUFFIX = " (website)"
+
+# Chromium session commands (components/sessions/core/session_service_commands.cc)
+_CMD_SET_TAB_WINDOW = 0
+_CMD_TAB_NAVIGATION_PATH_PRUNED_FROM_BACK = 5
+_CMD_UPDATE_TAB_NAVIGATION = 6
+_CMD_SET_SELECTED_NAVIGATION_INDEX = 7
+_CMD_TAB_CLOSED = 16
+_CMD_WINDOW_CLOSED = 17
+
+# Host prefixes that name a variant of the same site ("m.youtube.com", "old.reddit.com")
+_SITE_PREFIXES = ("www.", "m.", "mobile.", "old.", "new.", "amp.")
+
+
+def lz4_block_decompress(data, uncompressed_size):
+    """Decompress one raw LZ4 block (uses the lz4 package when installed)."""
+    if LZ4_AVAILABLE:
+        return lz4_block.decompress(data, uncompressed_size=uncompressed_size)
+    out = bytearray()
+    i, n = 0, len(data)
+    while i < n:
+        token = data[i]
+        i += 1
+        literals = token >> 4
+        if literals == 15:
+            while True:
+                extra = data[i]
+                i += 1
+                literals += extra
+                if extra != 255:
+                    break
+        out += data[i:i + literals]
+        i += literals
+        if i >= n:
+            break  # The last sequence has literals only
+        offset = data[i] | (data[i + 1] << 8)
+        i += 2
+        length = token & 15
+        if length == 15:
+            while True:
+                extra = data[i]
+                i += 1
+                length += extra
+                if extra != 255:
+                    break
+        length += 4
+        start = len(out) - offset
+        if offset >= length:
+            out += out[start:start + length]
+        else:
+            # Overlapping match: repeats the last offset bytes
+            for k in range(length):
+                out.append(out[start + k])
+    return bytes(out)
+
+
+def read_mozlz4(path):
+    """Read a Firefox .jsonlz4/.mozlz4 file and return the decompressed bytes."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MOZLZ4_MAGIC):
+        raise ValueError(f"{path} is not a mozlz4 file")
+    size = struct.unpack_from("<I", data, len(MOZLZ4_MAGIC))[0]
+    return lz4_block_decompress(data[len(MOZLZ4_MAGIC) + 4:], size)
+
+
+def site_of(url):
+    """
+    The site a web page URL belongs to, or None for other URLs. Sites are
+    hosts, so services sharing a domain stay apart ("mail.google.com",
+    "docs.google.com"), minus variant prefixes ("www.bbc.co.uk" -> "bbc.co.uk").
+    """
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return None
+    host = parts.hostname.lower().rstrip(".")
+    for prefix in _SITE_PREFIXES:
+        if host.startswith(prefix) and host.count(".") >= 2:
+            return host[len(prefix):]
+    return host
+
+
+def site_key(site):
+    """The activity key under which verdicts for every page of a site are shared."""
+    return f"{site}{SITE_SUFFIX}"
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+class FirefoxSessionSource:
+    """
+    Open tabs of one Firefox profile, from sessionstore-backups/recovery.jsonlz4.
+    Firefox rewrites the whole file (every 15 s by default), so it is re-read
+    only when its inode, mtime or size changed.
+    """
+
+    def __init__(self, profile_dir):
+        self.profile_dir = profile_dir
+        self.path = os.path.join(profile_dir, "sessionstore-backups", "recovery.jsonlz4")
+        self.tabs = []  # (title, url) of each tab's current page
+        self._stamp = None
+
+    def refresh(self):
+        """Re-read the session file if it changed. Returns True if it was re-read."""
+        stamp = _file_stamp(self.path)
+        if stamp is None or stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        try:
+            session = json.loads(read_mozlz4(self.path))
+        except (OSError, ValueError, IndexError, struct.error) as e:
+            # Caught mid-write or corrupt; the next change is tried again
+            print(f"Could not read Firefox session {self.path}: {e}")
+            return False
+        tabs = []
+        for window in session.get("windows", []):
+            for tab in window.get("tabs", []):
+                entries = tab.get("entries") or []
+                if not entries:
+                    continue
+                # "index" is 1-based and points at the page shown in the tab
+                entry = entries[min(max(int(tab.get("index", len(entries))), 1), len(entries)) - 1]
+                if entry.get("url"):
+                    tabs.append((entry.get("title") or "", entry["url"]))
+        self.tabs = tabs
+        return True
+
+
+class ChromiumSessionSource:
+    """
+    Open tabs of one Chromium-family profile (Chrome, Edge, Brave, Opera...),
+    from its SNSS session command log: "Sessions/Session_<time>", or
+    "Current Session" in older versions. The log is append-only, so only the
+    commands added since the last read are parsed; the file is read from the
+    start again when the browser starts a new one.
+    """
+
+    def __init__(self, profile_dir):
+        self.profile_dir = profile_dir
+        self.path = None
+        self._inode = None
+        self._offset = 0
+        self._tabs = {}  # tab id -> {"window", "navigations": {index: (url, title)}, "selected"}
+
+    def _session_file(self):
+        candidates = glob.glob(os.path.join(self.profile_dir, "Sessions", "Session_*"))
+        legacy = os.path.join(self.profile_dir, "Current Session")
+        if os.path.exists(legacy):
+            candidates.append(legacy)
+        try:
+            return max(candidates, key=os.path.getmtime) if candidates else None
+        except OSError:
+            return None
+
+    @property
+    def tabs(self):
+        tabs = []
+        for tab in self._tabs.values():
+            navigation = tab["navigations"].get(tab["selected"])
+            if navigation is None and tab["navigations"]:
+                navigation = tab["navigations"][max(tab["navigations"])]
+            if navigation is not None:
+                tabs.append((navigation[1], navigation[0]))
+        return tabs
+
+    def refresh(self):
+        """Parse commands appended since the last call. Returns True if any were read."""
+        path = self._session_file()
+        if path is None:
+            return False
+        try:
+            st = os.stat(path)
+            if path != self.path or st.st_ino != self._inode or st.st_size < self._offset:
+                self.path, self._inode, self._offset = path, st.st_ino, 0
+                self._tabs = {}
+            if st.st_size == self._offset:
+                return False
+            with open(path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+        except OSError:
+            return False
+
+        position = 0
+        if self._offset == 0:
+            if not data.startswith(SNSS_MAGIC) or len(data) < 8:
+                return False
+            position = 8  # Magic and format version
+        # Stop at a command the browser hasn't finished writing; it is read next time
+        while position + 2 <= len(data):
+            size = struct.unpack_from("<H", data, position)[0]
+            if position + 2 + size > len(data):
+                break
+            if size:
+                self._apply(data[position + 2], data[position + 3:position + 2 + size])
+            position += 2 + size
+        self._offset += position
+        return position > 0
+
+    def _tab(self, tab_id):
+        return self._tabs.setdefault(tab_id, {"window": None, "navigations": {}, "selected": None})
+
+    def _apply(self, command, payload):
+        try:
+            if command == _CMD_UPDATE_TAB_NAVIGATION:
+                tab_id, index, url, title = _parse_navigation(payload)
+                self._tab(tab_id)["navigations"][index] = (url, title)
+            elif command == _CMD_SET_SELECTED_NAVIGATION_INDEX:
+                tab_id, index = struct.unpack_from("<ii", payload)
+                self._tab(tab_id)["selected"] = index
+            elif command == _CMD_TAB_NAVIGATION_PATH_PRUNED_FROM_BACK:
+                tab_id, count = struct.unpack_from("<ii", payload)
+                navigations = self._tab(tab_id)["navigations"]
+                for index in [i for i in navigations if i >= count]:
+                    del navigations[index]
+            elif command == _CMD_SET_TAB_WINDOW:
+                window_id, tab_id = struct.unpack_from("<ii", payload)
+                self._tab(tab_id)["window"] = window_id
+            elif command == _CMD_TAB_CLOSED:
+                self._tabs.pop(struct.unpack_from("<i", payload)[0], None)
+            elif command == _CMD_WINDOW_CLOSED:
+                window_id = struct.unpack_from("<i", payload)[0]
+                for tab_id in [t for t, tab in self._tabs.items() if tab["window"] == window_id]:
+                    del self._tabs[tab_id]
+        except (struct.error, ValueError, UnicodeDecodeError):
+            pass  # Commands from newer or older formats we don't understand
+
+
+def _parse_navigation(payload):
+    """Tab id, navigation index, URL and title from a pickled UpdateTabNavigation payload."""
+    # Pickle: uint32 payload size, then 4-byte aligned fields
+    position = 4
+    tab_id, index, url_length = struct.unpack_from("<iii", payload, position)
+    position += 12
+    url = payload[position:position + url_length].decode("utf-8", "replace")
+    position += (url_length + 3) & ~3
+    title_length = struct.unpack_from("<i", payload, position)[0]
+    position += 4
+    title = payload[position:position + title_length * 2].decode("utf-16-le", "replace")
+    return tab_id, index, url, title
+
+
+def detect_source(profile_dir):
+    """A session source for a browser profile directory, or None if it has no session data."""
+    if os.path.isdir(os.path.join(profile_dir, "sessionstore-backups")):
+        return FirefoxSessionSource(profile_dir)
+    if os.path.isdir(os.path.join(profile_dir, "Sessions")) or \
+            os.path.exists(os.path.join(profile_dir, "Current Session")):
+        return ChromiumSessionSource(profile_dir)
+    return None
+
+
+def _profile_roots():
+    """Browser name -> globs of its profile directories on this platform."""
+    home = os.path.expanduser("~")
+    system = platform.system()
+    if system == "Windows":
+        roaming = os.environ.get("APPDATA", os.path.join(home, "AppData", "Roaming"))
+        local = os.environ.get("LOCALAPPDATA", os.path.join(home, "AppData", "Local"))
+        return {
+            "firefox": [os.path.join(roaming, "Mozilla", "Firefox", "Profiles", "*")],
+            "chrome": [os.path.join(local, "Google", "Chrome", "User Data", "*")],
+            "chromium": [os.path.join(local, "Chromium", "User Data", "*")],
+            "edge": [os.path.join(local, "Microsoft", "Edge", "User Data", "*")],
+            "brave": [os.path.join(local, "BraveSoftware", "Brave-Browser", "User Data", "*")],
+            "opera": [os.path.join(roaming, "Opera Software", "Opera Stable")],
+        }
+    if system == "Darwin":
+        support = os.path.join(home, "Library", "Application Support")
+        return {
+            "firefox": [os.path.join(support, "Firefox", "Profiles", "*")],
+            "chrome": [os.path.join(support, "Google", "Chrome", "*")],
+            "chromium": [os.path.join(support, "Chromium", "*")],
+            "edge": [os.path.join(support, "Microsoft Edge", "*")],
+            "brave": [os.path.join(support, "BraveSoftware", "Brave-Browser", "*")],
+            "opera": [os.path.join(support, "com.operasoftware.Opera")],
+        }
+    config = os.environ.get("XDG_CONFIG_HOME", os.path.join(home, ".config"))
+    return {
+        "firefox": [os.path.join(home, ".mozilla", "firefox", "*"),
+                    os.path.join(home, "snap", "firefox", "common", ".mozilla", "firefox", "*")],
+        "chrome": [os.path.join(config, "google-chrome", "*")],
+        "chromium": [os.path.join(config, "chromium", "*"),
+                     os.path.join(home, "snap", "chromium", "common", "chromium", "*")],
+        "edge": [os.path.join(config, "microsoft-edge", "*")],
+        "brave": [os.path.join(config, "BraveSoftware", "Brave-Browser", "*")],
+        "opera": [os.path.join(config, "opera")],
+    }
+
+
+def find_profile_dirs(browser_names):
+    """Profile directories with session data for the browsers named in settings['browsers']."""
+    roots = _profile_roots()
+    dirs = []
+    for name in browser_names:
+        name = name.strip().lower()
+        for browser, patterns in roots.items():
+            # "google chrome", "firefox", "brave browser"...
+            if browser in name or name in browser:
+                for pattern in patterns:
+                    dirs.extend(d for d in sorted(glob.glob(pattern)) if detect_source(d) is not None)
+    return list(dict.fromkeys(dirs))
+
+
+def _is_browser_name(segment):
+    """True for the browser-name segment of a window title ("Mozilla Firefox", "Google Chrome", "chrome.exe")."""
+    name = segment.strip().lower().removesuffix(".exe")
+    # Firefox adds a mode to its name ("Mozilla Firefox Private Browsing")
+    return any(name == browser or name.startswith(browser + " ") for browser in BROWSER_NAMES)
+
+
+class BrowserSessionReader:
+    """
+    Maps a browser window title to the URL of the tab it shows, using the
+    browsers' own session files. A window title is the page title followed
+    by the browser's name ("Inbox - Gmail - Google Chrome"), so it only maps
+    to a tab with exactly that page title; a tab whose title merely starts
+    the same way ("Gmail") never does. Session files are checked on each
+    lookup but parsed only when they change.
+    """
+
+    def __init__(self, profile_dirs):
+        self.sources = [source for source in map(detect_source, profile_dirs) if source is not None]
+        self._lock = threading.Lock()
+        self._by_title = {}
+
+    def refresh(self):
+        with self._lock:
+            changed = False
+            for source in self.sources:
+                changed = source.refresh() or changed
+            if changed or not self._by_title:
+                by_title = {}
+                for source in self.sources:
+                    for title, url in source.tabs:
+                        if title:
+                            by_title[title] = url
+                self._by_title = by_title
+            return self._by_title
+
+    def url_for_title(self, window_title):
+        """The URL shown in the browser window with this title, or None if it isn't known (yet)."""
+        if not window_title:
+            return None
+        by_title = self.refresh()
+        if window_title in by_title:
+            return by_title[window_title]
+        # Strip browser-name segments from the end ("- Google Chrome", "- chrome.exe"), one at a time
+        for separator in reversed(list(SEPARATOR_RE.finditer(window_title))):
+            if not _is_browser_name(window_title[separator.end():]):
+                break
+            url = by_title.get(window_title[:separator.start()])
+            if url is not None:
+                return url
+            window_title = window_title[:separator.start()]
+        return None
+
+    def tabs(self):
+        """(title, url) of every open tab that has a title."""
+        return list(self.refresh().items())
+
+
+_shared_reader = None
+_shared_config = None
+_shared_lock = threading.Lock()
+
+
+def get_browser_state(settings):
+    """
+    The shared reader for the browsers in settings['browsers'], or None if
+    URL lookups are disabled or none of them has session data.
+    """
+    global _shared_reader, _shared_config
+    config = (bool(settings.get("browser_session_urls", True)), tuple(settings.get("browsers", ())))
+    with _shared_lock:
+        if config != _shared_config:
+            _shared_config = config
+            enabled, browsers = config
+            dirs = find_profile_dirs(browsers) if enabled and browsers else []
+            _shared_reader = BrowserSessionReader(dirs) if dirs else None
+        return _shared_reader
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the open tabs KeyMind reads from browser session files.")
+    parser.add_argument("--profile", action="append", default=[],
+                        help="browser profile directory (repeatable; default: those of the configured browsers)")
+    parser.add_argument("--title", help="look up the URL and site for this window title")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args(argv)
+
+    profile_dirs = args.profile
+    if not profile_dirs:
+        import config_manager
+        profile_dirs = find_profile_dirs(config_manager.load_settings().get("browsers", []))
+    reader = BrowserSessionReader(profile_dirs)
+    if not reader.sources:
+        print("No browser session data found")
+        return 1
+
+    if args.title:
+        url = reader.url_for_title(args.title)
+        site = site_of(url) if url else None
+        result = {"title": args.title, "url": url, "site": site}
+        print(json.dumps(result, indent=4) if args.json else f"{url or 'unknown'} ({site or 'no site'})")
+        return 0 if url else 1
+
+    tabs = reader.tabs()
+    if args.json:
+        print(json.dumps([{"title": title, "url": url, "site": site_of(url)} for title, url in tabs], indent=4))
+    else:
+        for title, url in tabs:
+            print(f"{site_of(url) or '-':<24} {title}\n{'':<24} {url}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
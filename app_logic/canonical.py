@@ -0,0 +1,96 @@
+# File: app_logic/canonical.py
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Title segment separators: "Page - Site - Browser", "Page — Mozilla Firefox", "Page | Site"
+SEPARATOR_RE = re.compile(r"\s+[-–—|]\s+")
+JOINER = " - "
+
+# Volatile fragments that change without the activity changing
+_VOLATILE_PATTERNS = [
+    # Media progress: "(1:23 / 4:56)", "1:23:45 / 2:00:00"
+    r"\(?\b\d{1,2}:\d{2}(?::\d{2})?\s*/\s*\d{1,2}:\d{2}(?::\d{2})?\b\)?",
+    # Clocks and timers: "12:03", "9:41 AM", "00:12:59"
+    r"\b\d{1,2}:\d{2}(?::\d{2})?(?:\s?[AaPp]\.?[Mm]\.?)?\b",
+    # Notification counters at the start of a title or before a separator: "(3) Inbox", "Slack (12)"
+    r"^\s*[\(\[]\d+\+?[\)\]]",
+    r"\s[\(\[]\d+\+?[\)\]](?=\s+[-–—|]\s|\s*$)",
+    # Unsaved markers: "*main.py", "● main.py", "main.py •", "notes.txt *"
+    r"^\s*[*●•]+\s*",
+    r"\s*[*●•]+\s*$",
+    r"\s*[*●•]+(?=\s+[-–—|]\s)",
+    r"\s[\(\[](?:modified|unsaved|edited)[\)\]]",
+    # Progress percentages and playback/audio indicators
+    r"\b\d{1,3}(?:\.\d+)?\s?%",
+    r"[▶⏵⏸⏯\U0001f50a\U0001f507\U0001f508\U0001f509]",
+]
+_VOLATILE_RE = re.compile("|".join(f"(?:{p})" for p in _VOLATILE_PATTERNS), re.IGNORECASE)
+
+# Segments that only mark state ("Document - Edited" on macOS)
+_STATE_SEGMENTS = frozenset(("edited", "modified", "unsaved", "not responding"))
+
+BROWSER_NAMES = frozenset((
+    "google chrome", "chrome", "chromium", "mozilla firefox", "firefox", "microsoft edge", "edge",
+    "brave", "opera", "safari", "vivaldi", "arc",
+))
+
+# A per-app rule: applies(segments, process_name) -> bool, transform(segments) -> segments
+TitleRule = namedtuple("TitleRule", ["name", "applies", "transform"])
+
+_rules = []
+
+
+def register_rule(name, applies, transform):
+    """
+    Add a per-app canonicalization rule. Rules run in registration order on the
+    title split into segments (volatile fragments already removed); a rule
+    registered under an existing name replaces it.
+    """
+    global _rules
+    rule = TitleRule(name, applies, transform)
+    _rules = [r for r in _rules if r.name != name] + [rule]
+    canonicalize.cache_clear()
+    return rule
+
+
+def _is_browser(segments, process_name):
+    if process_name and process_name.lower().removesuffix(".exe") in BROWSER_NAMES:
+        return True
+    return bool(segments) and segments[-1].lower() in BROWSER_NAMES
+
+
+def _site_and_app(segments):
+    # "Inbox - me@example.com - Gmail - Google Chrome" -> "Gmail - Google Chrome"
+    return segments[-2:] if len(segments) >= 3 else segments
+
+
+@lru_cache(maxsize=4096)
+def canonicalize(title, process_name=None):
+    """
+    Canonical key for a window title: volatile fragments (notification counters,
+    unsaved markers, clocks, media progress) are removed, then per-app rules
+    apply (browser titles collapse to site plus browser). Pass the process name
+    when the title carries it as a last segment. Idempotent.
+    """
+    if not title:
+        return title
+    stripped = _VOLATILE_RE.sub(" ", title)
+    segments = [s.strip() for s in SEPARATOR_RE.split(stripped)]
+    segments = [s for s in segments if s and s.lower() not in _STATE_SEGMENTS and re.search(r"\w", s)]
+    # The process name appended by WindowMonitor.format_window_title ("... - chrome.exe")
+    # is set aside, so rules see the title as the application wrote it
+    suffix = []
+    if process_name and len(segments) > 1 and segments[-1].lower() == process_name.lower():
+        suffix = segments[-1:]
+        segments = segments[:-1]
+    for rule in _rules:
+        if rule.applies(segments, process_name):
+            segments = rule.transform(segments)
+    segments = segments + suffix
+    canonical = " ".join(JOINER.join(segments).split())
+    # Titles that are nothing but volatile fragments keep their original text
+    return canonical or " ".join(title.split())
+
+
+register_rule("browser", _is_browser, _site_and_app)
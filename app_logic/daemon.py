@@ -0,0 +1,167 @@
+# File: app_logic/daemon.py
+import sys
+import json
+import time
+import signal
+import asyncio
+import argparse
+import importlib
+import contextlib
+from collections import OrderedDict
+
+import config_manager
+from app_logic import metrics
+
+# Windows remembered for AI checks still waiting on a verdict
+_MAX_PENDING_TARGETS = 32
+
+
+class FocusDaemon:
+    """
+    Headless KeyMind: monitoring and classification in one asyncio event loop,
+    without the Tk UI. AI verdicts arrive on worker threads and are handed back
+    to the loop; closing a window is queued to the enforcement worker thread, so
+    window and keyboard APIs never stall polling.
+    """
+
+    def __init__(self, task, enforce=True, prewarm=True, events=None):
+        self.task = task
+        self.enforce = enforce
+        self.prewarm = prewarm
+        # Stream for JSON-lines decision events (None: human-readable output only)
+        self.events = events
+        self.pipeline = None
+        self.monitor = None
+        self.enforcer = None
+        self._loop = None
+        # Activity key -> window it was focused in when the AI was asked about it
+        self._ai_targets = OrderedDict()
+
+    async def run(self):
+        from app_logic.monitor import WindowMonitor
+        from app_logic.pipeline import FocusPipeline
+        from app_logic.prewarm import Prewarmer
+        from app_logic.scheduler import AdaptivePoller
+        from app_logic.timeline import get_timeline
+        from app_logic.matcher import get_settings_matcher
+        from app_logic.preclassifier import get_local_classifier
+
+        self._loop = loop = asyncio.get_running_loop()
+        self.monitor = monitor = WindowMonitor()
+        prewarmer = Prewarmer(monitor) if self.prewarm else None
+        self.pipeline = FocusPipeline(
+            prewarmer=prewarmer,
+            on_ai_verdict=lambda activity, verdict: loop.call_soon_threadsafe(self._on_ai_verdict, activity, verdict),
+            timeline=get_timeline()
+        )
+        poller = AdaptivePoller(idle_source=monitor.get_idle_seconds)
+
+        settings_service = config_manager.get_settings_service()
+        settings_service.subscribe(get_settings_matcher)
+        settings_service.subscribe(poller.configure)
+        settings_service.subscribe(self.pipeline.configure)
+        settings_service.subscribe(get_local_classifier().configure)
+        exporters = metrics.start_exporters(config_manager.get_settings(), config_manager.CONFIG_DIR_PATH)
+
+        # Load the AI client (and keyboard automation) before the first check needs them
+        for module_name in ("app_logic.task_checker",) + (("app_logic.enforcement",) if self.enforce else ()):
+            loop.run_in_executor(None, importlib.import_module, module_name)
+
+        print(f"Task started: {self.task}")
+        if prewarmer is not None:
+            prewarmer.start(self.task)
+        try:
+            await monitor.monitor_active_window(self.task, self.pipeline, poller, self._on_decision)
+        finally:
+            if prewarmer is not None:
+                prewarmer.stop()
+            get_local_classifier().save()
+            get_timeline().close()
+            if self.enforcer is not None:
+                self.enforcer.stop()
+            metrics.stop_exporters(exporters, config_manager.CONFIG_DIR_PATH)
+            monitor.stop()
+            print("Monitoring stopped")
+
+    def _on_decision(self, decision):
+        from app_logic.pipeline import SOURCE_AI
+        if decision.relevance is None:
+            if decision.source == SOURCE_AI and self.enforce:
+                # Remember the window the AI is asked about, for closing it on the verdict
+                activity = self.pipeline.current_key
+                self._ai_targets[activity] = self.monitor.get_active_window_target()
+                self._ai_targets.move_to_end(activity)
+                while len(self._ai_targets) > _MAX_PENDING_TARGETS:
+                    self._ai_targets.popitem(last=False)
+            return
+        self._emit(decision.title, decision.relevance, decision.source)
+        # If activity is not relevant from lists, cache or local model, close it immediately
+        if decision.relevance == 0:
+            self._close(decision.title, self.monitor.get_active_window_target() if self.enforce else None)
+
+    def _on_ai_verdict(self, activity, verdict):
+        """Handle an AI verdict (called on the event loop)."""
+        from app_logic.pipeline import SOURCE_AI
+        from app_logic.enforcement import confirm_focus
+        target = self._ai_targets.pop(activity, None)
+        if verdict is not None and self.pipeline.is_focused(activity):
+            print(f"Relevance check: {activity} - {'Relevant' if verdict == 1 else 'Not relevant'} (AI decision)")
+            self._emit(activity, verdict, SOURCE_AI)
+            if verdict == 0:
+                # The last poll may be old: only close if that window still shows the activity
+                title = confirm_focus(self.monitor, activity, target)
+                if title is not None:
+                    self._close(title, target)
+
+    def _emit(self, title, relevance, source):
+        if self.events is None:
+            return
+        self.events.write(json.dumps({"time": time.time(), "task": self.task, "title": title,
+                                      "relevance": relevance, "source": source}) + "\n")
+        self.events.flush()
+
+    def _close(self, title, target=None):
+        """Queue closing the judged window (target: its WindowTarget, captured when it was judged)."""
+        if not self.enforce:
+            print(f"Would close: {title}")
+            return
+        if self.enforcer is None:
+            from app_logic.enforcement import EnforcementWorker
+            self.enforcer = EnforcementWorker(self.monitor)
+        self.enforcer.submit(title, target)
+
+
+async def _run_until_signalled(daemon):
+    task = asyncio.current_task()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, task.cancel)
+        except (NotImplementedError, RuntimeError):
+            # Windows: Ctrl+C still raises KeyboardInterrupt
+            pass
+    try:
+        await daemon.run()
+    except asyncio.CancelledError:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app_logic",
+                                     description="Run KeyMind headless: monitor, classify and close distractions.")
+    parser.add_argument("--task", required=True, help="what you are working on")
+    parser.add_argument("--dry-run", action="store_true", help="report distractions without closing them")
+    parser.add_argument("--no-prewarm", action="store_true", help="don't classify already-open windows up front")
+    parser.add_argument("--json", action="store_true",
+                        help="write one JSON line per verdict to stdout (other output goes to stderr)")
+    args = parser.parse_args(argv)
+
+    config_manager.ensure_config_directory_exists()
+    events = sys.stdout if args.json else None
+    daemon = FocusDaemon(args.task, enforce=not args.dry_run, prewarm=not args.no_prewarm, events=events)
+    with contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext():
+        try:
+            asyncio.run(_run_until_signalled(daemon))
+        except KeyboardInterrupt:
+            pass
+    return 0
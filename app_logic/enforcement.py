@@ -0,0 +1,143 @@
+# File: app_logic/enforcement.py
+import time
+import queue
+import platform
+import threading
+
+import config_manager
+from app_logic.matcher import get_settings_matcher
+from app_logic.metrics import get_registry, increment, timed
+
+# How close_activity dealt with a window
+CLOSED_NATIVE = "native"
+CLOSED_HOTKEY = "hotkey"
+SKIPPED = "skipped"
+
+
+def _hotkey(*keys):
+    import pyautogui
+    # No pyautogui.PAUSE: nothing sleeps between or after the shortcuts
+    pyautogui.hotkey(*keys, _pause=False)
+
+
+@timed("close_activity")
+def close_activity(title, target=None, monitor=None):
+    """
+    Close an activity. Browser tabs are closed with platform-aware shortcuts,
+    other applications through the native window APIs when a target window
+    and monitor are given (shortcuts otherwise). Shortcuts are only sent while
+    the target is still the focused window, so a window focused in the
+    meantime is never closed by mistake. Returns CLOSED_NATIVE, CLOSED_HOTKEY
+    or SKIPPED.
+    """
+    settings = config_manager.get_settings()
+    is_browser = get_settings_matcher(settings).matches(title, 'browsers')
+
+    is_mac = platform.system() == 'Darwin'
+
+    if not is_browser and target is not None and monitor is not None:
+        if monitor.close_window(target):
+            print(f"Closing application: {title}")
+            return CLOSED_NATIVE
+
+    if target is not None and monitor is not None:
+        focused = monitor.get_active_window_target()
+        if focused is None or focused.handle != target.handle:
+            print(f"Not closing {title}: it is no longer the focused window")
+            return SKIPPED
+
+    if is_browser:
+        print(f"Closing browser tab: {title}")
+        if is_mac:
+            _hotkey('command', 'w')
+            _hotkey('command', 't')
+        else:
+            _hotkey('ctrl', 'w')
+            _hotkey('ctrl', 't')
+    else:
+        print(f"Closing application: {title}")
+        if is_mac:
+            # macOS close window
+            _hotkey('command', 'w')
+        else:
+            _hotkey('alt', 'f4')
+    return CLOSED_HOTKEY
+
+
+def confirm_focus(monitor, activity, target):
+    """
+    Fresh check before closing on a verdict that arrived after the poll that
+    asked for it: returns the title of the focused window if it is still the
+    target window and still shows the activity (key), None otherwise.
+    """
+    from app_logic.pipeline import activity_key
+    window_title, process_name = monitor.get_active_window_info()
+    title = monitor.format_window_title(window_title, process_name)
+    if not title or activity_key(title, process_name)[0] != activity:
+        return None
+    if target is not None:
+        focused = monitor.get_active_window_target()
+        if focused is None or focused.handle != target.handle:
+            return None
+    return title
+
+
+class EnforcementWorker:
+    """
+    Closes distracting windows on a dedicated thread, so neither the UI thread
+    nor the event loop waits on window or keyboard APIs. Requests are queued
+    with the window they refer to; a window already queued is not queued
+    twice. The time from request to close (queueing included) is recorded as
+    the close_latency span.
+    """
+
+    def __init__(self, monitor=None):
+        self.monitor = monitor
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._queued = set()
+        self._thread = None
+
+    def submit(self, title, target=None):
+        """Queue a close; target is the WindowTarget captured when the activity was judged."""
+        key = target.handle if target is not None else title
+        with self._lock:
+            if key in self._queued:
+                return
+            self._queued.add(key)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="keymind-enforcer", daemon=True)
+                self._thread.start()
+        self._queue.put((time.perf_counter(), key, title, target))
+
+    def stop(self):
+        """Stop the worker once the already queued closes are done."""
+        with self._lock:
+            if self._thread is None:
+                return
+            thread, self._thread = self._thread, None
+        self._queue.put(None)
+        thread.join(timeout=2)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            submitted, key, title, target = job
+            try:
+                outcome = close_activity(title, target, self.monitor)
+            except Exception as e:
+                outcome = None
+                print(f"Error closing {title}: {e}")
+            finally:
+                with self._lock:
+                    self._queued.discard(key)
+
+            latency = time.perf_counter() - submitted
+            if outcome in (CLOSED_NATIVE, CLOSED_HOTKEY):
+                get_registry().observe("close_latency", latency)
+                increment(f"closed_{outcome}")
+                print(f"Closed {title} in {latency * 1000:.0f} ms ({outcome})")
+            elif outcome == SKIPPED:
+                increment("close_skipped")
@@ -0,0 +1,324 @@
+# File: app_logic/linux_x11.py
+import os
+import select
+import threading
+
+from app_logic.process_cache import get_process_cache
+
+try:
+    from Xlib import X, display as xdisplay, error as xerror
+    from Xlib.protocol import event as xevent
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+
+
+def is_available():
+    """True if python-xlib is installed and an X display is configured."""
+    return XLIB_AVAILABLE and bool(os.environ.get("DISPLAY"))
+
+
+def _ignore_error(*args):
+    """Async X errors (e.g. BadWindow for a window that just closed) are expected and harmless."""
+
+
+class X11WindowWatcher:
+    """
+    Event-driven active-window tracker for X11 (EWMH window managers).
+    Listens for PropertyNotify on the root window (_NET_ACTIVE_WINDOW) and on the
+    focused window (_NET_WM_NAME / WM_NAME), so focus and title changes are seen
+    within milliseconds with no work between switches.
+    """
+
+    def __init__(self, display_name=None):
+        self._display = xdisplay.Display(display_name)
+        self._display.set_error_handler(_ignore_error)
+        self._root = self._display.screen().root
+
+        atom = self._display.intern_atom
+        self._NET_ACTIVE_WINDOW = atom("_NET_ACTIVE_WINDOW")
+        self._NET_CLIENT_LIST = atom("_NET_CLIENT_LIST")
+        self._NET_WM_NAME = atom("_NET_WM_NAME")
+        self._NET_WM_PID = atom("_NET_WM_PID")
+        self._UTF8_STRING = atom("UTF8_STRING")
+        self._WM_NAME = X.WM_NAME
+        self._title_atoms = (self._NET_WM_NAME, self._WM_NAME)
+
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._window_list_listeners = []
+        self._active_window = None
+        self._info = (None, None)
+        self._window_id = None
+        self._pid = None
+        self._running = False
+        self._thread = None
+
+        self._root.change_attributes(event_mask=X.PropertyChangeMask)
+        self._refresh_active_window()
+        self._display.flush()
+
+    # --- X queries (only called from the constructor or the event thread) ---
+
+    def _get_text_property(self, window, atom, prop_type):
+        try:
+            prop = window.get_full_property(atom, prop_type)
+        except xerror.XError:
+            return None
+        if prop is None or not prop.value:
+            return None
+        value = prop.value
+        if isinstance(value, bytes):
+            return value.decode("utf-8", "replace")
+        return str(value)
+
+    def _get_title(self, window):
+        title = self._get_text_property(window, self._NET_WM_NAME, self._UTF8_STRING)
+        if not title:
+            title = self._get_text_property(window, self._WM_NAME, X.AnyPropertyType)
+        return title
+
+    def _get_pid(self, window):
+        try:
+            prop = window.get_full_property(self._NET_WM_PID, X.AnyPropertyType)
+        except xerror.XError:
+            return None
+        if prop is None or not len(prop.value):
+            return None
+        return int(prop.value[0])
+
+    def _get_process_name(self, window, pid):
+        name = get_process_cache().name(pid)
+        if name:
+            return name
+        try:
+            wm_class = window.get_wm_class()
+        except xerror.XError:
+            wm_class = None
+        return wm_class[1] if wm_class else None
+
+    def _refresh_active_window(self):
+        """Re-read the active window, moving our title subscription to it."""
+        try:
+            prop = self._root.get_full_property(self._NET_ACTIVE_WINDOW, X.AnyPropertyType)
+        except xerror.XError:
+            prop = None
+        window_id = int(prop.value[0]) if prop is not None and len(prop.value) else 0
+
+        if window_id != self._window_id:
+            if self._active_window is not None:
+                self._active_window.change_attributes(event_mask=X.NoEventMask, onerror=_ignore_error)
+            self._window_id = window_id
+            self._active_window = None
+            self._pid = None
+            if window_id:
+                self._active_window = self._display.create_resource_object("window", window_id)
+                self._active_window.change_attributes(event_mask=X.PropertyChangeMask, onerror=_ignore_error)
+                self._pid = self._get_pid(self._active_window)
+
+        if self._active_window is None:
+            self._publish((None, None))
+            return
+        title = self._get_title(self._active_window)
+        process_name = self._get_process_name(self._active_window, self._pid)
+        self._publish((title, process_name))
+
+    def _refresh_title(self):
+        if self._active_window is None:
+            return
+        title = self._get_title(self._active_window)
+        self._publish((title, self._info[1]))
+
+    def _publish(self, info):
+        with self._lock:
+            if info == self._info:
+                return
+            self._info = info
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(*info)
+            except Exception as e:
+                print(f"Window change listener failed: {e}")
+
+    # --- Public API ---
+
+    def get_active_window_info(self):
+        """Return the last known (title, process_name); never touches the X connection."""
+        with self._lock:
+            return self._info
+
+    def get_active_window_id(self):
+        """Return the X window id of the last known active window (0 if none)."""
+        return self._window_id or 0
+
+    def get_active_window_pid(self):
+        """Return the _NET_WM_PID of the last known active window, if it has one."""
+        return self._pid
+
+    def add_listener(self, callback):
+        """Call callback(title, process_name) from the event thread on every change."""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def add_window_list_listener(self, callback):
+        """Call callback() from the event thread whenever windows are created or destroyed."""
+        with self._lock:
+            self._window_list_listeners.append(callback)
+
+    def remove_window_list_listener(self, callback):
+        with self._lock:
+            if callback in self._window_list_listeners:
+                self._window_list_listeners.remove(callback)
+
+    def start(self):
+        """Start the background event thread."""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="keymind-x11-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the event thread and close the X connection."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self._display.close()
+
+    def _run(self):
+        fd = self._display.fileno()
+        while self._running:
+            # Wake up periodically so stop() is honoured; no X traffic happens while idle
+            readable, _, _ = select.select([fd], [], [], 0.5)
+            if not readable and not self._display.pending_events():
+                continue
+            try:
+                focus_changed = False
+                title_changed = False
+                windows_changed = False
+                while self._display.pending_events():
+                    event = self._display.next_event()
+                    if event.type != X.PropertyNotify:
+                        continue
+                    if event.window.id == self._root.id and event.atom == self._NET_ACTIVE_WINDOW:
+                        focus_changed = True
+                    elif event.window.id == self._root.id and event.atom == self._NET_CLIENT_LIST:
+                        windows_changed = True
+                    elif event.window.id == self._window_id and event.atom in self._title_atoms:
+                        title_changed = True
+                if focus_changed:
+                    self._refresh_active_window()
+                elif title_changed:
+                    self._refresh_title()
+                if windows_changed:
+                    with self._lock:
+                        listeners = list(self._window_list_listeners)
+                    for callback in listeners:
+                        try:
+                            callback()
+                        except Exception as e:
+                            print(f"Window list listener failed: {e}")
+                self._display.flush()
+            except xerror.ConnectionClosedError:
+                print("X11 connection closed; stopping window watcher")
+                self._running = False
+            except xerror.XError as e:
+                print(f"X11 error while watching windows: {e}")
+
+
+class X11Query:
+    """
+    Synchronous X11 queries (idle time, window enumeration) on a dedicated
+    connection, so they never race with the watcher's event thread.
+    """
+
+    def __init__(self, display_name=None):
+        self._display = xdisplay.Display(display_name)
+        self._display.set_error_handler(_ignore_error)
+        self._root = self._display.screen().root
+        self._lock = threading.Lock()
+        self._has_screensaver = self._display.has_extension("MIT-SCREEN-SAVER")
+
+        atom = self._display.intern_atom
+        self._NET_CLIENT_LIST = atom("_NET_CLIENT_LIST")
+        self._NET_WM_NAME = atom("_NET_WM_NAME")
+        self._NET_WM_PID = atom("_NET_WM_PID")
+        self._UTF8_STRING = atom("UTF8_STRING")
+        self._NET_SUPPORTED = atom("_NET_SUPPORTED")
+        self._NET_CLOSE_WINDOW = atom("_NET_CLOSE_WINDOW")
+        self._WM_PROTOCOLS = atom("WM_PROTOCOLS")
+        self._WM_DELETE_WINDOW = atom("WM_DELETE_WINDOW")
+        self._wm_can_close = None
+
+    def close_window(self, window_id):
+        """
+        Ask a window to close the way its close button would: through the window
+        manager (EWMH _NET_CLOSE_WINDOW), or with WM_DELETE_WINDOW if the window
+        manager doesn't support that. Doesn't wait for the window to go away.
+        Returns False if the window can't be asked (gone, or supports neither).
+        """
+        with self._lock:
+            try:
+                window = self._display.create_resource_object("window", int(window_id))
+                if self._wm_can_close is None:
+                    supported = self._root.get_full_property(self._NET_SUPPORTED, X.AnyPropertyType)
+                    self._wm_can_close = supported is not None and self._NET_CLOSE_WINDOW in supported.value
+                if self._wm_can_close:
+                    # Source indication 2: a pager or similar acting for the user
+                    message = xevent.ClientMessage(window=window, client_type=self._NET_CLOSE_WINDOW,
+                                                   data=(32, [X.CurrentTime, 2, 0, 0, 0]))
+                    self._root.send_event(message, event_mask=X.SubstructureRedirectMask | X.SubstructureNotifyMask)
+                else:
+                    protocols = window.get_full_property(self._WM_PROTOCOLS, X.AnyPropertyType)
+                    if protocols is None or self._WM_DELETE_WINDOW not in protocols.value:
+                        return False
+                    message = xevent.ClientMessage(window=window, client_type=self._WM_PROTOCOLS,
+                                                   data=(32, [self._WM_DELETE_WINDOW, X.CurrentTime, 0, 0, 0]))
+                    window.send_event(message)
+                self._display.flush()
+                return True
+            except xerror.XError:
+                return False
+
+    def get_idle_seconds(self):
+        """Seconds since the last keyboard/mouse input, or None without MIT-SCREEN-SAVER."""
+        if not self._has_screensaver:
+            return None
+        with self._lock:
+            try:
+                return self._root.screensaver_query_info().idle / 1000.0
+            except xerror.XError:
+                return None
+
+    def list_windows(self):
+        """Return (window id, title, pid) for every client window the window manager lists."""
+        windows = []
+        with self._lock:
+            try:
+                prop = self._root.get_full_property(self._NET_CLIENT_LIST, X.AnyPropertyType)
+            except xerror.XError:
+                return windows
+            for window_id in (prop.value if prop is not None else []):
+                window = self._display.create_resource_object("window", int(window_id))
+                try:
+                    name = window.get_full_property(self._NET_WM_NAME, self._UTF8_STRING)
+                    if name is None or not name.value:
+                        name = window.get_full_property(X.WM_NAME, X.AnyPropertyType)
+                    pid = window.get_full_property(self._NET_WM_PID, X.AnyPropertyType)
+                except xerror.XError:
+                    continue  # Window closed while enumerating
+                title = None
+                if name is not None and name.value:
+                    title = name.value.decode("utf-8", "replace") if isinstance(name.value, bytes) else str(name.value)
+                windows.append((int(window_id), title, int(pid.value[0]) if pid is not None and len(pid.value) else None))
+        return windows
+
+    def close(self):
+        self._display.close()
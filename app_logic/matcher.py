@@ -0,0 +1,146 @@
+# File: app_logic/matcher.py
+import re
+import fnmatch
+import threading
+from collections import deque
+
+# Rule prefixes supported in the allowed/banned/browsers lists.
+# Entries without a prefix keep the original case-insensitive substring behavior.
+GLOB_PREFIX = "glob:"
+REGEX_PREFIX = "re:"
+DOMAIN_PREFIX = "domain:"
+
+SETTINGS_LISTS = ("allowed", "banned", "browsers")
+
+
+def _domain_pattern(domain):
+    """Regex matching a domain (or any of its subdomains) as a standalone host in a title."""
+    domain = domain.strip().lower().lstrip(".")
+    return r"(?<![\w.-])(?:[\w-]+\.)*" + re.escape(domain) + r"(?![\w-])"
+
+
+class PatternMatcher:
+    """
+    Matches a title against several labelled pattern lists in one pass.
+    Plain patterns are compiled into a single Aho-Corasick automaton;
+    glob/regex/domain rules are folded into one regex per label.
+    """
+
+    def __init__(self, lists):
+        self.labels = tuple(lists)
+        self._bits = {label: 1 << i for i, label in enumerate(self.labels)}
+        self._all_bits = (1 << len(self.labels)) - 1
+        self._always = 0  # labels with an empty pattern, which matches every title
+
+        # Automaton: per-node transitions, failure links and output bitmasks
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [0]
+
+        rule_patterns = {}
+        for label, patterns in lists.items():
+            bit = self._bits[label]
+            for pattern in patterns or []:
+                if not isinstance(pattern, str):
+                    continue
+                lowered = pattern.strip().lower()
+                if lowered.startswith(GLOB_PREFIX):
+                    rule_patterns.setdefault(label, []).append(r"\A" + fnmatch.translate(pattern.strip()[len(GLOB_PREFIX):].strip()))
+                elif lowered.startswith(REGEX_PREFIX):
+                    rule_patterns.setdefault(label, []).append("(?:" + pattern.strip()[len(REGEX_PREFIX):].strip() + ")")
+                elif lowered.startswith(DOMAIN_PREFIX):
+                    rule_patterns.setdefault(label, []).append(_domain_pattern(lowered[len(DOMAIN_PREFIX):]))
+                elif not pattern.lower():
+                    self._always |= bit
+                else:
+                    self._add_literal(pattern.lower(), bit)
+        self._build_failure_links()
+
+        self._rules = []
+        for label, parts in rule_patterns.items():
+            try:
+                self._rules.append((self._bits[label], re.compile("|".join(parts), re.IGNORECASE)))
+            except re.error:
+                # Compile rules one by one so a single bad regex doesn't disable the rest
+                for part in parts:
+                    try:
+                        self._rules.append((self._bits[label], re.compile(part, re.IGNORECASE)))
+                    except re.error as e:
+                        print(f"Ignoring invalid {label} rule {part!r}: {e}")
+
+    def _add_literal(self, literal, bit):
+        node = 0
+        for ch in literal:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(0)
+            node = nxt
+        self._out[node] |= bit
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] |= self._out[self._fail[child]]
+
+    def match_bits(self, text):
+        """Return a bitmask of the labels whose patterns occur in text."""
+        found = self._always
+        if not text:
+            return found
+
+        goto, fail, out = self._goto, self._fail, self._out
+        all_bits = self._all_bits
+        node = 0
+        for ch in text.lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found |= out[node]
+                if found == all_bits:
+                    return found
+
+        for bit, regex in self._rules:
+            if not found & bit and regex.search(text):
+                found |= bit
+        return found
+
+    def match(self, text):
+        """Return the set of labels whose patterns occur in text."""
+        found = self.match_bits(text)
+        return frozenset(label for label, bit in self._bits.items() if found & bit)
+
+    def matches(self, text, label):
+        """Return True if any pattern of the given label occurs in text."""
+        return bool(self.match_bits(text) & self._bits.get(label, 0))
+
+
+_cached_key = None
+_cached_matcher = None
+_cache_lock = threading.Lock()
+
+
+def get_settings_matcher(settings):
+    """
+    Return a matcher for the allowed/banned/browsers lists of the given settings.
+    The automaton is rebuilt only when the lists change.
+    """
+    global _cached_key, _cached_matcher
+    key = tuple(tuple(settings.get(name, []) or []) for name in SETTINGS_LISTS)
+    with _cache_lock:
+        if _cached_matcher is None or key != _cached_key:
+            _cached_matcher = PatternMatcher(dict(zip(SETTINGS_LISTS, key)))
+            _cached_key = key
+        return _cached_matcher
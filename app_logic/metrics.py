@@ -0,0 +1,388 @@
+# File: app_logic/metrics.py
+import os
+import sys
+import time
+import bisect
+import marshal
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds (100 us .. 10 s)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS_FILE_NAME = "metrics.prom"
+PROFILE_FILE_NAME = "keymind.pstats"
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus semantics)."""
+
+    __slots__ = ("buckets", "counts", "count", "total", "_lock")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.count, self.total
+
+    def quantile(self, q):
+        """Approximate quantile (upper bound of the bucket it falls in)."""
+        counts, count, _ = self.snapshot()
+        if not count:
+            return None
+        rank = q * count
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    """Named span histograms and counters for the hot path."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = defaultdict(int)
+
+    def histogram(self, name):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram())
+        return histogram
+
+    def observe(self, name, seconds):
+        self.histogram(name).observe(seconds)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def summary(self):
+        """Per-span count, mean, p50 and p99 (seconds), plus counters."""
+        spans = {}
+        for name, histogram in sorted(self._histograms.items()):
+            _, count, total = histogram.snapshot()
+            spans[name] = {"count": count, "mean": total / count if count else None,
+                           "p50": histogram.quantile(0.5), "p99": histogram.quantile(0.99)}
+        with self._lock:
+            counters = dict(self._counters)
+        return {"spans": spans, "counters": counters}
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = ["# HELP keymind_span_seconds Time spent in KeyMind hot-path spans.",
+                 "# TYPE keymind_span_seconds histogram"]
+        for name, histogram in sorted(self._histograms.items()):
+            counts, count, total = histogram.snapshot()
+            cumulative = 0
+            for bound, n in zip(histogram.buckets, counts):
+                cumulative += n
+                lines.append(f'keymind_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'keymind_span_seconds_bucket{{span="{name}",le="+Inf"}} {count}')
+            lines.append(f'keymind_span_seconds_sum{{span="{name}"}} {total}')
+            lines.append(f'keymind_span_seconds_count{{span="{name}"}} {count}')
+        with self._lock:
+            counters = sorted(self._counters.items())
+        if counters:
+            lines.append("# TYPE keymind_events_total counter")
+            for name, value in counters:
+                lines.append(f'keymind_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry():
+    return _registry
+
+
+@contextmanager
+def span(name):
+    """Time the enclosed block into the named histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _registry.observe(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """Decorator form of span()."""
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _registry.observe(name, time.perf_counter() - start)
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        return wrapper
+    return decorator
+
+
+def increment(name, amount=1):
+    _registry.increment(name, amount)
+
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler: samples every thread's stack at a fixed
+    interval and writes the result as a pstats file (load with pstats.Stats).
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._running = False
+        self._thread = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # (file, line, func) -> [primitive calls, calls, self time, cumulative time, {caller: [...]}]
+        self._stats = {}
+        self.samples = 0
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        """Start sampling. Returns False if the profiler was already running."""
+        with self._lock:
+            if self._running:
+                return False
+            self._reset()
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="keymind-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            thread.join(timeout=1)
+
+    @staticmethod
+    def _key(code):
+        return (code.co_filename, code.co_firstlineno, code.co_name)
+
+    def _entry(self, key):
+        entry = self._stats.get(key)
+        if entry is None:
+            entry = self._stats[key] = [0, 0, 0.0, 0.0, {}]
+        return entry
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while self._running:
+            time.sleep(self.interval)
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                self._record(frame)
+            self.samples += 1
+
+    def _record(self, frame):
+        stack = []
+        while frame is not None:
+            stack.append(self._key(frame.f_code))
+            frame = frame.f_back
+        if not stack:
+            return
+        leaf = self._entry(stack[0])
+        leaf[2] += self.interval
+        seen = set()
+        for i, key in enumerate(stack):
+            entry = self._entry(key)
+            if key not in seen:
+                entry[0] += 1
+                entry[1] += 1
+                entry[3] += self.interval
+                seen.add(key)
+            if i + 1 < len(stack):
+                caller = entry[4].setdefault(stack[i + 1], [0, 0, 0.0, 0.0])
+                caller[0] += 1
+                caller[1] += 1
+                caller[3] += self.interval
+                if i == 0:
+                    caller[2] += self.interval
+
+    def dump(self, path):
+        """Write collected samples in pstats format."""
+        stats = {key: (cc, nc, tt, ct, {caller: tuple(v) for caller, v in callers.items()})
+                 for key, (cc, nc, tt, ct, callers) in list(self._stats.items())}
+        with open(path, "wb") as f:
+            marshal.dump(stats, f)
+        return path
+
+
+_profiler = SamplingProfiler()
+
+
+def get_profiler():
+    return _profiler
+
+
+def toggle_profiler(output_dir):
+    """Start the sampling profiler, or stop it and dump pstats. Returns a status message."""
+    if _profiler.running:
+        _profiler.stop()
+        path = _profiler.dump(os.path.join(output_dir, PROFILE_FILE_NAME))
+        return f"Profiler stopped after {_profiler.samples} samples; pstats written to {path}"
+    _profiler.start()
+    return "Profiler started"
+
+
+class MetricsServer:
+    """
+    Local HTTP endpoint (127.0.0.1 only):
+    - GET /metrics          Prometheus text format
+    - GET /profile          toggle the sampling profiler (dumps pstats on stop)
+    - GET /profile?seconds=N  profile for N seconds (409 if already running)
+    """
+
+    def __init__(self, port, output_dir, host="127.0.0.1"):
+        # Only needed when the endpoint is enabled; keep it off the startup path
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import urlparse, parse_qs
+
+        registry = _registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/metrics":
+                    body = registry.render_prometheus().encode()
+                    content_type = "text/plain; version=0.0.4"
+                elif url.path == "/profile":
+                    seconds = parse_qs(url.query).get("seconds")
+                    if seconds:
+                        try:
+                            duration = float(seconds[0])
+                        except ValueError:
+                            duration = -1.0
+                        # Also rejects nan and inf, which float() accepts
+                        if not 0 <= duration <= 600:
+                            self.send_error(400, "seconds must be a number from 0 to 600")
+                            return
+                        # A timed run must not stop a profile someone else started
+                        if not _profiler.start():
+                            self.send_error(409, "the profiler is already running")
+                            return
+                        time.sleep(duration)
+                    body = (toggle_profiler(output_dir) + "\n").encode()
+                    content_type = "text/plain"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="keymind-metrics", daemon=True)
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class MetricsFileWriter:
+    """Periodically rewrites a Prometheus-format metrics file (for node_exporter's textfile collector or tailing)."""
+
+    def __init__(self, path, interval):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="keymind-metrics-file", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+    def flush(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(_registry.render_prometheus())
+            os.replace(tmp_path, self.path)
+        except IOError as e:
+            print(f"Error writing metrics to {self.path}: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+
+def start_exporters(settings, output_dir):
+    """
+    Start whichever exporters the settings enable:
+    metrics_port (HTTP endpoint), metrics_flush_seconds (metrics file),
+    and KEYMIND_PROFILE=1 (profile the whole session).
+    Returns the started exporters so callers can stop them.
+    """
+    exporters = []
+    port = int(settings.get("metrics_port", 0) or 0)
+    if port:
+        try:
+            server = MetricsServer(port, output_dir).start()
+            print(f"Metrics available at http://127.0.0.1:{server.port}/metrics")
+            exporters.append(server)
+        except OSError as e:
+            print(f"Could not start metrics endpoint on port {port}: {e}")
+    interval = settings.get("metrics_flush_seconds", 0) or 0
+    if interval:
+        exporters.append(MetricsFileWriter(os.path.join(output_dir, METRICS_FILE_NAME), interval).start())
+    if os.environ.get("KEYMIND_PROFILE"):
+        _profiler.start()
+        print("Sampling profiler running for this session")
+    return exporters
+
+
+def stop_exporters(exporters, output_dir):
+    for exporter in exporters:
+        exporter.stop()
+    if _profiler.running:
+        print(toggle_profiler(output_dir))
@@ -1,35 +1,200 @@
-import asyncio
+import ctypes
 import platform
-import psutil
+import threading
+from collections import namedtuple
 
 # Optional/conditional imports per OS
 IS_WINDOWS = platform.system() == "Windows"
 IS_MAC = platform.system() == "Darwin"
+IS_LINUX = platform.system() == "Linux"
 
 if IS_WINDOWS:
     import pygetwindow as gw
     import win32process
     import win32gui
+    import win32con
 elif IS_MAC:
     # pygetwindow on mac can be unreliable for frontmost process. Use Quartz/AppKit.
     from AppKit import NSWorkspace
     from Quartz import CGWindowListCopyWindowInfo, kCGWindowListOptionOnScreenOnly, kCGNullWindowID
+    from Quartz import CGEventSourceSecondsSinceLastEventType, kCGEventSourceStateHIDSystemState, kCGAnyInputEventType
+elif IS_LINUX:
+    # Event-driven X11 backend (requires python-xlib and a running X server)
+    from app_logic import linux_x11
+
+from app_logic.metrics import timed
+from app_logic.process_cache import get_process_cache
+
+# A specific window: its native handle (HWND, X11 window id; on macOS the app's
+# PID) and owning process id, either of which may be None
+WindowTarget = namedtuple("WindowTarget", ["handle", "pid"])
 
 class WindowMonitor:
     def __init__(self):
         self.previous_window_title = ""
+        self._x11_watcher = None
+        self._x11_failed = False
+        self._x11_query = None
+        self._x11_query_failed = False
+        # The UI thread and the monitor thread may both be first to need a backend
+        self._x11_lock = threading.Lock()
+
+    def _get_x11_watcher(self):
+        """Start the X11 event watcher on first use (Linux only). Returns None if unavailable."""
+        if self._x11_watcher is not None or self._x11_failed:
+            return self._x11_watcher
+        with self._x11_lock:
+            if self._x11_watcher is None and not self._x11_failed:
+                if not linux_x11.is_available():
+                    self._x11_failed = True
+                    return None
+                try:
+                    watcher = linux_x11.X11WindowWatcher()
+                    watcher.start()
+                    self._x11_watcher = watcher
+                except Exception as e:
+                    print(f"X11 window watcher unavailable: {e}")
+                    self._x11_failed = True
+            return self._x11_watcher
+
+    def add_listener(self, callback):
+        """
+        Register callback(title, process_name) for focus/title change events.
+        Returns False on backends without change events (callers must poll).
+        """
+        watcher = self._get_x11_watcher() if IS_LINUX else None
+        if watcher is not None:
+            watcher.add_listener(callback)
+            return True
+        return False
+
+    def stop(self):
+        """Release backend resources (event threads, display connections)."""
+        with self._x11_lock:
+            watcher, self._x11_watcher = self._x11_watcher, None
+            query, self._x11_query = self._x11_query, None
+        if watcher is not None:
+            watcher.stop()
+        if query is not None:
+            query.close()
+
+    def get_idle_seconds(self):
+        """Seconds since the last user input, or None if the platform can't tell."""
+        try:
+            if IS_WINDOWS:
+                class LASTINPUTINFO(ctypes.Structure):
+                    _fields_ = [("cbSize", ctypes.c_uint), ("dwTime", ctypes.c_uint)]
+                info = LASTINPUTINFO()
+                info.cbSize = ctypes.sizeof(info)
+                if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+                    return None
+                elapsed_ms = (ctypes.windll.kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF
+                return elapsed_ms / 1000.0
+
+            if IS_MAC:
+                return float(CGEventSourceSecondsSinceLastEventType(kCGEventSourceStateHIDSystemState, kCGAnyInputEventType))
+
+            if IS_LINUX:
+                query = self._get_x11_query()
+                if query is not None:
+                    return query.get_idle_seconds()
+        except Exception as e:
+            print(f"Idle time unavailable: {e}")
+        return None
+
+    def _get_x11_query(self):
+        """Open the X11 query connection on first use (Linux only). Returns None if unavailable."""
+        if self._x11_query is not None or self._x11_query_failed:
+            return self._x11_query
+        with self._x11_lock:
+            if self._x11_query is None and not self._x11_query_failed:
+                if not linux_x11.is_available():
+                    self._x11_query_failed = True
+                    return None
+                try:
+                    self._x11_query = linux_x11.X11Query()
+                except Exception as e:
+                    print(f"X11 queries unavailable: {e}")
+                    self._x11_query_failed = True
+            return self._x11_query
+
+    @staticmethod
+    def format_window_title(title, process_name):
+        """Combine a window title and its process name the way activities are reported."""
+        if not title:
+            return None
+        # If title doesn't contain process name, add it
+        if process_name and process_name.lower() not in title.lower():
+            return f"{title} - {process_name}"
+        return title
+
+    def list_windows(self):
+        """
+        Get (combined title, process name) of all visible top-level windows; the
+        title is in the same format as get_active_window_title. Windows without
+        a title are skipped.
+        """
+        windows = []
+        try:
+            if IS_WINDOWS:
+                def collect(hwnd, _):
+                    if win32gui.IsWindowVisible(hwnd):
+                        title = win32gui.GetWindowText(hwnd)
+                        if title:
+                            process_name = self.get_process_name_from_hwnd(hwnd)
+                            windows.append((self.format_window_title(title, process_name), process_name))
+                    return True
+                win32gui.EnumWindows(collect, None)
+
+            elif IS_MAC:
+                infos = CGWindowListCopyWindowInfo(kCGWindowListOptionOnScreenOnly, kCGNullWindowID) or []
+                for win in infos:
+                    # Layer 0 holds normal application windows (not menus, docks, overlays)
+                    if win.get('kCGWindowLayer', 0) != 0:
+                        continue
+                    owner = win.get('kCGWindowOwnerName')
+                    name = win.get('kCGWindowName')
+                    if name:
+                        process_name = str(owner) if owner else None
+                        windows.append((self.format_window_title(str(name), process_name), process_name))
+
+            elif IS_LINUX:
+                query = self._get_x11_query()
+                if query is not None:
+                    for _, title, pid in query.list_windows():
+                        if not title:
+                            continue
+                        process_name = get_process_cache().name(pid)
+                        windows.append((self.format_window_title(title, process_name), process_name))
+        except Exception as e:
+            print(f"Error enumerating windows: {e}")
+
+        # De-duplicate titles while keeping stacking order
+        unique = {}
+        for title, process_name in windows:
+            unique.setdefault(title, process_name)
+        return list(unique.items())
+
+    def add_window_list_listener(self, callback):
+        """
+        Register callback() for window creation/destruction events.
+        Returns False on backends without such events (callers must re-enumerate periodically).
+        """
+        watcher = self._get_x11_watcher() if IS_LINUX else None
+        if watcher is not None:
+            watcher.add_window_list_listener(callback)
+            return True
+        return False
 
     def get_process_name_from_hwnd(self, hwnd):
         """Get process name from window handle (Windows only)."""
         if not IS_WINDOWS:
             return None
-        try:
-            _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            process = psutil.Process(pid)
-            return process.name()
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            return None
+        _, pid = win32process.GetWindowThreadProcessId(hwnd)
+        # Cached per (pid, create_time): no process query while the foreground app is unchanged
+        return get_process_cache().name(pid)
 
+    @timed("window_info")
     def get_active_window_info(self):
         """Get both title and process name of the currently active window."""
         if IS_WINDOWS:
@@ -72,27 +237,105 @@ class WindowMonitor:
             except Exception:
                 return None, None
 
-        # Unsupported platforms (e.g., Linux not yet implemented)
+        if IS_LINUX:
+            # The X11 watcher keeps this up to date from PropertyNotify events
+            watcher = self._get_x11_watcher()
+            if watcher is not None:
+                return watcher.get_active_window_info()
+
+        # Unsupported platforms (e.g., Wayland sessions without X11)
         return None, None
 
+    def get_active_window_target(self):
+        """Return the WindowTarget of the currently active window, or None if unknown."""
+        try:
+            if IS_WINDOWS:
+                hwnd = win32gui.GetForegroundWindow()
+                if not hwnd:
+                    return None
+                _, pid = win32process.GetWindowThreadProcessId(hwnd)
+                return WindowTarget(hwnd, pid)
+
+            if IS_MAC:
+                front_app = NSWorkspace.sharedWorkspace().frontmostApplication()
+                if front_app is None:
+                    return None
+                pid = int(front_app.processIdentifier())
+                return WindowTarget(pid, pid)
+
+            if IS_LINUX:
+                watcher = self._get_x11_watcher()
+                if watcher is not None and watcher.get_active_window_id():
+                    return WindowTarget(watcher.get_active_window_id(), watcher.get_active_window_pid())
+        except Exception as e:
+            print(f"Error reading the active window: {e}")
+        return None
+
+    def close_window(self, target):
+        """
+        Ask a specific window to close through the platform's window APIs
+        (WM_CLOSE on Windows, _NET_CLOSE_WINDOW / WM_DELETE_WINDOW on X11).
+        Returns immediately; False if there's no native way to close it.
+        """
+        try:
+            if IS_WINDOWS:
+                if not win32gui.IsWindow(target.handle):
+                    return False
+                win32gui.PostMessage(target.handle, win32con.WM_CLOSE, 0, 0)
+                return True
+
+            if IS_LINUX:
+                query = self._get_x11_query()
+                return query is not None and query.close_window(target.handle)
+        except Exception as e:
+            print(f"Error closing window {target.handle}: {e}")
+        # macOS: closing another app's window needs the Accessibility API; use shortcuts
+        return False
+
     def get_active_window_title(self):
         """Get the combined title and process name of the currently active window."""
         title, process_name = self.get_active_window_info()
-        if not title:
-            return None
+        return self.format_window_title(title, process_name)
 
-        # If title doesn't contain process name, add it
-        if process_name and process_name.lower() not in title.lower():
-            return f"{title} - {process_name}"
-        return title
+    async def monitor_active_window(self, task, pipeline=None, poller=None, on_decision=None):
+        """
+        Main window monitoring loop.
+        Prints each new active window; with a FocusPipeline, also classifies it
+        for the task and passes every Decision to on_decision(decision).
+        Polls adaptively and pauses while the user is idle or the screen is locked.
+        """
+        import asyncio
+        from app_logic.scheduler import AdaptivePoller
 
-    async def monitor_active_window(self, task):
-        """Main window monitoring loop."""
-        while True:
-            current_window_title = self.get_active_window_title()
+        if poller is None:
+            poller = AdaptivePoller(idle_source=self.get_idle_seconds)
+        if pipeline is not None:
+            pipeline.start(task)
+        try:
+            while True:
+                window_title, process_name = self.get_active_window_info()
+                current_window_title = self.format_window_title(window_title, process_name)
+                suspended, delay = poller.tick(current_window_title)
 
-            if current_window_title and current_window_title != self.previous_window_title:
-                print(f"Active window: {current_window_title}")
-                self.previous_window_title = current_window_title
+                if suspended:
+                    self.previous_window_title = ""
+                    if pipeline is not None:
+                        pipeline.suspend()
+                elif current_window_title:
+                    if current_window_title != self.previous_window_title:
+                        print(f"Active window: {current_window_title}")
+                        self.previous_window_title = current_window_title
+                    if pipeline is not None:
+                        # Called on every poll: dwell and cooldown checks fire while the title is unchanged
+                        decision = pipeline.observe(current_window_title, process_name=process_name)
+                        if decision is not None and on_decision is not None:
+                            on_decision(decision)
 
-            await asyncio.sleep(1)
+                if pipeline is not None:
+                    due = pipeline.seconds_until_due()
+                    if due is not None:
+                        delay = min(delay, due)
+                await asyncio.sleep(delay)
+        finally:
+            if pipeline is not None:
+                pipeline.stop()
@@ -0,0 +1,131 @@
+# File: app_logic/monitor_thread.py
+import queue
+import threading
+from collections import OrderedDict
+
+from app_logic.enforcement import confirm_focus
+from app_logic.pipeline import SOURCE_AI
+
+# Windows remembered for AI checks still waiting on a verdict
+_MAX_PENDING_TARGETS = 32
+
+
+class MonitorThread:
+    """
+    Window polling and the decision pipeline on a background thread, so no OS
+    window query, process lookup, settings read or list match runs on the UI
+    thread. The pipeline is only used from this thread: starting or stopping
+    a task and AI verdicts are queued to it as commands. Each change of the
+    active window title is published on `events` (a queue.Queue of titles)
+    for the UI to drain; close(title, target) is called here for distracting
+    windows, with the window (WindowTarget) captured by the poll that judged it.
+    """
+
+    def __init__(self, monitor, pipeline, poller, close=None):
+        self.monitor = monitor
+        self.pipeline = pipeline
+        self.poller = poller
+        self.close = close
+        self.events = queue.Queue()
+
+        self._commands = queue.Queue()
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+        self._published_title = None
+        # Activity key -> window it was focused in when the AI was asked about it
+        self._ai_targets = OrderedDict()
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="keymind-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling; commands already queued still run."""
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def start_task(self, task):
+        self._call(self.pipeline.start, task)
+
+    def stop_task(self):
+        self._call(self.pipeline.stop)
+
+    def on_ai_verdict(self, activity, verdict):
+        """Pipeline AI verdict callback (any thread): handled on the monitor thread."""
+        self._call(self._handle_ai_verdict, activity, verdict)
+
+    def _call(self, function, *args):
+        self._commands.put((function, args))
+        self._wake.set()
+
+    def _run_commands(self):
+        while True:
+            try:
+                function, args = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                function(*args)
+            except Exception as e:
+                print(f"Monitor command failed: {e}")
+
+    def _run(self):
+        while self._running:
+            # Cleared before the work, so a command queued meanwhile cuts the next wait short
+            self._wake.clear()
+            self._run_commands()
+            try:
+                delay = self._poll()
+            except Exception as e:
+                print(f"Error while monitoring windows: {e}")
+                delay = self.poller.max_interval
+            self._wake.wait(delay)
+        self._run_commands()
+
+    def _poll(self):
+        """Check the active window once; returns the seconds until the next poll."""
+        window_title, process_name = self.monitor.get_active_window_info()
+        title = self.monitor.format_window_title(window_title, process_name)
+        suspended, delay = self.poller.tick(title)
+        if not suspended:
+            if title and title != self._published_title:
+                self._published_title = title
+                self.events.put(title)
+            decision = self.pipeline.observe(title, process_name=process_name)
+            if decision is not None and self.close is not None:
+                # If activity is not relevant from lists, cache or local model, close it immediately
+                if decision.relevance == 0:
+                    self.close(decision.title, self.monitor.get_active_window_target())
+                elif decision.source == SOURCE_AI:
+                    self._remember_target(self.pipeline.current_key)
+        else:
+            self.pipeline.suspend()
+
+        # Wake up in time for a pending dwell/cooldown check
+        due = self.pipeline.seconds_until_due()
+        if due is not None:
+            delay = min(delay, due)
+        return delay
+
+    def _remember_target(self, activity):
+        self._ai_targets[activity] = self.monitor.get_active_window_target()
+        self._ai_targets.move_to_end(activity)
+        while len(self._ai_targets) > _MAX_PENDING_TARGETS:
+            self._ai_targets.popitem(last=False)
+
+    def _handle_ai_verdict(self, activity, result):
+        target = self._ai_targets.pop(activity, None)
+        if result is not None and self.pipeline.is_focused(activity):
+            print(f"Relevance check: {activity} - {'Relevant' if result == 1 else 'Not relevant'} (AI decision)")
+            if result == 0 and self.close is not None:
+                # The last poll may be old: only close if that window still shows the activity
+                title = confirm_focus(self.monitor, activity, target)
+                if title is not None:
+                    self.close(title, target)
@@ -0,0 +1,270 @@
+# File: app_logic/pipeline.py
+import time
+import threading
+from collections import namedtuple, Counter
+
+import config_manager
+from app_logic.browser_state import get_browser_state, site_key, site_of
+from app_logic.canonical import canonicalize
+from app_logic.matcher import get_settings_matcher
+from app_logic.metrics import span
+from app_logic.preclassifier import get_local_classifier
+from app_logic.verdict_cache import get_verdict_cache
+
+# Where a verdict came from
+SOURCE_ALLOWED = "in allowed list"
+SOURCE_BANNED = "in banned list"
+SOURCE_CACHE = "cached"
+SOURCE_LOCAL = "local model"
+SOURCE_AI = "AI decision"
+
+# Default dwell and cooldown (overridden by the check_dwell_seconds / check_cooldown_seconds settings)
+DEFAULT_DWELL_SECONDS = 1.5
+DEFAULT_COOLDOWN_SECONDS = 60.0
+# Forget AI attempt times of activities not seen for this many cooldowns
+_ATTEMPT_MEMORY_COOLDOWNS = 10
+
+Decision = namedtuple("Decision", ["title", "relevance", "source"])
+
+
+def activity_key(title, process_name=None):
+    """
+    The (key, site) an activity is checked and cached under: a configured
+    browser's site when its session files show the tab's URL, the canonical
+    title otherwise (site is then None). The prewarmer uses the same keys.
+    """
+    site = _site_for(title)
+    return (site_key(site) if site else canonicalize(title, process_name)), site
+
+
+def _site_for(title):
+    """The site shown in a configured browser's window, from its session files; None if unknown."""
+    settings = config_manager.get_settings()
+    if not get_settings_matcher(settings).matches(title, 'browsers'):
+        return None
+    reader = get_browser_state(settings)
+    url = reader.url_for_title(title) if reader is not None else None
+    return site_of(url) if url else None
+
+
+class FocusPipeline:
+    """
+    Decision path from the active window title to a relevance verdict,
+    independent of any UI: allowed/banned lists, then the verdict cache,
+    then the local pre-classifier, then the AI via the classification queue.
+    Lists match the raw title; change detection, the cache, the local model and
+    the AI use its canonical key (see app_logic.canonical), so a notification
+    counter or unsaved marker changing does not count as a new activity. For a
+    configured browser whose session files show the tab's URL, the key is the
+    site instead ("reddit.com (website)"), so one verdict covers all its pages;
+    lists then match the site too.
+
+    The local steps cost nothing and run as soon as a window is focused. The AI
+    is only asked once an activity has held focus for the dwell time, so alt-tab
+    flickers never cost an API call; each activity is asked at most once per
+    cooldown, and a window that stays focused is re-checked every cooldown.
+    AI verdicts are delivered to on_ai_verdict(activity_key, verdict) on a worker thread.
+    If a timeline store is given, every focus session during a task is recorded there.
+    """
+
+    def __init__(self, batcher=None, prewarmer=None, on_ai_verdict=None, clock=time.time, timeline=None,
+                 dwell_seconds=DEFAULT_DWELL_SECONDS, cooldown_seconds=DEFAULT_COOLDOWN_SECONDS):
+        self.batcher = batcher
+        self.prewarmer = prewarmer
+        self.timeline = timeline
+        self.on_ai_verdict = on_ai_verdict
+        self.clock = clock
+        self.dwell_seconds = dwell_seconds
+        self.cooldown_seconds = cooldown_seconds
+
+        self.task = None
+        self.monitoring_active = False
+        self.current_title = None
+        self.current_key = None
+        self.current_process = None
+        self.current_site = None
+        # When the current activity is next due for a check (None: nothing scheduled)
+        self.next_check_at = None
+
+        self._lock = threading.Lock()
+        self._ai_attempts = {}  # activity key -> time of the last AI request
+        self.source_counts = Counter()
+
+    def configure(self, settings):
+        """Apply dwell/cooldown settings (subscribe to the settings service)."""
+        self.dwell_seconds = float(settings.get("check_dwell_seconds", DEFAULT_DWELL_SECONDS))
+        self.cooldown_seconds = max(float(settings.get("check_cooldown_seconds", DEFAULT_COOLDOWN_SECONDS)), 1.0)
+
+    def start(self, task):
+        """Begin checking activities against the given task."""
+        self.task = task
+        self.monitoring_active = True
+        with self._lock:
+            self._ai_attempts.clear()
+        # Treat the window that is focused right now as newly focused
+        self.current_title = None
+        self.current_key = None
+        self.next_check_at = None
+
+    def stop(self):
+        self.monitoring_active = False
+        self.next_check_at = None
+        if self.timeline is not None:
+            self.timeline.end(self.clock())
+
+    def suspend(self):
+        """Forget the focused window while the user is idle or the screen is locked."""
+        self.next_check_at = None
+        if self.current_key is None:
+            return
+        self.current_title = None
+        self.current_key = None
+        if self.timeline is not None:
+            self.timeline.end(self.clock())
+
+    def is_focused(self, activity):
+        """True while monitoring is on and the activity (title or its key) is still the active window."""
+        key = self.current_key
+        return self.monitoring_active and key is not None and (activity == key or canonicalize(activity) == key)
+
+    def seconds_until_due(self, now=None):
+        """Seconds until the focused activity is due for a check, or None if nothing is scheduled."""
+        if self.next_check_at is None:
+            return None
+        now = self.clock() if now is None else now
+        return max(0.0, self.next_check_at - now)
+
+    def observe(self, title, now=None, process_name=None):
+        """
+        Feed the latest active window title; call on every poll.
+        Returns None if nothing new happened; otherwise a Decision whose
+        relevance is None when no verdict is known yet or the AI answer is pending.
+        """
+        if not title:
+            return None
+        now = self.clock() if now is None else now
+
+        if title != self.current_title:
+            key, site = activity_key(title, process_name)
+            self.current_title = title
+            # Only volatile fragments changed (counter, clock, unsaved marker): same activity
+            if key != self.current_key:
+                self.current_key = key
+                self.current_process = process_name
+                self.current_site = site
+                return self._focus(title, key, now)
+
+        if self.next_check_at is not None and now >= self.next_check_at and self.monitoring_active:
+            return self._check(self.current_title, self.current_key, now)
+        return None
+
+    def _focus(self, title, key, now):
+        """A different activity was focused: answer locally right away, or schedule the AI after the dwell time."""
+        self.next_check_at = None
+        if not self.monitoring_active:
+            return Decision(title, None, None)
+
+        decision = self.decide(title, key, use_ai=False, site=self.current_site)
+        if self.timeline is not None:
+            self.timeline.switch(self.task, title, self.current_process, decision.relevance, decision.source, now)
+        if decision.relevance is not None:
+            # Re-evaluate while it stays focused, in case the lists or cached verdict change
+            self.next_check_at = now + self.cooldown_seconds
+            return decision
+
+        last_attempt = self._last_attempt(key)
+        if last_attempt is not None and now - last_attempt < self.cooldown_seconds:
+            # Asked recently without an answer; retry once its cooldown has passed
+            self.next_check_at = last_attempt + self.cooldown_seconds
+        else:
+            self.next_check_at = now + self.dwell_seconds
+        return Decision(title, None, None)
+
+    def _check(self, title, key, now):
+        """The focused activity is due: re-run the local steps, then the AI if still undecided."""
+        self.next_check_at = now + self.cooldown_seconds
+        decision = self.decide(title, key, use_ai=False, site=self.current_site)
+        if decision.relevance is not None:
+            if self.timeline is not None:
+                self.timeline.set_verdict(title, decision.relevance, decision.source)
+            return decision
+        with self._lock:
+            self._ai_attempts[key] = now
+            self._forget_old_attempts(now)
+        return self._ask_ai(title, key)
+
+    def _last_attempt(self, key):
+        with self._lock:
+            return self._ai_attempts.get(key)
+
+    def _forget_old_attempts(self, now):
+        horizon = now - self.cooldown_seconds * _ATTEMPT_MEMORY_COOLDOWNS
+        if len(self._ai_attempts) > 256:
+            for key in [k for k, t in self._ai_attempts.items() if t < horizon]:
+                del self._ai_attempts[key]
+
+    def decide(self, title, key=None, use_ai=True, site=None):
+        """
+        Classify one activity for the current task. With use_ai=False only the
+        local steps run and an undecided activity yields Decision(title, None, None).
+        site is the browser tab's site, matched by the lists along with the title.
+        """
+        task = self.task
+        key = canonicalize(title) if key is None else key
+        # Current settings snapshot (re-read only when the file changes)
+        with span("settings"):
+            settings = config_manager.get_settings()
+        with span("list_match"):
+            matched = get_settings_matcher(settings).match(f"{title} {site}" if site else title)
+
+        # Check if activity is in allowed list
+        if 'allowed' in matched:
+            return self._report(Decision(title, 1, SOURCE_ALLOWED))
+        # Check if activity is in banned list
+        if 'banned' in matched:
+            return self._report(Decision(title, 0, SOURCE_BANNED))
+
+        # Answer repeat switches from the verdict cache without a thread or API call
+        cached = get_verdict_cache().get(task, key)
+        if self.prewarmer is not None:
+            self.prewarmer.record_check(task, key, cached=cached is not None)
+        if cached is not None:
+            return self._report(Decision(title, cached, SOURCE_CACHE))
+
+        # Let the local pre-classifier answer when it is confident
+        local = get_local_classifier().predict(task, key)
+        if local is not None:
+            return self._report(Decision(title, local, SOURCE_LOCAL))
+
+        if not use_ai:
+            return Decision(title, None, None)
+        return self._ask_ai(title, key)
+
+    def _ask_ai(self, title, key):
+        """Queue the AI call on the bounded classification queue; lookups arriving together share one request."""
+        task = self.task
+        if self.batcher is None:
+            from app_logic.batching import get_batcher
+            self.batcher = get_batcher()
+
+        def on_result(verdict, activity=key):
+            if verdict is not None:
+                self._count(SOURCE_AI)
+                current_title = self.current_title
+                if self.timeline is not None and self.is_focused(activity):
+                    self.timeline.set_verdict(current_title, verdict, SOURCE_AI)
+            if self.on_ai_verdict is not None:
+                self.on_ai_verdict(activity, verdict)
+
+        # Dropped before it is sent if the user has already moved on
+        self.batcher.submit(task, key, on_result, is_current=lambda activity=key: self.is_focused(activity))
+        return Decision(title, None, SOURCE_AI)
+
+    def _count(self, source):
+        with self._lock:
+            self.source_counts[source] += 1
+
+    def _report(self, decision):
+        self._count(decision.source)
+        print(f"Relevance check: {decision.title} - {'Relevant' if decision.relevance == 1 else 'Not relevant'} ({decision.source})")
+        return decision
@@ -0,0 +1,235 @@
+# File: app_logic/preclassifier.py
+import os
+import re
+import json
+import math
+import zlib
+import sqlite3
+import argparse
+import threading
+
+import config_manager
+
+MODEL_FILE_NAME = "preclassifier.json"
+NUM_BUCKETS = 1 << 18
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_MIN_SAMPLES = 30
+SAVE_EVERY = 20
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _bucket(feature):
+    # crc32 rather than hash() so buckets are stable across runs
+    return zlib.crc32(feature.encode("utf-8")) % NUM_BUCKETS
+
+
+def extract_features(task, activity):
+    """
+    Hashed features for a (task, activity) pair:
+    activity character 3-grams, activity words, and task-word x activity-word crosses.
+    """
+    task_words = set(_WORD_RE.findall((task or "").casefold()))
+    activity_text = " ".join((activity or "").casefold().split())
+    activity_words = set(_WORD_RE.findall(activity_text))
+
+    features = set()
+    padded = f" {activity_text} "
+    for i in range(len(padded) - 2):
+        features.add("c:" + padded[i:i + 3])
+    for word in activity_words:
+        features.add("w:" + word)
+        for task_word in task_words:
+            features.add(f"x:{task_word}|{word}")
+    return sorted({_bucket(f) for f in features})
+
+
+class LocalClassifier:
+    """
+    Online logistic regression over hashed n-gram features, trained incrementally
+    from AI verdicts. Answers locally only when confident; otherwise callers fall
+    back to the API.
+    """
+
+    def __init__(self, path=None, threshold=DEFAULT_THRESHOLD, min_samples=DEFAULT_MIN_SAMPLES,
+                 learning_rate=0.5, persist=True):
+        self.path = path or os.path.join(config_manager.CONFIG_DIR_PATH, MODEL_FILE_NAME)
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.learning_rate = learning_rate
+        self.persist = persist
+
+        self._lock = threading.Lock()
+        self._weights = {}
+        self._bias = 0.0
+        self.samples = 0
+        self._unsaved = 0
+
+        self.local_answers = 0
+        self.fallbacks = 0
+
+        if persist:
+            self.load()
+
+    def configure(self, settings):
+        """Apply the confidence threshold and warm-up size from a settings mapping."""
+        self.threshold = settings.get("local_classifier_threshold", self.threshold)
+        self.min_samples = settings.get("local_classifier_min_samples", self.min_samples)
+
+    def _score(self, features):
+        scale = 1.0 / math.sqrt(len(features)) if features else 0.0
+        z = self._bias + scale * sum(self._weights.get(f, 0.0) for f in features)
+        z = max(-30.0, min(30.0, z))
+        return 1.0 / (1.0 + math.exp(-z)), scale
+
+    def predict_proba(self, task, activity):
+        """Probability that the activity is relevant to the task."""
+        features = extract_features(task, activity)
+        with self._lock:
+            return self._score(features)[0]
+
+    def predict(self, task, activity):
+        """Return 1 or 0 when confident, or None to fall back to the API."""
+        if self.threshold >= 1 or self.samples < self.min_samples:
+            self.fallbacks += 1
+            return None
+        p = self.predict_proba(task, activity)
+        if p >= self.threshold:
+            self.local_answers += 1
+            return 1
+        if p <= 1 - self.threshold:
+            self.local_answers += 1
+            return 0
+        self.fallbacks += 1
+        return None
+
+    def learn(self, task, activity, verdict):
+        """Take one SGD step towards an AI verdict (1 or 0)."""
+        if verdict not in (0, 1):
+            return
+        features = extract_features(task, activity)
+        with self._lock:
+            p, scale = self._score(features)
+            gradient = (p - verdict) * self.learning_rate
+            self._bias -= gradient * 0.1
+            for f in features:
+                self._weights[f] = self._weights.get(f, 0.0) - gradient * scale
+            self.samples += 1
+            self._unsaved += 1
+            should_save = self.persist and self._unsaved >= SAVE_EVERY
+        if should_save:
+            self.save()
+
+    def stats(self):
+        answered = self.local_answers + self.fallbacks
+        return {
+            "samples": self.samples,
+            "local_answers": self.local_answers,
+            "fallbacks": self.fallbacks,
+            "local_rate": self.local_answers / answered if answered else 0.0,
+        }
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            with self._lock:
+                self._weights = {int(k): float(v) for k, v in data.get("weights", {}).items()}
+                self._bias = float(data.get("bias", 0.0))
+                self.samples = int(data.get("samples", 0))
+        except FileNotFoundError:
+            pass
+        except (IOError, ValueError, TypeError) as e:
+            print(f"Error loading local classifier from {self.path}: {e}")
+
+    def save(self):
+        if not self.persist:
+            return
+        with self._lock:
+            data = {"bias": self._bias, "samples": self.samples,
+                    "weights": {str(k): round(v, 6) for k, v in self._weights.items() if abs(v) > 1e-6}}
+            self._unsaved = 0
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except IOError as e:
+            print(f"Error saving local classifier to {self.path}: {e}")
+
+
+_shared_classifier = None
+_shared_lock = threading.Lock()
+
+
+def get_local_classifier():
+    """Return the process-wide local classifier, creating it on first use."""
+    global _shared_classifier
+    with _shared_lock:
+        if _shared_classifier is None:
+            _shared_classifier = LocalClassifier()
+        return _shared_classifier
+
+
+def evaluate(rows, thresholds, min_samples=DEFAULT_MIN_SAMPLES):
+    """
+    Progressive (predict-then-learn) evaluation over chronologically ordered
+    (task, activity, verdict) rows. Returns one report dict per threshold.
+    """
+    reports = []
+    for threshold in thresholds:
+        model = LocalClassifier(threshold=threshold, min_samples=min_samples, persist=False)
+        answered = agreed = 0
+        for task, activity, verdict in rows:
+            prediction = model.predict(task, activity)
+            if prediction is not None:
+                answered += 1
+                agreed += prediction == verdict
+            model.learn(task, activity, verdict)
+        reports.append({
+            "threshold": threshold,
+            "samples": len(rows),
+            "api_calls_saved": answered,
+            "api_calls_saved_rate": answered / len(rows) if rows else 0.0,
+            "agreement_rate": agreed / answered if answered else None,
+        })
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate the local pre-classifier against past AI verdicts.")
+    parser.add_argument("--db", default=None, help="verdict cache database (default: the user config one)")
+    parser.add_argument("--thresholds", default="0.7,0.8,0.9,0.95", help="comma-separated confidence thresholds")
+    parser.add_argument("--min-samples", type=int, default=DEFAULT_MIN_SAMPLES)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    from app_logic.verdict_cache import DB_FILE_NAME
+    db_path = args.db or os.path.join(config_manager.CONFIG_DIR_PATH, DB_FILE_NAME)
+    if not os.path.exists(db_path):
+        print(f"No verdict history found at {db_path}")
+        return 1
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT task, activity, verdict FROM verdicts ORDER BY stored_at").fetchall()
+    finally:
+        conn.close()
+
+    thresholds = [float(t) for t in args.thresholds.split(",") if t.strip()]
+    reports = evaluate(rows, thresholds, args.min_samples)
+    if args.json:
+        print(json.dumps(reports, indent=4))
+        return 0
+
+    print(f"Evaluated on {len(rows)} past verdicts from {db_path}")
+    for report in reports:
+        agreement = report["agreement_rate"]
+        agreement_text = f"{agreement:.1%}" if agreement is not None else "n/a"
+        print(f"  threshold {report['threshold']:.2f}: API calls saved {report['api_calls_saved']} "
+              f"({report['api_calls_saved_rate']:.1%}), agreement {agreement_text}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
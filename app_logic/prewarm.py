@@ -0,0 +1,125 @@
+# File: app_logic/prewarm.py
+import threading
+
+import config_manager
+from app_logic.matcher import get_settings_matcher
+from app_logic.pipeline import activity_key
+from app_logic.verdict_cache import get_verdict_cache, make_key
+
+# Re-enumerate this often on platforms without window-creation events
+DEFAULT_REFRESH_SECONDS = 30.0
+
+
+class Prewarmer:
+    """
+    Classifies every open window in the background when a task starts (and
+    whenever windows are created), at low priority, so that focusing a window
+    finds its verdict already cached. Tracks how many focus checks were served
+    warm (prewarmed verdict) vs cold (had to wait on the AI).
+    """
+
+    def __init__(self, monitor, batcher=None, refresh_seconds=DEFAULT_REFRESH_SECONDS):
+        self.monitor = monitor
+        self.batcher = batcher
+        self.refresh_seconds = refresh_seconds
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._task = None
+        self._generation = 0
+        self._thread = None
+        self._prewarmed = set()  # keys whose lookup was submitted: their checks count as warm
+        self._already_cached = set()  # keys that had a verdict before prewarming looked
+        self._listening = False
+
+        self.submitted = 0
+        self.warm = 0
+        self.cold = 0
+
+    def start(self, task):
+        """Begin prewarming verdicts for the given task."""
+        with self._lock:
+            self._task = task
+            self._generation += 1
+            self._prewarmed = set()
+            self._already_cached = set()
+            self.submitted = self.warm = self.cold = 0
+            generation = self._generation
+        if not self._listening:
+            self._listening = self.monitor.add_window_list_listener(self._wake.set)
+        self._thread = threading.Thread(target=self._run, args=(generation,), name="keymind-prewarm", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop prewarming; queued prewarm lookups are cancelled before being sent."""
+        with self._lock:
+            self._task = None
+            self._generation += 1
+        self._wake.set()
+
+    def record_check(self, task, activity, cached):
+        """Record whether a focus check found its verdict cached (warm) or not (cold)."""
+        with self._lock:
+            if task != self._task:
+                return
+            if cached and make_key(task, activity) in self._prewarmed:
+                self.warm += 1
+            elif not cached:
+                self.cold += 1
+
+    def stats(self):
+        with self._lock:
+            return {"submitted": self.submitted, "warm": self.warm, "cold": self.cold}
+
+    def _is_current(self, generation):
+        return self._generation == generation
+
+    def _run(self, generation):
+        while self._is_current(generation):
+            self._wake.clear()
+            self.prewarm_once(generation)
+            # Sleep until windows change (X11) or the refresh interval passes
+            self._wake.wait(self.refresh_seconds)
+
+    def prewarm_once(self, generation=None):
+        """Enumerate open windows and queue lookups for those with no verdict yet."""
+        with self._lock:
+            task = self._task
+            generation = self._generation if generation is None else generation
+        if not task or not self._is_current(generation):
+            return 0
+
+        if self.batcher is None:
+            from app_logic.batching import get_batcher
+            self.batcher = get_batcher()
+
+        matcher = get_settings_matcher(config_manager.get_settings())
+        cache = get_verdict_cache()
+        queued = 0
+        for title, process_name in self.monitor.list_windows():
+            # Verdicts are cached under the same activity key as in FocusPipeline
+            activity, site = activity_key(title, process_name)
+            key = make_key(task, activity)
+            with self._lock:
+                if key in self._prewarmed or key in self._already_cached:
+                    continue
+            # Allowed/banned windows are decided locally and never need the AI
+            matched = matcher.match(f"{title} {site}" if site else title)
+            if "allowed" in matched or "banned" in matched:
+                continue
+            if cache.get(task, activity) is not None:
+                # Cached by an earlier session, not by prewarming: not counted as warm
+                with self._lock:
+                    self._already_cached.add(key)
+                continue
+            with self._lock:
+                self._prewarmed.add(key)
+            self.batcher.submit(task, activity, lambda verdict: None,
+                                is_current=lambda g=generation: self._is_current(g),
+                                low_priority=True)
+            queued += 1
+        with self._lock:
+            self.submitted += queued
+        if queued:
+            print(f"Prewarming verdicts for {queued} open window(s)")
+        return queued
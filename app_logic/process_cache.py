@@ -0,0 +1,140 @@
+# File: app_logic/process_cache.py
+import time
+import threading
+from collections import namedtuple
+
+import psutil
+
+DEFAULT_MAX_ENTRIES = 512
+# Re-check that a cached PID still belongs to the same process this often
+DEFAULT_REVALIDATE_SECONDS = 5.0
+# Drop entries of exited processes at most this often
+DEFAULT_SWEEP_SECONDS = 60.0
+MAX_PARENT_DEPTH = 8
+
+_PROCESS_ERRORS = (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess)
+
+# parents: ((pid, name), ...) from the direct parent upwards
+ProcessInfo = namedtuple("ProcessInfo", ["pid", "create_time", "name", "exe", "parents"])
+
+
+class ProcessInfoCache:
+    """
+    Process metadata keyed by (pid, create_time), shared by all window backends.
+    A hit costs a dict lookup; at most every revalidate_seconds the PID's start
+    time is re-read to detect exit or PID reuse. Entries of exited processes are
+    evicted on revalidation and by a periodic sweep.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, revalidate_seconds=DEFAULT_REVALIDATE_SECONDS,
+                 sweep_seconds=DEFAULT_SWEEP_SECONDS, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.revalidate_seconds = revalidate_seconds
+        self.sweep_seconds = sweep_seconds
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._entries = {}   # (pid, create_time) -> ProcessInfo
+        self._checked = {}   # pid -> (create_time, last validated)
+        self._last_sweep = clock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, pid):
+        """Return ProcessInfo for a PID, or None if it has exited or can't be inspected."""
+        if not pid:
+            return None
+        now = self.clock()
+        with self._lock:
+            if now - self._last_sweep >= self.sweep_seconds:
+                self._sweep(now)
+            checked = self._checked.get(pid)
+            if checked is not None and now - checked[1] < self.revalidate_seconds:
+                info = self._entries.get((pid, checked[0]))
+                if info is not None:
+                    self.hits += 1
+                    return info
+
+        try:
+            create_time = psutil.Process(pid).create_time()
+        except _PROCESS_ERRORS:
+            with self._lock:
+                self._evict(pid)
+            return None
+
+        with self._lock:
+            info = self._entries.get((pid, create_time))
+            if info is not None:
+                self._checked[pid] = (create_time, now)
+                self.hits += 1
+                return info
+            # Unknown process, or the PID was reused by a new one
+            self._evict(pid)
+            self.misses += 1
+
+        info = self._inspect(pid, create_time)
+        if info is not None:
+            with self._lock:
+                if len(self._entries) >= self.max_entries:
+                    self._sweep(now)
+                    while len(self._entries) >= self.max_entries:
+                        self._evict(next(iter(self._checked)))
+                self._entries[(pid, create_time)] = info
+                self._checked[pid] = (create_time, now)
+        return info
+
+    def name(self, pid):
+        info = self.get(pid)
+        return info.name if info is not None else None
+
+    def _inspect(self, pid, create_time):
+        try:
+            process = psutil.Process(pid)
+            with process.oneshot():
+                name = process.name()
+                try:
+                    exe = process.exe()
+                except _PROCESS_ERRORS:
+                    exe = None
+                ppid = process.ppid()
+        except _PROCESS_ERRORS:
+            return None
+
+        # The parent's own entry already holds its ancestry, so shared parents
+        # (shell, session manager) are inspected once
+        parents = ()
+        if ppid and ppid != pid:
+            parent = self.get(ppid)
+            if parent is not None and pid not in (p for p, _ in parent.parents):
+                parents = ((parent.pid, parent.name),) + parent.parents[:MAX_PARENT_DEPTH - 1]
+        return ProcessInfo(pid, create_time, name, exe, parents)
+
+    def _evict(self, pid):
+        checked = self._checked.pop(pid, None)
+        if checked is not None and self._entries.pop((pid, checked[0]), None) is not None:
+            self.evictions += 1
+
+    def _sweep(self, now):
+        self._last_sweep = now
+        for pid in [pid for pid in self._checked if not psutil.pid_exists(pid)]:
+            self._evict(pid)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._entries)}
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_process_cache():
+    """Return the process-wide process info cache, creating it on first use."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ProcessInfoCache()
+        return _shared_cache
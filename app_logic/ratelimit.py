@@ -0,0 +1,113 @@
+# File: app_logic/ratelimit.py
+import re
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+
+DEFAULT_BURST = 3
+DEFAULT_BACKOFF_BASE_SECONDS = 1.0
+DEFAULT_BACKOFF_MAX_SECONDS = 60.0
+
+_DURATION_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*s?\s*$")
+
+
+class TokenBucket:
+    """
+    Client-side request rate limit: tokens refill at requests_per_minute / 60
+    per second up to burst, and every request takes one.
+    """
+
+    def __init__(self, requests_per_minute, burst=DEFAULT_BURST, clock=time.monotonic):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, min(burst, requests_per_minute))
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """Take a token if one is available; never blocks."""
+        with self._lock:
+            self._refill(self.clock())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def refund(self):
+        """Return a token taken for a request that was not sent after all."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+    def available_at(self):
+        """Clock time at which the next token is available."""
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            if self._tokens >= 1:
+                return now
+            return now + (1 - self._tokens) / self.rate
+
+
+class Backoff:
+    """
+    Exponential backoff with jitter after throttling (429) or server (5xx)
+    errors. A server's retry-after hint replaces the computed delay. Reset by
+    the next success.
+    """
+
+    def __init__(self, base_seconds=DEFAULT_BACKOFF_BASE_SECONDS, max_seconds=DEFAULT_BACKOFF_MAX_SECONDS,
+                 clock=time.monotonic, rng=random.random):
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.clock = clock
+        self.rng = rng
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._not_before = 0.0
+
+    def failure(self, retry_after=None):
+        """Record a throttled request and return how long to hold off."""
+        with self._lock:
+            self._failures += 1
+            if retry_after is not None:
+                # Spread out the retries of requests that were told the same thing
+                delay = retry_after + self.rng() * self.base_seconds
+            else:
+                delay = min(self.max_seconds, self.base_seconds * 2 ** (self._failures - 1))
+                delay = delay / 2 + self.rng() * delay / 2
+            self._not_before = max(self._not_before, self.clock() + delay)
+            return delay
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._not_before = 0.0
+
+    def available_at(self):
+        """Clock time before which no request should be sent."""
+        with self._lock:
+            return self._not_before
+
+
+def parse_retry_after(value):
+    """
+    Seconds to wait from a Retry-After header (delta seconds or HTTP date) or a
+    duration such as Google's retryDelay "37s". Returns None if unparseable.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return max(0.0, float(value))
+    match = _DURATION_RE.match(str(value))
+    if match:
+        return float(match.group(1))
+    try:
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
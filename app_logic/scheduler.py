@@ -0,0 +1,95 @@
+# File: app_logic/scheduler.py
+import time
+
+# Substrings of the active window title/process that mean the session is locked
+LOCK_SCREEN_MARKERS = (
+    "lockapp", "logonui",                       # Windows
+    "loginwindow", "screensaverengine",         # macOS
+    "xscreensaver", "gnome-screensaver", "light-locker", "i3lock", "xsecurelock",  # Linux
+)
+
+
+def is_lock_screen(title):
+    """True if the active window looks like a lock screen or screensaver."""
+    if not title:
+        return False
+    title_lower = title.lower()
+    return any(marker in title_lower for marker in LOCK_SCREEN_MARKERS)
+
+
+class AdaptivePoller:
+    """
+    Decides when to poll the active window next.
+    - Backs off exponentially from min_interval to max_interval while nothing changes
+    - Snaps back to min_interval as soon as the window changes
+    - Suspends monitoring (and AI checks) while the screen is locked or the user is idle,
+      polling only at max_interval to notice the user coming back
+    """
+
+    def __init__(self, min_interval=0.2, max_interval=2.0, backoff=2.0,
+                 idle_suspend_seconds=300, idle_source=None, idle_check_interval=1.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.idle_suspend_seconds = idle_suspend_seconds
+        self.idle_source = idle_source
+        self.idle_check_interval = idle_check_interval
+
+        self.interval = min_interval
+        self.suspended = False
+        self.suspend_reason = None
+        self._last_title = None
+        self._idle_seconds = None
+        self._last_idle_check = 0.0
+
+    def configure(self, settings):
+        """Apply polling bounds from a settings mapping."""
+        min_ms = settings.get("poll_interval_min_ms", self.min_interval * 1000)
+        max_ms = settings.get("poll_interval_max_ms", self.max_interval * 1000)
+        self.min_interval = max(min_ms, 10) / 1000.0
+        self.max_interval = max(max_ms / 1000.0, self.min_interval)
+        self.idle_suspend_seconds = settings.get("idle_suspend_seconds", self.idle_suspend_seconds)
+        self.interval = min(max(self.interval, self.min_interval), self.max_interval)
+
+    def _user_idle(self):
+        if not self.idle_source or not self.idle_suspend_seconds:
+            return False
+        now = time.monotonic()
+        # Idle time only needs coarse resolution; don't query the OS on every fast poll
+        if self._idle_seconds is None or now - self._last_idle_check >= self.idle_check_interval:
+            self._idle_seconds = self.idle_source()
+            self._last_idle_check = now
+        return self._idle_seconds is not None and self._idle_seconds >= self.idle_suspend_seconds
+
+    def tick(self, title):
+        """
+        Record the current active window title.
+        Returns (suspended, delay_seconds until the next poll).
+        """
+        if is_lock_screen(title):
+            reason = "screen locked"
+        elif self._user_idle():
+            reason = "user idle"
+        else:
+            reason = None
+
+        resumed = False
+        if reason != self.suspend_reason:
+            if reason:
+                print(f"Monitoring suspended ({reason})")
+            elif self.suspended:
+                print("Monitoring resumed")
+                resumed = True
+            self.suspend_reason = reason
+            self.suspended = reason is not None
+
+        changed = resumed or title != self._last_title
+        self._last_title = title
+
+        if self.suspended:
+            self.interval = self.max_interval
+        elif changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        return self.suspended, self.interval
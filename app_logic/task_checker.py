@@ -1,90 +1,316 @@
 import google.generativeai as genai
+import atexit
 import json
 import os
-import sys
 import logging
+import queue
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import config_manager
+from app_logic.backends import get_router
+from app_logic.metrics import span, timed, increment
+from app_logic.verdict_cache import get_verdict_cache
+from app_logic.preclassifier import get_local_classifier
 
-# Set up logging to user config directory to avoid bundle write issues
-try:
-    config_manager.ensure_config_directory_exists()
-    log_path = os.path.join(config_manager.CONFIG_DIR_PATH, 'keymind_ai.log')
-except Exception:
-    # Fallback to current directory if config path fails
-    log_path = 'keymind_ai.log'
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_path),
-        logging.StreamHandler()
-    ]
-)
+# Rotate the log file at this size, keeping this many old files
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+_log_listener = None
+
+def setup_logging():
+    """
+    Route log records through a queue so callers (classification workers,
+    the UI thread) never block on file or console writes. A background
+    listener writes them to a size-rotated file in the user config directory.
+    Per-request detail is logged at DEBUG; set KEYMIND_LOG_LEVEL=DEBUG to see it.
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return _log_listener
+
+    # Set up logging to user config directory to avoid bundle write issues
+    try:
+        config_manager.ensure_config_directory_exists()
+        log_path = os.path.join(config_manager.CONFIG_DIR_PATH, 'keymind_ai.log')
+    except Exception:
+        # Fallback to current directory if config path fails
+        log_path = 'keymind_ai.log'
+
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    file_handler = RotatingFileHandler(log_path, maxBytes=LOG_MAX_BYTES,
+                                       backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(os.environ.get("KEYMIND_LOG_LEVEL", "INFO").upper())
+
+    _log_listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _log_listener.start()
+    # Flush whatever is still queued on interpreter exit
+    atexit.register(_log_listener.stop)
+    return _log_listener
+
+setup_logging()
+
+MODEL_NAME = 'gemini-1.5-flash'
+# Deterministic, single-candidate answers; output length is capped per request
+GENERATION_CONFIG = {"temperature": 0, "candidate_count": 1}
+# Models (one per task's system instruction) kept configured at once
+MAX_MODELS = 8
 
 def get_api_key():
-    """Get Gemini API key from settings."""    
+    """Get Gemini API key from the in-memory settings snapshot."""
     try:
-        # Get the directory where the executable/script is located
-        if getattr(sys, 'frozen', False):
-            # If running as executable
-            base_path = os.path.dirname(sys.executable)
-        else:
-            # If running as script
-            base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            
-        settings_path = os.path.join(base_path, "user_config", "settings.json")
-        logging.info(f"Looking for settings at: {os.path.abspath(settings_path)}")
-        with open(settings_path, 'r') as f:
-            settings = json.load(f)
-            api_key = settings.get("api_key", "")
-            # Sanitize API key to avoid invalid header values
-            if isinstance(api_key, str):
-                api_key = api_key.strip()
-            if api_key:
-                logging.info("API key loaded successfully")
-            else:
-                logging.error("No API key found in settings.json")
-            return api_key
+        api_key = config_manager.get_settings().get("api_key", "")
+        # Sanitize API key to avoid invalid header values
+        if isinstance(api_key, str):
+            api_key = api_key.strip()
+        return api_key
     except Exception as e:
         logging.error(f"Error loading API key: {e}")
         return ""
 
-def check_relevance(task, activity):
-    """Check if current activity is relevant to the task using Gemini AI."""
-    logging.info(f"Checking relevance - Task: {task}, Activity: {activity}")
-    
-    api_key = get_api_key()
-    if not api_key:
-        logging.error("No API key found")
-        return None
-
+def _chunk_text(chunk):
+    """Text of one streamed response chunk ('' for chunks without text, e.g. the final one)."""
     try:
-        logging.info("Configuring Gemini AI")
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
-        prompt = f"""Your job is to figure out if the give task and the activity is relevent to each other. When figuring out their relevence you can catogorize them to different categories like study, programming, gaming, entertainment, work, etc. and then decide if they are relevent to each other or not.
-        Output ONLY the number 1 if relevant, or 0 if not relevant.
-        
-        Task: {task}
-        Activity: {activity}
+        return chunk.text
+    except ValueError:
+        return ""
+
+class GeminiClient:
+    """
+    Long-lived Gemini session shared by all relevance checks.
+    genai is configured once and a model is built once per system instruction
+    (i.e. per task); the underlying transport is reused across calls. Models
+    are rebuilt only when the API key in the settings snapshot changes.
+    """
+
+    def __init__(self, model_name=MODEL_NAME, endpoint=None):
+        self.model_name = model_name
+        # Optional alternative API endpoint (e.g. a proxy or a local stand-in for benchmarks)
+        self.endpoint = endpoint or os.environ.get("KEYMIND_GEMINI_ENDPOINT") or None
+        self._lock = threading.Lock()
+        self._models = OrderedDict()
+        self._api_key = None
+
+    def get_model(self, system_instruction=None):
+        """Return the model for this system instruction, reconfiguring only if the API key changed."""
+        api_key = get_api_key()
+        with self._lock:
+            if not api_key:
+                if self._api_key is not None:
+                    logging.error("No API key found in settings.json")
+                self._models.clear()
+                self._api_key = None
+                return None
+
+            if api_key != self._api_key:
+                logging.info("Configuring Gemini AI")
+                if self.endpoint:
+                    genai.configure(api_key=api_key, transport="rest",
+                                    client_options={"api_endpoint": self.endpoint})
+                else:
+                    genai.configure(api_key=api_key)
+                self._models.clear()
+                self._api_key = api_key
+
+            model = self._models.get(system_instruction)
+            if model is None:
+                model = genai.GenerativeModel(self.model_name, system_instruction=system_instruction,
+                                              generation_config=GENERATION_CONFIG)
+                self._models[system_instruction] = model
+                while len(self._models) > MAX_MODELS:
+                    self._models.popitem(last=False)
+            self._models.move_to_end(system_instruction)
+            return model
+
+    def generate_text(self, prompt, timeout=None, system_instruction=None, max_output_tokens=None, stop_when=None):
         """
-        
-        logging.info("Sending request to Gemini AI")
-        response = model.generate_content(prompt)
-        result = response.text.strip()
-        logging.info(f"Received response from Gemini AI: {result}")
+        Send a prompt and return the stripped response text, or None without an API key.
+        The response is streamed; if stop_when(text so far) returns True the rest
+        of the stream is not waited for.
+        """
+        model = self.get_model(system_instruction)
+        if model is None:
+            return None
+        request_options = {"timeout": timeout} if timeout else None
+        generation_config = {"max_output_tokens": max_output_tokens} if max_output_tokens else None
+        response = model.generate_content(prompt, generation_config=generation_config,
+                                          request_options=request_options, stream=True)
+        text = ""
+        for chunk in response:
+            text += _chunk_text(chunk)
+            if stop_when is not None and stop_when(text):
+                break
+        return text.strip()
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+def get_client():
+    """Return the process-wide Gemini client, creating it on first use."""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = GeminiClient()
+        return _shared_client
+
+# Output token budget per activity for batch answers ("[1, 0, ...]")
+BATCH_TOKENS_PER_ACTIVITY = 3
+
+@lru_cache(maxsize=16)
+def system_instruction(task):
+    """
+    The instructions and task, set up once per task as the system instruction
+    of a cached model on the client. The API still receives (and bills) it
+    with every request; the user message itself carries only the activities.
+    """
+    return f"""Your job is to figure out if the given task and the activities the user sends are relevant to each other. When figuring out their relevance you can categorize them into different categories like study, programming, gaming, entertainment, work, etc. and then decide if they are relevant to each other or not.
+Each message is either a single activity ("Activity: ...") or a numbered list of activities ("Activities:").
+For a single activity, output ONLY the number 1 if relevant, or 0 if not relevant.
+For a numbered list, output ONLY a JSON array with exactly one such number per activity, in the same order.
+
+Task: {task}"""
+
+def _has_verdict(text):
+    return text.lstrip()[:1] in ("0", "1")
+
+def _has_batch_verdicts(text):
+    return "]" in text
+
+@timed("check_relevance")
+def check_relevance(task, activity, cache_lookup=True):
+    """
+    Check if current activity is relevant to the task using Gemini AI.
+    Verdicts are served from and stored in the shared verdict cache; pass
+    cache_lookup=False when the caller has already missed the cache.
+    """
+    logging.debug("Checking relevance - Task: %s, Activity: %s", task, activity)
+
+    cache = get_verdict_cache()
+    if cache_lookup:
+        cached = cache.get(task, activity)
+        if cached is not None:
+            logging.debug("Cached verdict: %s", cached)
+            return cached
+
+    try:
+        logging.debug("Sending request to the classifier backends")
+        with span("ai_network"):
+            # Routed to the preferred healthy backend, hedged to the next one if it is slow.
+            # The answer is a single token; stop reading as soon as it arrives
+            result = get_router().generate_text(f"Activity: {activity}", system=system_instruction(task),
+                                                max_output_tokens=1, stop_when=_has_verdict)
+        if result is None:
+            return None
+        logging.debug("Received response from classifier: %s", result)
         
         # Convert response to integer (1 or 0)
         try:
-            result_int = int(result)
-            logging.info(f"Parsed result: {result_int}")
+            with span("ai_parse"):
+                result_int = int(result[:1])
+            logging.debug("Parsed result: %s", result_int)
+            cache.put(task, activity, result_int)
+            get_local_classifier().learn(task, activity, result_int)
             return result_int
         except ValueError:
             logging.error(f"Invalid AI response format: {result}")
             return None
             
     except Exception as e:
+        increment("ai_errors")
         print("Error checking relevance:", e)
         return None
+
+def parse_batch_response(text, expected):
+    """
+    Parse a batch response into a list of verdicts (1, 0 or None per activity).
+    Accepts a JSON array, optionally wrapped in a code fence, or one number per line.
+    """
+    if not text:
+        return [None] * expected
+
+    cleaned = text.strip().strip('`').strip()
+    if cleaned.lower().startswith('json'):
+        cleaned = cleaned[4:].strip()
+
+    try:
+        values = json.loads(cleaned)
+        if not isinstance(values, list):
+            values = None
+    except ValueError:
+        values = None
+
+    if values is None:
+        values = re.findall(r'(?:^|\s|:)([01])\s*$', cleaned, re.MULTILINE)
+
+    if len(values) != expected:
+        logging.error(f"Batch response has {len(values)} verdicts, expected {expected}: {text}")
+        return [None] * expected
+
+    verdicts = []
+    for value in values:
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            value = None
+        verdicts.append(value if value in (0, 1) else None)
+    return verdicts
+
+@timed("check_relevance_batch")
+def check_relevance_batch(task, activities, cache_lookup=True):
+    """
+    Check several activities against one task in a single Gemini request.
+    Returns one verdict per activity (1, 0 or None), in input order. Cached
+    verdicts are reused and only the misses are sent to the model.
+    """
+    logging.debug("Checking relevance batch - Task: %s, Activities: %d", task, len(activities))
+
+    cache = get_verdict_cache()
+    if cache_lookup:
+        verdicts = [cache.get(task, activity) for activity in activities]
+    else:
+        verdicts = [None] * len(activities)
+    pending = [i for i, verdict in enumerate(verdicts) if verdict is None]
+    if not pending:
+        return verdicts
+
+    if len(pending) == 1:
+        i = pending[0]
+        verdicts[i] = check_relevance(task, activities[i], cache_lookup=False)
+        return verdicts
+
+    try:
+        numbered = "\n".join(f"{n}. {activities[i]}" for n, i in enumerate(pending, start=1))
+        prompt = f"Activities:\n{numbered}"
+
+        logging.debug("Sending batch request to the classifier backends (%d activities)", len(pending))
+        with span("ai_network"):
+            result = get_router().generate_text(prompt, system=system_instruction(task),
+                                                max_output_tokens=BATCH_TOKENS_PER_ACTIVITY * len(pending) + 4,
+                                                stop_when=_has_batch_verdicts)
+        if result is None:
+            return verdicts
+        logging.debug("Received batch response from classifier: %s", result)
+
+        with span("ai_parse"):
+            parsed = parse_batch_response(result, len(pending))
+        local_classifier = get_local_classifier()
+        for i, verdict in zip(pending, parsed):
+            verdicts[i] = verdict
+            cache.put(task, activities[i], verdict)
+            local_classifier.learn(task, activities[i], verdict)
+        return verdicts
+
+    except Exception as e:
+        increment("ai_errors")
+        print("Error checking relevance batch:", e)
+        return verdicts
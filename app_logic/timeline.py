@@ -0,0 +1,242 @@
+# File: app_logic/timeline.py
+import os
+import sys
+import time
+import json
+import queue
+import logging
+import sqlite3
+import argparse
+import threading
+
+import config_manager
+
+DB_FILE_NAME = "timeline.db"
+DEFAULT_FLUSH_SECONDS = 5.0
+DEFAULT_BATCH_SIZE = 256
+
+
+def _open(db_path):
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sessions ("
+        " id INTEGER PRIMARY KEY,"
+        " task TEXT NOT NULL,"
+        " title TEXT NOT NULL,"
+        " process TEXT,"
+        " verdict INTEGER,"
+        " source TEXT,"
+        " start REAL NOT NULL,"
+        " end REAL NOT NULL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS sessions_start ON sessions (start)")
+    conn.execute("CREATE INDEX IF NOT EXISTS sessions_task_start ON sessions (task, start)")
+    conn.commit()
+    return conn
+
+
+class TimelineStore:
+    """
+    Append-only record of focus sessions: one row per stretch of time a window
+    was active during a task, with its verdict and where the verdict came from.
+    The open session lives in memory; finished sessions are queued and written
+    in batches by a background thread, so callers never wait on disk.
+    """
+
+    def __init__(self, db_path=None, flush_seconds=DEFAULT_FLUSH_SECONDS, batch_size=DEFAULT_BATCH_SIZE):
+        self.db_path = db_path or os.path.join(config_manager.CONFIG_DIR_PATH, DB_FILE_NAME)
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+
+        self._lock = threading.Lock()
+        self._current = None
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._closed = False
+
+        self.sessions_written = 0
+
+    def switch(self, task, title, process=None, verdict=None, source=None, now=None):
+        """End the open session (if any) and start one for the newly active window."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._finish(now)
+            self._current = [task, title, process, verdict, source, now]
+        self._ensure_writer()
+
+    def set_verdict(self, title, verdict, source):
+        """Attach a verdict that arrived after the session started (e.g. from the AI)."""
+        with self._lock:
+            if self._current is not None and self._current[1] == title:
+                self._current[3] = verdict
+                self._current[4] = source
+
+    def end(self, now=None):
+        """End the open session, e.g. when monitoring stops."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._finish(now)
+
+    def _finish(self, now):
+        if self._current is None:
+            return
+        task, title, process, verdict, source, start = self._current
+        self._current = None
+        if now > start:
+            self._queue.put((task, title, process, verdict, source, start, now))
+
+    def _ensure_writer(self):
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._run, name="keymind-timeline", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            conn = _open(self.db_path)
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Activity timeline unavailable ({self.db_path}): {e}")
+            return
+        try:
+            while True:
+                batch = []
+                deadline = time.monotonic() + self.flush_seconds
+                stop = False
+                while len(batch) < self.batch_size:
+                    try:
+                        row = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if row is None:
+                        stop = True
+                        break
+                    batch.append(row)
+                if batch:
+                    self._write(conn, batch)
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _write(self, conn, batch):
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO sessions (task, title, process, verdict, source, start, end)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+            self.sessions_written += len(batch)
+        except sqlite3.Error as e:
+            logging.error(f"Activity timeline write failed: {e}")
+
+    def close(self, now=None):
+        """End the open session and wait for queued sessions to be written."""
+        self.end(now)
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is None:
+            # Nothing has started the writer yet, but sessions may still be queued
+            thread = threading.Thread(target=self._run, daemon=True)
+            thread.start()
+        self._queue.put(None)
+        thread.join(timeout=10)
+
+
+_shared_timeline = None
+_shared_lock = threading.Lock()
+
+
+def get_timeline():
+    """Return the process-wide timeline store, creating it on first use."""
+    global _shared_timeline
+    with _shared_lock:
+        if _shared_timeline is None:
+            _shared_timeline = TimelineStore()
+        return _shared_timeline
+
+
+def report(conn, since=None, until=None, by_day=False):
+    """
+    Aggregate focused (verdict 1), distracted (verdict 0) and unchecked time
+    per task, optionally per local calendar day of the session start.
+    Returns a list of dicts ordered by task (and day).
+    """
+    day = "date(start, 'unixepoch', 'localtime')" if by_day else "NULL"
+    clauses, params = [], []
+    if since is not None:
+        clauses.append("start >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("start < ?")
+        params.append(until)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = conn.execute(
+        f"SELECT task, {day} AS day,"
+        " SUM(CASE WHEN verdict = 1 THEN end - start ELSE 0 END),"
+        " SUM(CASE WHEN verdict = 0 THEN end - start ELSE 0 END),"
+        " SUM(CASE WHEN verdict IS NULL THEN end - start ELSE 0 END),"
+        " COUNT(*)"
+        f" FROM sessions {where} GROUP BY task, day ORDER BY task, day", params).fetchall()
+    results = []
+    for task, day, focused, distracted, unchecked, sessions in rows:
+        checked = focused + distracted
+        results.append({
+            "task": task, "day": day, "sessions": sessions,
+            "focused_seconds": focused, "distracted_seconds": distracted, "unchecked_seconds": unchecked,
+            "focus_rate": focused / checked if checked else None,
+        })
+    return results
+
+
+def _format_duration(seconds):
+    minutes = int(round(seconds / 60.0))
+    return f"{minutes // 60}h{minutes % 60:02d}m"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report focused vs distracted time from the activity timeline.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rep = sub.add_parser("report", help="aggregate time per task")
+    rep.add_argument("--db", default=None, help="timeline database (default: the user config one)")
+    rep.add_argument("--days", type=float, default=7.0, help="only sessions from the last N days (0 for all)")
+    rep.add_argument("--by-day", action="store_true", help="break totals down per day")
+    rep.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    db_path = args.db or os.path.join(config_manager.CONFIG_DIR_PATH, DB_FILE_NAME)
+    if not os.path.exists(db_path):
+        print(f"No activity timeline found at {db_path}")
+        return 1
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    try:
+        since = time.time() - args.days * 86400 if args.days else None
+        rows = report(conn, since=since, by_day=args.by_day)
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps(rows, indent=4))
+        return 0
+
+    if not rows:
+        print("No focus sessions recorded in that period")
+        return 0
+    for row in rows:
+        label = f"{row['day']}  {row['task']}" if args.by_day else row["task"]
+        rate = f"{row['focus_rate']:.0%}" if row["focus_rate"] is not None else "n/a"
+        print(f"{label}\n    focused {_format_duration(row['focused_seconds'])}, "
+              f"distracted {_format_duration(row['distracted_seconds'])}, "
+              f"unchecked {_format_duration(row['unchecked_seconds'])} "
+              f"({rate} focused, {row['sessions']} sessions)")
+    print(f"Report built in {elapsed * 1000:.0f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,180 @@
+# File: app_logic/verdict_cache.py
+import os
+import time
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import config_manager
+
+DB_FILE_NAME = "verdicts.db"
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+
+def make_key(task, activity):
+    """Normalize a (task, activity) pair into the key used by both cache tiers."""
+    return (" ".join((task or "").split()).casefold(),
+            " ".join((activity or "").split()).casefold())
+
+
+class VerdictCache:
+    """
+    Two-tier cache of relevance verdicts keyed on (task, activity).
+    - Tier 1: in-memory LRU with TTL, answers repeat window switches without I/O
+    - Tier 2: SQLite store under the config directory, survives restarts
+    """
+
+    def __init__(self, db_path=None, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.db_path = db_path or os.path.join(config_manager.CONFIG_DIR_PATH, DB_FILE_NAME)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_disabled = False
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _connection(self):
+        """Open the SQLite store on first use. Returns None if the disk tier is unavailable."""
+        if self._conn is not None or self._disk_disabled:
+            return self._conn
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts ("
+                " task TEXT NOT NULL,"
+                " activity TEXT NOT NULL,"
+                " verdict INTEGER NOT NULL,"
+                " stored_at REAL NOT NULL,"
+                " PRIMARY KEY (task, activity))"
+            )
+            conn.commit()
+            self._conn = conn
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Verdict cache disk tier unavailable ({self.db_path}): {e}")
+            self._disk_disabled = True
+        return self._conn
+
+    def _is_fresh(self, stored_at, now):
+        return self.ttl_seconds is None or now - stored_at < self.ttl_seconds
+
+    def _remember(self, key, verdict, stored_at):
+        self._memory[key] = (verdict, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, task, activity):
+        """Return the cached verdict (1 or 0) for this pair, or None on a miss."""
+        key = make_key(task, activity)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                verdict, stored_at = entry
+                if self._is_fresh(stored_at, now):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return verdict
+                del self._memory[key]
+
+            conn = self._connection()
+            if conn is not None:
+                try:
+                    row = conn.execute(
+                        "SELECT verdict, stored_at FROM verdicts WHERE task = ? AND activity = ?",
+                        key
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logging.error(f"Verdict cache read failed: {e}")
+                    row = None
+                if row is not None and self._is_fresh(row[1], now):
+                    self._remember(key, row[0], row[1])
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, task, activity, verdict):
+        """Store a verdict in both tiers. Only definite verdicts (1 or 0) are cached."""
+        if verdict not in (0, 1):
+            return
+        key = make_key(task, activity)
+        now = time.time()
+        with self._lock:
+            self._remember(key, verdict, now)
+            conn = self._connection()
+            if conn is not None:
+                try:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO verdicts (task, activity, verdict, stored_at) VALUES (?, ?, ?, ?)",
+                        (key[0], key[1], verdict, now)
+                    )
+                    conn.commit()
+                except sqlite3.Error as e:
+                    logging.error(f"Verdict cache write failed: {e}")
+
+    def invalidate_task(self, task):
+        """Drop every cached verdict for the given task from both tiers."""
+        task_key = make_key(task, "")[0]
+        with self._lock:
+            for key in [k for k in self._memory if k[0] == task_key]:
+                del self._memory[key]
+            conn = self._connection()
+            if conn is not None:
+                try:
+                    conn.execute("DELETE FROM verdicts WHERE task = ?", (task_key,))
+                    conn.commit()
+                except sqlite3.Error as e:
+                    logging.error(f"Verdict cache invalidation failed: {e}")
+
+    def clear(self):
+        """Drop every cached verdict from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            conn = self._connection()
+            if conn is not None:
+                try:
+                    conn.execute("DELETE FROM verdicts")
+                    conn.commit()
+                except sqlite3.Error as e:
+                    logging.error(f"Verdict cache clear failed: {e}")
+
+    def stats(self):
+        """Return hit/miss counters for both tiers."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_verdict_cache():
+    """Return the process-wide verdict cache, creating it on first use."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = VerdictCache()
+        return _shared_cache
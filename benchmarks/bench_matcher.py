@@ -0,0 +1,95 @@
+"""
+Micro-benchmark: compiled PatternMatcher vs the original per-list `any(...)` loops.
+
+Usage: python benchmarks/bench_matcher.py [--patterns 300] [--titles 2000]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_logic.matcher import PatternMatcher  # noqa: E402
+
+
+def _word(rng, low=4, high=12):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+
+def make_lists(rng, size):
+    return {
+        "allowed": [_word(rng) for _ in range(size)],
+        "banned": [_word(rng) for _ in range(size)],
+        "browsers": ["chrome", "firefox", "opera", "microsoft edge", "brave", "safari"],
+    }
+
+
+def make_titles(rng, lists, count):
+    titles = []
+    for _ in range(count):
+        words = [_word(rng, 3, 9).capitalize() for _ in range(rng.randint(3, 8))]
+        # Roughly a third of titles hit one of the lists, like real usage
+        if rng.random() < 0.33:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(lists[rng.choice(list(lists))]).title())
+        titles.append(" - ".join(words))
+    return titles
+
+
+def loops_check(title, allowed, banned, browsers):
+    """The original checks from App.update_window_title and App._close_activity."""
+    in_allowed = any(allowed_app.lower() in title.lower() for allowed_app in allowed)
+    in_banned = not in_allowed and any(banned_app.lower() in title.lower() for banned_app in banned)
+    is_browser = any(browser.lower() in title.lower() for browser in browsers)
+    return in_allowed, in_banned, is_browser
+
+
+def matcher_check(title, matcher):
+    matched = matcher.match(title)
+    in_allowed = "allowed" in matched
+    return in_allowed, not in_allowed and "banned" in matched, "browsers" in matched
+
+
+def bench(fn, titles, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for title in titles:
+            fn(title)
+        best = min(best, time.perf_counter() - start)
+    return best / len(titles) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--patterns", type=int, default=300, help="entries per allowed/banned list")
+    parser.add_argument("--titles", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    lists = make_lists(rng, args.patterns)
+    titles = make_titles(rng, lists, args.titles)
+
+    start = time.perf_counter()
+    matcher = PatternMatcher(lists)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    for title in titles:
+        assert matcher_check(title, matcher) == loops_check(title, lists["allowed"], lists["banned"], lists["browsers"]), title
+
+    loops_us = bench(lambda t: loops_check(t, lists["allowed"], lists["banned"], lists["browsers"]), titles, args.repeat)
+    matcher_us = bench(lambda t: matcher_check(t, matcher), titles, args.repeat)
+
+    print(f"patterns per list: {args.patterns}, titles: {args.titles}")
+    print(f"matcher build:     {build_ms:.2f} ms (once per settings change)")
+    print(f"any() loops:       {loops_us:.2f} us/title")
+    print(f"PatternMatcher:    {matcher_us:.2f} us/title")
+    print(f"speedup:           {loops_us / matcher_us:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Local stand-in for the Gemini generateContent REST endpoint (and for an
+OpenAI-compatible /chat/completions endpoint, as served by local models).
+
+Verdicts are deterministic: an activity is "not relevant" (0) if it contains
+one of DISTRACTING_WORDS, otherwise relevant (1). Latency and error rates are
+configurable so the client's behaviour under slow or failing backends can be
+measured.
+
+Usage: python benchmarks/fake_gemini.py --port 8765 --latency-ms 300 --error-rate 0.02
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DISTRACTING_WORDS = ("youtube", "netflix", "reddit", "twitch", "steam", "instagram", "facebook", "tiktok", "game")
+
+_ACTIVITY_RE = re.compile(r"^\s*Activity:\s*(.+?)\s*$", re.MULTILINE)
+_NUMBERED_RE = re.compile(r"^\s*\d+\.\s*(.+?)\s*$", re.MULTILINE)
+
+
+def verdict_for(activity):
+    activity = activity.lower()
+    return 0 if any(word in activity for word in DISTRACTING_WORDS) else 1
+
+
+def answer_for(prompt):
+    """Build the model's text answer for a single or batched relevance prompt."""
+    if "Activities:" in prompt:
+        activities = _NUMBERED_RE.findall(prompt.split("Activities:", 1)[1])
+        return json.dumps([verdict_for(a) for a in activities])
+    match = _ACTIVITY_RE.search(prompt)
+    return str(verdict_for(match.group(1) if match else prompt.strip().splitlines()[-1]))
+
+
+class LatencyModel:
+    """Log-normal latency with a configurable median and tail, plus random errors."""
+
+    def __init__(self, median_ms=300.0, sigma=0.5, error_rate=0.0, quota_error_rate=0.0, seed=None):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.quota_error_rate = quota_error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self):
+        """Return (delay seconds, HTTP status) for one request."""
+        with self._lock:
+            delay = self._rng.lognormvariate(0, self.sigma) * self.median_ms / 1000.0 if self.median_ms else 0.0
+            roll = self._rng.random()
+        if roll < self.quota_error_rate:
+            return delay, 429
+        if roll < self.quota_error_rate + self.error_rate:
+            return delay, 500
+        return delay, 200
+
+
+class FakeGeminiServer:
+    """Threaded HTTP server answering generateContent, streamGenerateContent and chat completions calls."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=None):
+        self.latency = latency or LatencyModel()
+        self.requests = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.last_request = None
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                delay, status = server.latency.sample()
+                with server._lock:
+                    server.requests += 1
+                    if status != 200:
+                        server.errors += 1
+                time.sleep(delay)
+
+                if status != 200:
+                    payload = json.dumps({"error": {"code": status, "message": "fake error",
+                                                    "status": "RESOURCE_EXHAUSTED" if status == 429 else "INTERNAL"}})
+                    self._send(status, payload.encode(), "application/json", {"Retry-After": "1"} if status == 429 else None)
+                    return
+
+                if self.path.endswith("/chat/completions"):
+                    prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+                    response = {"object": "chat.completion", "model": body.get("model", ""),
+                                "choices": [{"index": 0, "finish_reason": "stop",
+                                             "message": {"role": "assistant", "content": answer_for(prompt)}}]}
+                    self._send(200, json.dumps(response).encode(), "application/json")
+                    return
+
+                prompt = "\n".join(part.get("text", "") for content in body.get("contents", [])
+                                   for part in content.get("parts", []))
+                system = " ".join(part.get("text", "") for part in
+                                  (body.get("systemInstruction") or body.get("system_instruction") or {}).get("parts", []))
+                text = answer_for(prompt)
+                # One character per "token" is close enough for the short verdict answers
+                max_tokens = (body.get("generationConfig") or body.get("generation_config") or {}).get(
+                    "maxOutputTokens") or (body.get("generationConfig") or body.get("generation_config") or {}).get(
+                    "max_output_tokens")
+                finish = "STOP"
+                if max_tokens and len(text) > int(max_tokens):
+                    text, finish = text[:int(max_tokens)], "MAX_TOKENS"
+                prompt_tokens = len(prompt.split()) + len(system.split())
+                response = {
+                    "candidates": [{"content": {"parts": [{"text": text}], "role": "model"},
+                                    "finishReason": finish, "index": 0}],
+                    "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": len(text),
+                                      "totalTokenCount": prompt_tokens + len(text)},
+                }
+                with server._lock:
+                    server.prompt_tokens += prompt_tokens
+                    server.last_request = body
+                if ":streamGenerateContent" in self.path:
+                    # Server-sent events with alt=sse, otherwise a streamed JSON array (as the REST client expects)
+                    if "alt=sse" in self.path:
+                        self._send(200, f"data: {json.dumps(response)}\r\n\r\n".encode(), "text/event-stream")
+                    else:
+                        self._send(200, json.dumps([response]).encode(), "application/json")
+                else:
+                    self._send(200, json.dumps(response).encode(), "application/json")
+
+            def _send(self, status, data, content_type, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def endpoint(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-gemini", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Gemini API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="median response latency")
+    parser.add_argument("--sigma", type=float, default=0.5, help="log-normal spread of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 500")
+    parser.add_argument("--quota-error-rate", type=float, default=0.0, help="fraction of requests failing with 429")
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(args.host, args.port, LatencyModel(args.latency_ms, args.sigma, args.error_rate, args.quota_error_rate))
+    print(f"Fake Gemini listening on {server.endpoint} (set KEYMIND_GEMINI_ENDPOINT to use it)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Import-time benchmark for KeyMind's startup path.
+
+Runs each entry point in a fresh interpreter with `python -X importtime` and
+reports its cumulative import time and the slowest modules it pulled in, as
+JSON. The "startup" group is what main.py imports before the window is shown;
+"deferred" is loaded right after; "warm" is preloaded on a background thread.
+
+Usage:
+    python benchmarks/import_time.py --out imports.json
+    python benchmarks/import_time.py --compare imports.json --repeat 5
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Mirrors main.py: module-level imports, _finish_startup, WARM_IMPORTS
+GROUPS = {
+    "startup": ["customtkinter", "config_manager", "app_logic.metrics"],
+    "deferred": ["app_logic.monitor", "app_logic.pipeline", "app_logic.prewarm",
+                 "app_logic.scheduler", "app_logic.timeline"],
+    "warm": ["app_logic.task_checker", "app_logic.enforcement", "pyautogui"],
+}
+
+
+def measure(modules, previous=()):
+    """
+    Import `previous` then `modules` in a fresh interpreter. A module that
+    fails to import (e.g. pyautogui without a display) is reported, not fatal.
+    Returns (total microseconds for `modules`, {module: cumulative us}, error or None).
+    """
+    guarded = "try:\n    import {0}\nexcept Exception as e:\n    sys.stdout.write('{0}: %r\\n' % e)\n"
+    code = "import sys\n" + "".join(guarded.format(m) for m in previous)
+    code += "sys.stderr.write('--- measured ---\\n')\n" + "".join(guarded.format(m) for m in modules)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT_DIR,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None, {}, proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+    failed = [line for line in proc.stdout.splitlines() if line.split(":", 1)[0] in modules]
+
+    lines = proc.stderr.split("--- measured ---", 1)[-1].splitlines()
+    total = 0
+    cumulative = {}
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not cum.isdigit():
+            continue
+        cumulative[name] = int(cum)
+        # Top-level entries have no indentation; their cumulative time covers their children
+        if not line.split("|")[2].startswith("  "):
+            total += int(cum)
+    return total, cumulative, "; ".join(failed) or None
+
+
+def run(repeat, top):
+    results = {}
+    previous = []
+    for group, modules in GROUPS.items():
+        totals = []
+        slowest = {}
+        error = None
+        for _ in range(repeat):
+            total, cumulative, error = measure(modules, previous)
+            if total is None:
+                break
+            totals.append(total)
+            for name, us in cumulative.items():
+                slowest[name] = min(us, slowest.get(name, us))
+        results[group] = {
+            "modules": modules,
+            "median_ms": statistics.median(totals) / 1000.0 if totals else None,
+            "slowest": {name: us / 1000.0 for name, us in
+                        sorted(slowest.items(), key=lambda item: item[1], reverse=True)[:top]},
+            "error": error,
+        }
+        previous += modules
+    return results
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    print(f"Compared with {baseline_path} ({baseline.get('revision') or 'unknown revision'}):")
+    for group in GROUPS:
+        old = (baseline.get("groups", {}).get(group) or {}).get("median_ms")
+        new = current["groups"][group]["median_ms"]
+        if isinstance(old, (int, float)) and isinstance(new, (int, float)):
+            change = f"{(new - old) / old:+.1%}" if old else "n/a"
+            print(f"  {group:<10} {old:>9.1f} ms -> {new:>9.1f} ms  ({change})")
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time of KeyMind's startup path.")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per group (median is reported)")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list per group")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    args = parser.parse_args()
+
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.system(),
+        "groups": run(max(1, args.repeat), args.top),
+    }
+    print(json.dumps(results, indent=4))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=4)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
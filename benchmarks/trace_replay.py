@@ -0,0 +1,331 @@
+"""
+Trace-replay benchmark for KeyMind's decision path.
+
+Replays a window-switch trace through FocusPipeline (the same path as
+the app's monitor thread) against a local fake Gemini server, without Tk or
+real windows, and reports time-to-verdict percentiles, API calls per hour,
+cache hit rate, CPU time and thread count as JSON.
+
+Usage:
+    python benchmarks/trace_replay.py --out results.json
+    python benchmarks/trace_replay.py --trace my_trace.jsonl --latency-ms 500 --error-rate 0.05
+    python benchmarks/trace_replay.py --compare baseline.json --out results.json
+    python benchmarks/trace_replay.py --local-latency-ms 80 --error-rate 0.2
+    python benchmarks/trace_replay.py record --out my_trace.jsonl --duration 600
+
+Traces are JSON lines: {"t": <seconds since start>, "title": "<active window title>"}.
+Trace time is compressed by --speed; use --speed 1 for faithful timing.
+--local-latency-ms adds a second fake server as the "local" OpenAI-compatible
+classifier backend, so hedging and failover can be measured.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import config_manager  # noqa: E402
+from fake_gemini import FakeGeminiServer, LatencyModel  # noqa: E402
+
+BENCH_TASK = "Writing the quarterly report in Python"
+
+RELEVANT_TITLES = [
+    "report.py - Visual Studio Code", "pandas.DataFrame.groupby - pandas documentation - Mozilla Firefox",
+    "python - How to pivot a dataframe - Stack Overflow - Google Chrome", "Q3 figures.xlsx - Excel",
+    "quarterly-report - GitHub - Google Chrome", "matplotlib.pyplot.bar - Matplotlib documentation - Mozilla Firefox",
+    "Jupyter Notebook - analysis.ipynb - Google Chrome", "Quarterly report draft - Google Docs - Google Chrome",
+]
+DISTRACTING_TITLES = [
+    "Lo-fi beats to study to - YouTube - Google Chrome", "Home - Netflix - Mozilla Firefox",
+    "r/programming - Reddit - Google Chrome", "Library - Steam", "Just Chatting - Twitch - Google Chrome",
+    "Instagram - Google Chrome",
+]
+ALLOWED_TITLES = ["Terminal", "File Explorer - explorer.exe", "Task Manager"]
+
+
+def synthetic_trace(duration, seed=0):
+    """A day-like trace: long focus stretches, distractions, and quick alt-tab flickers."""
+    rng = random.Random(seed)
+    population = RELEVANT_TITLES * 3 + DISTRACTING_TITLES + ALLOWED_TITLES
+    events = []
+    t = 0.0
+    while t < duration:
+        title = rng.choice(population)
+        # Some titles carry volatile counters, like notification badges
+        if rng.random() < 0.15:
+            title = f"({rng.randint(1, 9)}) {title}"
+        events.append({"t": round(t, 3), "title": title})
+        # 40% quick flickers while alt-tabbing, otherwise minutes-long stays
+        t += rng.uniform(0.1, 1.0) if rng.random() < 0.4 else rng.expovariate(1 / 45.0)
+    return events
+
+
+def load_trace(path):
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def isolate_config(directory, local_model_url="", requests_per_minute=0):
+    """Point KeyMind's config, caches and logs at a throwaway directory."""
+    config_manager.CONFIG_DIR_PATH = directory
+    config_manager.SETTINGS_FILE_PATH = os.path.join(directory, config_manager.SETTINGS_FILE_NAME)
+    settings = config_manager.get_default_settings()
+    settings["api_key"] = "benchmark-key"
+    settings["browsers"] = ["chrome", "firefox"]
+    settings["local_model_url"] = local_model_url
+    # Keyed by title only: don't pick up the sessions of browsers on this machine
+    settings["browser_session_urls"] = False
+    settings["gemini_requests_per_minute"] = requests_per_minute
+    with open(config_manager.SETTINGS_FILE_PATH, "w") as f:
+        json.dump(settings, f, indent=4)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def replay(events, args):
+    from app_logic.pipeline import FocusPipeline, SOURCE_AI
+    from app_logic.canonical import canonicalize
+    from app_logic.verdict_cache import get_verdict_cache
+    from app_logic.batching import get_batcher
+    from app_logic.metrics import get_registry
+    from app_logic.backends import get_router
+    import app_logic.task_checker  # noqa: F401  (starts the queued log listener on import)
+
+    # Logging is queued off-thread, but keep even that out of the measurements unless asked for
+    if not os.environ.get("KEYMIND_LOG_LEVEL"):
+        logging.getLogger().setLevel(logging.WARNING)
+
+    lock = threading.Lock()
+    pending = {}
+    ttv_ms = []
+    unanswered = [0]
+
+    def on_ai_verdict(activity, verdict):
+        done = time.perf_counter()
+        with lock:
+            starts = pending.pop(activity, [])
+            if verdict is None:
+                unanswered[0] += len(starts)
+                return
+            ttv_ms.extend((done - start) * 1000 for start in starts)
+
+    pipeline = FocusPipeline(on_ai_verdict=on_ai_verdict)
+    pipeline.start(args.task)
+
+    max_threads = threading.active_count()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    t0 = events[0]["t"] if events else 0.0
+
+    def feed(title, t):
+        target = wall_start + (t - t0) / args.speed
+        delay = target - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        start = time.perf_counter()
+        decision = pipeline.observe(title, now=t)
+        if decision is not None and decision.source is not None:
+            if decision.source == SOURCE_AI:
+                with lock:
+                    # AI verdicts are reported under the activity's canonical key
+                    pending.setdefault(canonicalize(title), []).append(start)
+            else:
+                with lock:
+                    ttv_ms.append((time.perf_counter() - start) * 1000)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i, event in enumerate(events):
+            feed(event["title"], event["t"])
+            # Poll while the window stays focused, as the app does, so dwell and cooldown checks fire
+            next_t = events[i + 1]["t"] if i + 1 < len(events) else event["t"]
+            t = event["t"]
+            while True:
+                due = pipeline.seconds_until_due(t)
+                if due is None or t + due >= next_t:
+                    break
+                t += due
+                feed(event["title"], t)
+            max_threads = max(max_threads, threading.active_count())
+
+        # Let in-flight AI requests finish
+        deadline = time.perf_counter() + args.drain_seconds
+        while time.perf_counter() < deadline:
+            batch_stats = get_batcher().stats()
+            if not batch_stats["pending"] and not batch_stats["in_flight"]:
+                break
+            time.sleep(0.05)
+            max_threads = max(max_threads, threading.active_count())
+
+    with lock:
+        cancelled_or_stale = sum(len(starts) for starts in pending.values())
+
+    trace_hours = max((events[-1]["t"] - t0) / 3600.0, 1e-9) if events else 1e-9
+    return {
+        "time_to_verdict_ms": {
+            "count": len(ttv_ms),
+            "p50": percentile(ttv_ms, 50),
+            "p90": percentile(ttv_ms, 90),
+            "p99": percentile(ttv_ms, 99),
+            "max": max(ttv_ms) if ttv_ms else None,
+        },
+        "verdict_sources": dict(pipeline.source_counts),
+        "ai_unanswered": unanswered[0],
+        "ai_cancelled_or_pending": cancelled_or_stale,
+        "cache": get_verdict_cache().stats(),
+        "classification_queue": get_batcher().stats(),
+        "spans": get_registry().summary(),
+        "backends": get_router().stats(),
+        "cpu_time_s": time.process_time() - cpu_start,
+        "wall_time_s": time.perf_counter() - wall_start,
+        "max_threads": max_threads,
+        "trace_hours": trace_hours,
+    }
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    rows = [
+        ("p50 time-to-verdict (ms)", ("time_to_verdict_ms", "p50")),
+        ("p99 time-to-verdict (ms)", ("time_to_verdict_ms", "p99")),
+        ("API calls per hour", ("api_calls_per_hour",)),
+        ("cache hit rate", ("cache", "hit_rate")),
+        ("CPU time (s)", ("cpu_time_s",)),
+        ("max threads", ("max_threads",)),
+    ]
+    print(f"Compared with {baseline_path} ({baseline.get('revision') or 'unknown revision'}):")
+    for label, path in rows:
+        old, new = baseline, current
+        for key in path:
+            old = old.get(key) if isinstance(old, dict) else None
+            new = new.get(key) if isinstance(new, dict) else None
+        if isinstance(old, (int, float)) and isinstance(new, (int, float)):
+            change = f"{(new - old) / old:+.1%}" if old else "n/a"
+            print(f"  {label:<26} {old:>10.3f} -> {new:>10.3f}  ({change})")
+
+
+def record(args):
+    """Record the real active-window title to a trace file."""
+    from app_logic import WindowMonitor
+
+    monitor = WindowMonitor()
+    start = time.monotonic()
+    last = None
+    count = 0
+    with open(args.out, "w") as f:
+        try:
+            while time.monotonic() - start < args.duration:
+                title = monitor.get_active_window_title()
+                if title and title != last:
+                    f.write(json.dumps({"t": round(time.monotonic() - start, 3), "title": title}) + "\n")
+                    f.flush()
+                    last = title
+                    count += 1
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            pass
+    monitor.stop()
+    print(f"Recorded {count} window switches to {args.out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay window-switch traces through KeyMind's decision path.")
+    sub = parser.add_subparsers(dest="command")
+
+    rec = sub.add_parser("record", help="record a trace from the real desktop")
+    rec.add_argument("--out", required=True)
+    rec.add_argument("--duration", type=float, default=600.0, help="seconds to record")
+    rec.add_argument("--interval", type=float, default=0.2, help="polling interval in seconds")
+
+    parser.add_argument("--trace", help="JSON-lines trace file (default: synthetic)")
+    parser.add_argument("--duration", type=float, default=1800.0, help="synthetic trace length in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--speed", type=float, default=20.0, help="trace time compression factor")
+    parser.add_argument("--task", default=BENCH_TASK)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="fake Gemini median latency")
+    parser.add_argument("--sigma", type=float, default=0.5, help="fake Gemini latency spread (log-normal)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500 responses")
+    parser.add_argument("--quota-error-rate", type=float, default=0.0, help="fraction of 429 responses")
+    parser.add_argument("--requests-per-minute", type=float, default=0.0,
+                        help="client-side Gemini rate limit in trace time (default: unlimited)")
+    parser.add_argument("--local-latency-ms", type=float,
+                        help="also serve a fake local model backend with this median latency")
+    parser.add_argument("--drain-seconds", type=float, default=10.0, help="max wait for in-flight requests at the end")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args)
+        return
+
+    events = load_trace(args.trace) if args.trace else synthetic_trace(args.duration, args.seed)
+
+    workdir = tempfile.mkdtemp(prefix="keymind-bench-")
+    server = FakeGeminiServer(latency=LatencyModel(args.latency_ms, args.sigma, args.error_rate,
+                                                   args.quota_error_rate, seed=args.seed)).start()
+    local_server = None
+    if args.local_latency_ms is not None:
+        local_server = FakeGeminiServer(latency=LatencyModel(args.local_latency_ms, args.sigma,
+                                                             seed=args.seed + 1)).start()
+    # The limiter runs on wall-clock time, so scale the quota by the trace speed-up
+    isolate_config(workdir, local_server.endpoint if local_server else "", args.requests_per_minute * args.speed)
+    os.environ["KEYMIND_GEMINI_ENDPOINT"] = server.endpoint
+    try:
+        results = replay(events, args)
+    finally:
+        server.stop()
+        if local_server is not None:
+            local_server.stop()
+
+    results.update({
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "trace": args.trace or f"synthetic(duration={args.duration}, seed={args.seed})",
+        "events": len(events),
+        "speed": args.speed,
+        "fake_gemini": {"latency_ms": args.latency_ms, "sigma": args.sigma,
+                        "error_rate": args.error_rate, "quota_error_rate": args.quota_error_rate},
+        "api_calls": server.requests,
+        "api_errors": server.errors,
+        "api_calls_per_hour": server.requests / results["trace_hours"],
+    })
+    if local_server is not None:
+        results.update({"local_latency_ms": args.local_latency_ms, "local_calls": local_server.requests})
+
+    print(json.dumps(results, indent=4))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=4)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
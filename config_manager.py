@@ -2,7 +2,13 @@
 import os
 import sys
 import json
+import time
+import ctypes
+import ctypes.util
 import platform
+import struct
+import threading
+from types import MappingProxyType
 
 # Define the directory and file for storing configuration
 CONFIG_DIR_NAME = "user_config"
@@ -49,7 +55,36 @@ def get_default_settings():
             # macOS (Finder, System Settings, Spotlight, etc.)
             "Finder", "System Settings", "Activity Monitor", "Spotlight", "Launchpad",
             "Safari", "Terminal", "Console"
-        ]
+        ],
+        # Window polling bounds (backs off from min to max while nothing changes)
+        "poll_interval_min_ms": 200,
+        "poll_interval_max_ms": 2000,
+        # Suspend monitoring and AI checks after this much user inactivity
+        "idle_suspend_seconds": 300,
+        # Local pre-classifier: answer without the API when at least this confident (1 disables)
+        "local_classifier_threshold": 0.9,
+        "local_classifier_min_samples": 30,
+        # Ask the AI only about windows focused at least this long; re-ask an activity at most once per cooldown
+        "check_dwell_seconds": 1.5,
+        "check_cooldown_seconds": 60,
+        # Hot-path metrics: local Prometheus endpoint port and metrics file flush interval (0 disables)
+        "metrics_port": 0,
+        "metrics_flush_seconds": 0,
+        # Classifier backends in preference order; "local" is any OpenAI-compatible server (skipped without a URL)
+        "classifier_backends": ["gemini", "local"],
+        "gemini_timeout_seconds": 10,
+        "local_model_url": "",
+        "local_model_name": "",
+        "local_model_api_key": "",
+        "local_model_timeout_seconds": 10,
+        # Also ask the next backend when the current one is slower than this latency percentile (0 disables)
+        "hedge_percentile": 0.9,
+        # Client-side request quotas per backend (0: unlimited); requests wait this long for quota before being dropped
+        "gemini_requests_per_minute": 15,
+        "local_model_requests_per_minute": 0,
+        "rate_limit_max_wait_seconds": 30,
+        # Classify tabs of the listed browsers by site, using the URL from the browser's session files
+        "browser_session_urls": True
     }
 
 def ensure_config_directory_exists():
@@ -81,17 +116,29 @@ def save_settings(api_key, browsers, banned, allowed):
     """
     ensure_config_directory_exists()
 
-    settings_data = {
+    # Keep settings that aren't edited from the UI (e.g. polling bounds)
+    settings_data = {}
+    try:
+        with open(SETTINGS_FILE_PATH, "r") as f:
+            existing = json.load(f)
+            if isinstance(existing, dict):
+                settings_data.update(existing)
+    except (IOError, ValueError):
+        pass
+
+    settings_data.update({
         "api_key": api_key,
         "browsers": browsers,
         "banned": banned,
         "allowed": allowed
-    }
+    })
 
     try:
         with open(SETTINGS_FILE_PATH, "w") as f:
             json.dump(settings_data, f, indent=4)
         print(f"Settings saved to: {SETTINGS_FILE_PATH}")
+        if _settings_service is not None:
+            _settings_service.reload()
     except IOError as e:
         print(f"Error saving settings to {SETTINGS_FILE_PATH}: {e}")
     except Exception as e:
@@ -131,6 +178,15 @@ def load_settings():
                 if not isinstance(settings_data.get(key), list):
                     settings_data[key] = default_settings[key]
 
+            # Ensure numeric settings exist and are valid
+            for key, default in default_settings.items():
+                if isinstance(default, (int, float)) and not isinstance(default, bool):
+                    value = settings_data.get(key)
+                    if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+                        settings_data[key] = default
+                elif isinstance(default, (bool, str, list)) and not isinstance(settings_data.get(key), type(default)):
+                    settings_data[key] = default
+
             return settings_data
     except json.JSONDecodeError:
         print(f"Error decoding JSON from {SETTINGS_FILE_PATH}. Using default settings.")
@@ -142,6 +198,190 @@ def load_settings():
         print(f"An unexpected error occurred while loading settings: {e}. Using default settings.")
         return default_settings
 
+# inotify constants (see <sys/inotify.h>)
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_DELETE = 0x00000200
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+class _InotifyWatch:
+    """A running inotify watch on one file; close() stops its thread and releases the fd."""
+
+    def __init__(self, libc, fd, wd, file_name, on_change):
+        self._libc = libc
+        self._fd = fd
+        self._wd = wd
+        self._target = os.fsencode(file_name)
+        self._on_change = on_change
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="keymind-settings-watch", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._closing:
+                try:
+                    data = os.read(self._fd, 4096)
+                except OSError:
+                    return
+                offset = 0
+                changed = False
+                while offset + _INOTIFY_EVENT.size <= len(data):
+                    _, _, _, name_len = _INOTIFY_EVENT.unpack_from(data, offset)
+                    start = offset + _INOTIFY_EVENT.size
+                    name = data[start:start + name_len].rstrip(b"\0")
+                    offset = start + name_len
+                    if name == self._target:
+                        changed = True
+                if changed and not self._closing:
+                    self._on_change()
+        finally:
+            os.close(self._fd)
+
+    def close(self, timeout=1.0):
+        """Stop watching. The watch thread closes the fd once its read returns."""
+        if self._closing:
+            return
+        self._closing = True
+        # Removing the watch queues an IN_IGNORED event, which wakes the blocked read
+        self._libc.inotify_rm_watch(self._fd, self._wd)
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+def _start_inotify_watch(file_path, on_change):
+    """
+    Watch file_path's directory with inotify (Linux only) and call on_change()
+    on the watch thread whenever the file is written, replaced or removed.
+    Returns the _InotifyWatch, or None if inotify is unavailable.
+    """
+    if system_name != 'Linux':
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        directory, file_name = os.path.split(file_path)
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_DELETE
+        wd = libc.inotify_add_watch(fd, os.fsencode(directory), mask)
+        if wd < 0:
+            os.close(fd)
+            return None
+    except (OSError, AttributeError):
+        return None
+    return _InotifyWatch(libc, fd, wd, file_name, on_change)
+
+class SettingsService:
+    """
+    Holds an immutable snapshot of the parsed settings file.
+    The file is re-read only when it changes: on an inotify event on Linux,
+    otherwise when its inode/mtime/size differs (checked at most every
+    check_interval seconds). Subscribers are called with each new snapshot,
+    on whichever thread noticed the change: with inotify that is the
+    keymind-settings-watch thread, so subscribers must be thread-safe.
+    """
+
+    def __init__(self, check_interval=1.0, use_inotify=True):
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._stamp = None
+        self._last_check = 0.0
+        self._snapshot = None
+        self.reload_count = 0
+
+        ensure_config_directory_exists()
+        self._watch = _start_inotify_watch(SETTINGS_FILE_PATH, self._check) if use_inotify else None
+        self._check()
+
+    @property
+    def _watching(self):
+        return self._watch is not None
+
+    @staticmethod
+    def _read_stamp():
+        try:
+            st = os.stat(SETTINGS_FILE_PATH)
+            return (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _freeze(settings):
+        return MappingProxyType({
+            key: tuple(value) if isinstance(value, list) else value
+            for key, value in settings.items()
+        })
+
+    def _check(self):
+        """Reload the snapshot if the settings file changed since the last load."""
+        with self._lock:
+            self._last_check = time.monotonic()
+            stamp = self._read_stamp()
+            if self._snapshot is not None and stamp == self._stamp:
+                return
+            self._stamp = stamp
+            self._load()
+
+    def _load(self):
+        self._snapshot = self._freeze(load_settings())
+        self.reload_count += 1
+        snapshot = self._snapshot
+        for callback in list(self._subscribers):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"Settings subscriber failed: {e}")
+
+    def get(self):
+        """Return the current settings snapshot. Does no file I/O while inotify is watching."""
+        if not self._watching and time.monotonic() - self._last_check >= self.check_interval:
+            self._check()
+        return self._snapshot
+
+    def reload(self, force=False):
+        """Re-read the settings file now if it changed (always, with force=True)."""
+        with self._lock:
+            if not force:
+                self._check()
+                return
+            self._last_check = time.monotonic()
+            self._stamp = self._read_stamp()
+            self._load()
+
+    def subscribe(self, callback):
+        """Call callback(snapshot) now and after every reload."""
+        with self._lock:
+            self._subscribers.append(callback)
+            snapshot = self._snapshot
+        callback(snapshot)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def close(self):
+        """Stop the inotify watch, if any; get() falls back to checking the file's stamp."""
+        watch, self._watch = self._watch, None
+        if watch is not None:
+            watch.close()
+
+_settings_service = None
+_settings_service_lock = threading.Lock()
+
+def get_settings_service():
+    """Return the process-wide settings service, creating it on first use."""
+    global _settings_service
+    with _settings_service_lock:
+        if _settings_service is None:
+            _settings_service = SettingsService()
+        return _settings_service
+
+def get_settings():
+    """Return the current immutable settings snapshot (lists are tuples)."""
+    return get_settings_service().get()
+
 if __name__ == '__main__':
     # Example usage (for testing this module directly)
     print(f"Base directory: {BASE_DIR}")
@@ -1,9 +1,14 @@
 import customtkinter as ctk
 import config_manager
-from app_logic import WindowMonitor
-import time
+from app_logic import metrics
+import queue
 import threading
-import platform
+
+# Imported on a background thread once the window is visible, so the first
+# relevance check and the first close don't pay for them
+WARM_IMPORTS = ("app_logic.task_checker", "app_logic.enforcement", "pyautogui")
+# How often the UI picks up active window changes from the monitor thread
+UI_REFRESH_MS = 50
 
 # --- Appearance Settings ---
 ctk.set_appearance_mode("Dark")
@@ -25,100 +30,106 @@ class App(ctk.CTk):
         self.tab_view.add("home")
         self.tab_view.add("settings")
 
-        # Initialize window monitor
-        self.window_monitor = WindowMonitor()
+        # Created in _finish_startup, after the window is on screen
+        self.window_monitor = None
+        self.prewarmer = None
+        self.pipeline = None
+        self.poll_scheduler = None
+        self.monitor_thread = None
+        self.metrics_exporters = []
+        # Closes distracting windows off the UI thread; started on the first close
+        self.enforcer = None
         self.current_active_window_title = "Initializing..."
 
         self.setup_home_tab()
         self.setup_settings_tab()
         self.apply_loaded_settings()
-
-        # Start monitoring
-        self.update_window_title()
+        self.start_button.configure(state="disabled")
 
         # Set up window close handler
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
-    def update_window_title(self):
-        """Update the displayed window title and check task relevance."""
-        from app_logic.task_checker import check_relevance
-        
-        title = self.window_monitor.get_active_window_title()
-        current_time = time.time()
-        if title and title != self.current_active_window_title:
+        # Let Tk draw the window before loading the monitoring stack
+        self.after_idle(lambda: self.after(0, self._finish_startup))
+
+    def _finish_startup(self):
+        """Load the monitoring stack and start monitoring (runs once the window is visible)."""
+        from app_logic import WindowMonitor
+        from app_logic.pipeline import FocusPipeline
+        from app_logic.prewarm import Prewarmer
+        from app_logic.scheduler import AdaptivePoller
+        from app_logic.monitor_thread import MonitorThread
+        from app_logic.timeline import get_timeline
+
+        # Initialize window monitor
+        self.window_monitor = WindowMonitor()
+
+        # Classify already-open windows in the background once a task starts
+        self.prewarmer = Prewarmer(self.window_monitor)
+
+        # Decision path from window title to verdict; AI verdicts arrive on a worker thread
+        self.pipeline = FocusPipeline(
+            prewarmer=self.prewarmer,
+            on_ai_verdict=lambda activity, result: self.monitor_thread.on_ai_verdict(activity, result),
+            timeline=get_timeline()
+        )
+
+        # Poll adaptively and pause while the screen is locked or the user is idle
+        self.poll_scheduler = AdaptivePoller(idle_source=self.window_monitor.get_idle_seconds)
+
+        # Polling and decisions run on their own thread; the UI only shows what it publishes
+        self.monitor_thread = MonitorThread(self.window_monitor, self.pipeline, self.poll_scheduler,
+                                            close=self._close_activity)
+
+        # Rebuild the list matcher whenever the settings file changes, not on the hot path
+        from app_logic.matcher import get_settings_matcher
+        settings_service = config_manager.get_settings_service()
+        settings_service.subscribe(get_settings_matcher)
+        settings_service.subscribe(self.poll_scheduler.configure)
+        settings_service.subscribe(self.pipeline.configure)
+        from app_logic.preclassifier import get_local_classifier
+        settings_service.subscribe(get_local_classifier().configure)
+
+        # Optional metrics endpoint / file and session profiler
+        self.metrics_exporters = metrics.start_exporters(config_manager.get_settings(), config_manager.CONFIG_DIR_PATH)
+
+        # Start monitoring
+        self.start_button.configure(state="normal")
+        self.monitor_thread.start()
+        self.refresh_active_window()
+
+        threading.Thread(target=self._warm_imports, name="keymind-warm-imports", daemon=True).start()
+
+    @staticmethod
+    def _warm_imports():
+        """Import the AI client and the keyboard automation library off the UI thread."""
+        import importlib
+        for module_name in WARM_IMPORTS:
+            try:
+                with metrics.span(f"import:{module_name}"):
+                    importlib.import_module(module_name)
+            except Exception as e:
+                print(f"Could not preload {module_name}: {e}")
+
+    def refresh_active_window(self):
+        """Show the latest active window published by the monitor thread; repaint only on change."""
+        title = None
+        while True:
+            try:
+                title = self.monitor_thread.events.get_nowait()
+            except queue.Empty:
+                break
+        if title is not None and title != self.current_active_window_title:
             self.current_active_window_title = title
             self.active_window_display_label.configure(text=title)
-            
-            # Check relevance if monitoring is active and we have a task
-            if hasattr(self, 'monitoring_active') and self.monitoring_active:
-                if hasattr(self, 'last_activity') and title != self.last_activity:
-                    # Wait 5 seconds before checking new activity
-                    if current_time - getattr(self, 'last_check_time', 0) >= 5:
-                        # Load current settings
-                        settings = config_manager.load_settings()
-                        allowed = settings.get('allowed', [])
-                        banned = settings.get('banned', [])
-                        browsers = settings.get('browsers', [])
-
-                        # Check if activity is in allowed list
-                        if any(allowed_app.lower() in title.lower() for allowed_app in allowed):
-                            print(f"Relevance check: {title} - Relevant (in allowed list)")
-                            relevance = 1
-                        # Check if activity is in banned list
-                        elif any(banned_app.lower() in title.lower() for banned_app in banned):
-                            print(f"Relevance check: {title} - Not relevant (in banned list)")
-                            relevance = 0
-                        # If not in either list, use AI to check relevance
-                        else:
-                            # Run AI call in a background thread to keep UI responsive
-                            def run_ai_check(task, activity):
-                                result = check_relevance(task, activity)
-                                def update_from_ai():
-                                    if result is not None and self.current_active_window_title == activity:
-                                        print(f"Relevance check: {activity} - {'Relevant' if result == 1 else 'Not relevant'} (AI decision)")
-                                        # If not relevant, trigger close sequence with platform-aware hotkeys
-                                        if result == 0:
-                                            self._close_activity(activity)
-                                self.after(0, update_from_ai)
-                            threading.Thread(target=run_ai_check, args=(self.current_task, title), daemon=True).start()
-                            relevance = None
-                        
-                        # If activity is not relevant from lists, close it immediately
-                        if relevance == 0:
-                            self._close_activity(title)
-                        
-                        self.last_check_time = current_time
-                        self.last_activity = title
-
-        self.after(200, self.update_window_title)
-
-    def _close_activity(self, title):
-        """Close current activity with platform-aware shortcuts."""
-        import pyautogui
-        pyautogui.PAUSE = 0.5
-
-        title_lower = title.lower()
-        settings = config_manager.load_settings()
-        browsers = settings.get('browsers', [])
-        is_browser = any(browser.lower() in title_lower for browser in browsers)
-
-        is_mac = platform.system() == 'Darwin'
-
-        if is_browser:
-            print(f"Closing browser tab: {title}")
-            if is_mac:
-                pyautogui.hotkey('command', 'w')
-                pyautogui.hotkey('command', 't')
-            else:
-                pyautogui.hotkey('ctrl', 'w')
-                pyautogui.hotkey('ctrl', 't')
-        else:
-            print(f"Closing application: {title}")
-            if is_mac:
-                # macOS close window
-                pyautogui.hotkey('command', 'w')
-            else:
-                pyautogui.hotkey('alt', 'f4')
+        self.after(UI_REFRESH_MS, self.refresh_active_window)
+
+    def _close_activity(self, title, target):
+        """Queue closing the judged window (called on the monitor thread); the enforcement worker closes it."""
+        if self.enforcer is None:
+            from app_logic.enforcement import EnforcementWorker
+            self.enforcer = EnforcementWorker(self.window_monitor)
+        self.enforcer.submit(title, target)
 
     def apply_loaded_settings(self):
         """Loads settings using config_manager and applies them to the UI."""
@@ -152,6 +163,17 @@ class App(ctk.CTk):
     def on_closing(self):
         """Handles application close events."""
         print("Closing application...")
+        if self.monitor_thread is not None:
+            self.monitor_thread.stop()
+        if self.pipeline is not None:
+            from app_logic.preclassifier import get_local_classifier
+            from app_logic.timeline import get_timeline
+            get_local_classifier().save()
+            self.pipeline.stop()
+            get_timeline().close()
+        if self.enforcer is not None:
+            self.enforcer.stop()
+        metrics.stop_exporters(self.metrics_exporters, config_manager.CONFIG_DIR_PATH)
         self.destroy()
 
     def setup_home_tab(self):
@@ -294,13 +316,16 @@ class App(ctk.CTk):
                 return
                 
             print("Task started:", self.current_task)
-            self.monitoring_active = True
-            self.last_check_time = 0
-            self.last_activity = ""
+            self.monitor_thread.start_task(self.current_task)
             self.start_button.configure(text="Stop")
+            self.prewarmer.start(self.current_task)
         else:
-            self.monitoring_active = False
+            self.monitor_thread.stop_task()
             self.start_button.configure(text="Start")
+            self.prewarmer.stop()
+            stats = self.prewarmer.stats()
+            print(f"Prewarm: {stats['submitted']} window(s) prewarmed, "
+                  f"{stats['warm']} check(s) served warm, {stats['cold']} cold")
 
 if __name__ == "__main__":
     config_manager.ensure_config_directory_exists()
@@ -0,0 +1,43 @@
+# File: tests/conftest.py
+import os
+import sys
+
+# Run from anywhere: the app's modules import each other from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+
+import pytest
+
+import config_manager
+
+
+@pytest.fixture
+def settings_file(tmp_path, monkeypatch):
+    """
+    Point KeyMind's config, caches and logs at a temporary directory. Returns
+    write(**overrides), which writes the settings file and reloads it.
+    """
+    from app_logic import browser_state, verdict_cache
+    monkeypatch.setattr(config_manager, "CONFIG_DIR_PATH", str(tmp_path))
+    monkeypatch.setattr(config_manager, "SETTINGS_FILE_PATH", str(tmp_path / config_manager.SETTINGS_FILE_NAME))
+    monkeypatch.setattr(config_manager, "_settings_service", None)
+    monkeypatch.setattr(verdict_cache, "_shared_cache", None)
+    monkeypatch.setattr(browser_state, "_shared_config", None)
+    monkeypatch.setattr(browser_state, "_shared_reader", None)
+
+    def write(**overrides):
+        settings = config_manager.get_default_settings()
+        # Keyed by title unless a test asks otherwise: the machine's own browsers don't matter
+        settings.update(api_key="test-key", browsers=["chrome", "firefox"], browser_session_urls=False)
+        settings.update(overrides)
+        with open(config_manager.SETTINGS_FILE_PATH, "w") as f:
+            json.dump(settings, f)
+        config_manager.get_settings_service().reload(force=True)
+        return settings
+
+    write()
+    yield write
+    # Stop this test's inotify watch thread before the directory goes away
+    if config_manager._settings_service is not None:
+        config_manager._settings_service.close()
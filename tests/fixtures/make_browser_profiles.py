@@ -0,0 +1,60 @@
+# File: tests/fixtures/make_browser_profiles.py
+"""Regenerate the browser profile fixtures (needs the lz4 package): python tests/fixtures/make_browser_profiles.py"""
+import os
+import json
+import struct
+
+FIXTURES_DIR = os.path.dirname(os.path.abspath(__file__))
+FIREFOX_PROFILE = os.path.join(FIXTURES_DIR, "firefox_profile")
+CHROMIUM_PROFILE = os.path.join(FIXTURES_DIR, "chromium_profile")
+CHROMIUM_SESSION = os.path.join(CHROMIUM_PROFILE, "Sessions", "Session_13300000000000000")
+
+FIREFOX_SESSION = {"windows": [{"tabs": [
+    # "index" (1-based) picks the page shown in the tab: the older entry is history
+    {"index": 2, "entries": [{"url": "https://example.org/", "title": "Example Domain"},
+                             {"url": "https://old.reddit.com/r/python/", "title": "r/python - Reddit"}]},
+    {"index": 1, "entries": [{"url": "https://mail.google.com/mail/u/0/#inbox", "title": "Inbox - Gmail"}]},
+    {"index": 1, "entries": [{"url": "https://www.python.org/", "title": "Python"}]},
+]}]}
+
+
+def snss_command(command_id, payload):
+    """One SNSS record: uint16 size (id included), uint8 command id, payload."""
+    return struct.pack("<HB", len(payload) + 1, command_id) + payload
+
+
+def navigation_payload(tab_id, index, url, title):
+    """UpdateTabNavigation pickle: tab id, navigation index, URL (std::string), title (UTF-16)."""
+    url_bytes = url.encode()
+    title_bytes = title.encode("utf-16-le")
+    body = (struct.pack("<iii", tab_id, index, len(url_bytes)) + url_bytes + b"\0" * (-len(url_bytes) % 4)
+            + struct.pack("<i", len(title)) + title_bytes + b"\0" * (-len(title_bytes) % 4))
+    return struct.pack("<I", len(body)) + body
+
+
+def chromium_commands():
+    return b"".join((
+        snss_command(0, struct.pack("<ii", 1, 10)),  # SetTabWindow
+        snss_command(6, navigation_payload(10, 0, "https://www.bbc.co.uk/news", "BBC News - Home")),
+        snss_command(6, navigation_payload(10, 1, "https://www.bbc.co.uk/sport", "BBC Sport")),
+        snss_command(7, struct.pack("<ii", 10, 0)),  # SetSelectedNavigationIndex: back on the news page
+        snss_command(0, struct.pack("<ii", 1, 11)),
+        snss_command(6, navigation_payload(11, 0, "https://github.com/", "GitHub")),
+        snss_command(16, struct.pack("<iq", 11, 0)),  # TabClosed
+    ))
+
+
+def main():
+    import lz4.block
+    raw = json.dumps(FIREFOX_SESSION).encode()
+    os.makedirs(os.path.join(FIREFOX_PROFILE, "sessionstore-backups"), exist_ok=True)
+    with open(os.path.join(FIREFOX_PROFILE, "sessionstore-backups", "recovery.jsonlz4"), "wb") as f:
+        f.write(b"mozLz40\0" + struct.pack("<I", len(raw)) + lz4.block.compress(raw, store_size=False))
+
+    os.makedirs(os.path.dirname(CHROMIUM_SESSION), exist_ok=True)
+    with open(CHROMIUM_SESSION, "wb") as f:
+        f.write(b"SNSS" + struct.pack("<i", 3) + chromium_commands())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# File: tests/test_backends.py
+import threading
+
+import pytest
+
+from app_logic.backends import BackendError, BackendRouter, CircuitBreaker, ClassifierBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeBackend(ClassifierBackend):
+    """Answers from a script: a string is returned, an exception raised, an Event waited on first."""
+
+    def __init__(self, name, *answers, timeout=5):
+        super().__init__(timeout=timeout)
+        self.name = name
+        self.answers = list(answers)
+        self.calls = 0
+
+    def generate_text(self, prompt, system=None, max_output_tokens=None, stop_when=None):
+        self.calls += 1
+        answer = self.answers.pop(0) if len(self.answers) > 1 else self.answers[0]
+        if isinstance(answer, threading.Event):
+            answer.wait(5)
+            return "late"
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def test_backends_must_implement_generate_text():
+    class Incomplete(ClassifierBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_breaker_opens_after_consecutive_failures():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_half_open_breaker_lets_one_trial_through():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30, clock=clock)
+    breaker.record_failure()
+    clock.now = 30
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    # A failed trial opens it for another reset period
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now = 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_router_fails_over_to_the_next_backend():
+    primary = FakeBackend("primary", BackendError("down"))
+    fallback = FakeBackend("fallback", "1")
+    router = BackendRouter([primary, fallback], hedge_percentile=None)
+    try:
+        for _ in range(3):
+            assert router.generate_text("Activity: editor") == "1"
+        # The primary's breaker is open: it is no longer asked
+        assert router.generate_text("Activity: editor") == "1"
+        assert primary.calls == 3
+        assert router.stats()["backends"]["primary"]["breaker"] == "open"
+    finally:
+        router.close()
+
+
+def test_router_hedges_a_slow_backend():
+    release = threading.Event()
+    slow = FakeBackend("slow", release, timeout=2)
+    fast = FakeBackend("fast", "0")
+    router = BackendRouter([slow, fast])
+    try:
+        # No latency samples yet: hedged after half the timeout
+        assert router.generate_text("Activity: cat videos") == "0"
+        assert (slow.calls, fast.calls) == (1, 1)
+    finally:
+        release.set()
+        router.close()
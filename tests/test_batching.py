@@ -0,0 +1,105 @@
+# File: tests/test_batching.py
+import threading
+
+from app_logic.batching import RelevanceBatcher
+
+TASK = "Studying linear algebra"
+
+
+class FakeClassifier:
+    """classify_batch that records each batch it is sent; when gated, holds requests until release()."""
+
+    def __init__(self, gated=False):
+        self.batches = []
+        self.called = threading.Event()
+        self._gate = threading.Event()
+        if not gated:
+            self._gate.set()
+
+    def release(self):
+        self._gate.set()
+
+    def __call__(self, task, activities):
+        self.batches.append((task, list(activities)))
+        self.called.set()
+        self._gate.wait(5)
+        return [1 if "algebra" in activity.casefold() else 0 for activity in activities]
+
+
+class Results:
+    def __init__(self, expected):
+        self.verdicts = []
+        self._expected = expected
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def callback(self, name):
+        def record(verdict):
+            with self._lock:
+                self.verdicts.append((name, verdict))
+                if len(self.verdicts) == self._expected:
+                    self._done.set()
+        return record
+
+    def wait(self):
+        assert self._done.wait(5), self.verdicts
+        return sorted(self.verdicts)
+
+
+def test_lookups_within_the_window_share_one_request():
+    classifier = FakeClassifier()
+    batcher = RelevanceBatcher(classify_batch=classifier, window_seconds=0.2)
+    results = Results(expected=3)
+    batcher.submit(TASK, "Linear algebra - Wikipedia", results.callback("first"))
+    batcher.submit(TASK, "Cat videos - YouTube", results.callback("second"))
+    # Same lookup again (up to case and spacing): no extra activity in the request
+    batcher.submit(TASK, "linear  algebra - wikipedia", results.callback("repeat"))
+
+    assert results.wait() == [("first", 1), ("repeat", 1), ("second", 0)]
+    assert classifier.batches == [(TASK, ["Linear algebra - Wikipedia", "Cat videos - YouTube"])]
+    assert batcher.stats()["deduplicated"] == 1
+
+
+def test_full_batches_are_sent_without_waiting_for_the_window():
+    classifier = FakeClassifier()
+    batcher = RelevanceBatcher(classify_batch=classifier, window_seconds=60, max_batch=2, max_workers=1)
+    results = Results(expected=2)
+    batcher.submit(TASK, "a", results.callback("a"))
+    batcher.submit(TASK, "b", results.callback("b"))
+
+    assert results.wait() == [("a", 0), ("b", 0)]
+    assert classifier.batches == [(TASK, ["a", "b"])]
+
+
+def test_lookups_no_longer_current_are_dropped_unsent():
+    classifier = FakeClassifier()
+    batcher = RelevanceBatcher(classify_batch=classifier, window_seconds=0.1)
+    results = Results(expected=1)
+    batcher.submit(TASK, "Switched away", results.callback("stale"), is_current=lambda: False)
+    batcher.submit(TASK, "Still focused", results.callback("current"), is_current=lambda: True)
+
+    assert results.wait() == [("current", 0)]
+    assert classifier.batches == [(TASK, ["Still focused"])]
+    assert batcher.stats()["cancelled"] == 1
+
+
+def test_foreground_lookups_go_before_low_priority_ones():
+    classifier = FakeClassifier(gated=True)
+    batcher = RelevanceBatcher(classify_batch=classifier, window_seconds=0.05, max_workers=1)
+    results = Results(expected=4)
+    batcher.submit(TASK, "busy", results.callback("busy"))
+    assert classifier.called.wait(5)
+
+    # Queued while the only worker is busy
+    batcher.submit("Writing a report", "prewarm other task", results.callback("other"), low_priority=True)
+    batcher.submit(TASK, "prewarm same task", results.callback("same"), low_priority=True)
+    batcher.submit(TASK, "focused now", results.callback("focused"))
+    classifier.release()
+
+    results.wait()
+    assert classifier.batches == [
+        (TASK, ["busy"]),
+        # The foreground lookup picks the task; low-priority lookups for it ride along
+        (TASK, ["focused now", "prewarm same task"]),
+        ("Writing a report", ["prewarm other task"]),
+    ]
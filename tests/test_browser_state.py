@@ -0,0 +1,145 @@
+# File: tests/test_browser_state.py
+import os
+import json
+import shutil
+import struct
+
+import pytest
+
+from app_logic import browser_state
+from app_logic.browser_state import (BrowserSessionReader, ChromiumSessionSource, FirefoxSessionSource,
+                                     read_mozlz4, site_of)
+from tests.fixtures.make_browser_profiles import (CHROMIUM_PROFILE, FIREFOX_PROFILE, FIREFOX_SESSION,
+                                                  navigation_payload, snss_command)
+
+RECOVERY_FILE = os.path.join(FIREFOX_PROFILE, "sessionstore-backups", "recovery.jsonlz4")
+
+
+@pytest.fixture(params=["lz4", "pure-python"])
+def lz4_mode(request, monkeypatch):
+    if request.param == "lz4":
+        pytest.importorskip("lz4.block")
+    else:
+        monkeypatch.setattr(browser_state, "LZ4_AVAILABLE", False)
+    return request.param
+
+
+def test_mozlz4_decodes_the_fixture(lz4_mode):
+    assert json.loads(read_mozlz4(RECOVERY_FILE)) == FIREFOX_SESSION
+
+
+def test_pure_python_decoder_handles_overlapping_matches(monkeypatch):
+    monkeypatch.setattr(browser_state, "LZ4_AVAILABLE", False)
+    # Literals "ab", then a match of 6 bytes at offset 2 (overlapping its own output), then literal "X"
+    block = bytes([0x22]) + b"ab" + bytes([2, 0]) + bytes([0x10]) + b"X"
+    assert browser_state.lz4_block_decompress(block, 9) == b"ababababX"
+
+
+def test_mozlz4_rejects_other_files(tmp_path):
+    path = tmp_path / "recovery.jsonlz4"
+    path.write_bytes(b"{}")
+    with pytest.raises(ValueError):
+        read_mozlz4(str(path))
+
+
+def test_firefox_tabs_show_the_selected_entry(lz4_mode):
+    source = FirefoxSessionSource(FIREFOX_PROFILE)
+    assert source.refresh()
+    assert source.tabs == [("r/python - Reddit", "https://old.reddit.com/r/python/"),
+                           ("Inbox - Gmail", "https://mail.google.com/mail/u/0/#inbox"),
+                           ("Python", "https://www.python.org/")]
+    # Unchanged file: not read again
+    assert not source.refresh()
+
+
+def test_chromium_tabs_follow_selection_and_closing():
+    source = ChromiumSessionSource(CHROMIUM_PROFILE)
+    assert source.refresh()
+    assert source.tabs == [("BBC News - Home", "https://www.bbc.co.uk/news")]
+
+
+def test_chromium_reads_only_appended_commands(tmp_path):
+    profile = tmp_path / "Default"
+    shutil.copytree(CHROMIUM_PROFILE, profile)
+    session = next((profile / "Sessions").iterdir())
+    source = ChromiumSessionSource(str(profile))
+    source.refresh()
+    offset = source._offset
+    assert offset == session.stat().st_size
+
+    command = snss_command(6, navigation_payload(12, 0, "https://docs.python.org/3/", "3.12 Documentation"))
+    # A command caught half-written is left for the next read
+    with open(session, "ab") as f:
+        f.write(command[:7])
+    source.refresh()
+    assert source._offset == offset
+    assert ("3.12 Documentation", "https://docs.python.org/3/") not in source.tabs
+
+    with open(session, "ab") as f:
+        f.write(command[7:])
+        f.write(snss_command(7, struct.pack("<ii", 12, 0)))
+    assert source.refresh()
+    assert source._offset == session.stat().st_size
+    assert sorted(source.tabs) == [("3.12 Documentation", "https://docs.python.org/3/"),
+                                   ("BBC News - Home", "https://www.bbc.co.uk/news")]
+
+    with open(session, "ab") as f:
+        f.write(snss_command(16, struct.pack("<iq", 10, 0)))
+    source.refresh()
+    assert source.tabs == [("3.12 Documentation", "https://docs.python.org/3/")]
+
+
+@pytest.fixture
+def reader():
+    return BrowserSessionReader([FIREFOX_PROFILE, CHROMIUM_PROFILE])
+
+
+@pytest.mark.parametrize("window_title, url", [
+    ("r/python - Reddit — Mozilla Firefox", "https://old.reddit.com/r/python/"),
+    ("Inbox - Gmail — Mozilla Firefox Private Browsing", "https://mail.google.com/mail/u/0/#inbox"),
+    ("Python - Mozilla Firefox - firefox.exe", "https://www.python.org/"),
+    ("BBC News - Home - Google Chrome", "https://www.bbc.co.uk/news"),
+    ("Python", "https://www.python.org/"),
+])
+def test_window_titles_map_to_their_tab(reader, window_title, url):
+    assert reader.url_for_title(window_title) == url
+
+
+@pytest.mark.parametrize("window_title", [
+    # Pages not in the session files yet must not borrow a tab whose title starts the same way
+    "Python for kids - YouTube - Google Chrome",
+    "Python - Wikipedia — Mozilla Firefox",
+    "Inbox - Gmail - Settings — Mozilla Firefox",
+    "Unknown page — Mozilla Firefox",
+    "",
+])
+def test_unknown_pages_have_no_url(reader, window_title):
+    assert reader.url_for_title(window_title) is None
+
+
+def test_sites_are_hosts_without_variant_prefixes():
+    assert [site_of(url) for url in ("https://www.bbc.co.uk/news", "https://old.reddit.com/r/python/",
+                                     "https://mail.google.com/", "https://docs.google.com/", "about:blank",
+                                     "http://127.0.0.1:8000/")] == [
+        "bbc.co.uk", "reddit.com", "mail.google.com", "docs.google.com", None, "127.0.0.1"]
+
+
+def test_cli_looks_up_a_title(capsys):
+    assert browser_state.main(["--profile", FIREFOX_PROFILE, "--title", "Python — Mozilla Firefox", "--json"]) == 0
+    assert json.loads(capsys.readouterr().out) == {"title": "Python — Mozilla Firefox",
+                                                   "url": "https://www.python.org/", "site": "python.org"}
+
+
+def test_pipeline_keys_tabs_by_site(settings_file, monkeypatch):
+    from app_logic.pipeline import FocusPipeline, SOURCE_BANNED, activity_key
+    monkeypatch.setattr(browser_state, "find_profile_dirs", lambda browsers: [FIREFOX_PROFILE, CHROMIUM_PROFILE])
+    settings_file(browser_session_urls=True, browsers=["firefox", "chrome"], banned=["domain:reddit.com"], allowed=[])
+
+    assert activity_key("Python — Mozilla Firefox") == ("python.org (website)", "python.org")
+    # Not in the session files yet: keyed by its title until it is
+    assert activity_key("Python for kids - YouTube - Google Chrome") == ("YouTube - Google Chrome", None)
+
+    pipeline = FocusPipeline()
+    pipeline.start("Writing the quarterly report")
+    decision = pipeline.observe("r/python - Reddit — Mozilla Firefox", now=0.0)
+    assert (decision.relevance, decision.source) == (0, SOURCE_BANNED)
@@ -0,0 +1,37 @@
+# File: tests/test_canonical.py
+from app_logic.canonical import canonicalize
+from app_logic.monitor import WindowMonitor
+
+
+def _key(title, process_name):
+    # As FocusPipeline sees it: the title combined the way WindowMonitor reports it
+    return canonicalize(WindowMonitor.format_window_title(title, process_name), process_name)
+
+
+def test_browser_title_collapses_to_site_and_browser():
+    assert canonicalize("(3) Inbox - me@example.com - Gmail - Google Chrome") == "Gmail - Google Chrome"
+
+
+def test_windows_browser_tabs_keep_their_site():
+    # On Windows the process name is appended to the title
+    keys = {
+        _key("Cat videos - YouTube - Google Chrome", "chrome.exe"),
+        _key("Lecture 3 - Coursera - Google Chrome", "chrome.exe"),
+        _key("python - Google Search - Google Chrome", "chrome.exe"),
+    }
+    assert keys == {
+        "YouTube - Google Chrome - chrome.exe",
+        "Coursera - Google Chrome - chrome.exe",
+        "Google Search - Google Chrome - chrome.exe",
+    }
+    assert _key("(2) Inbox - Gmail - Mozilla Firefox", "firefox.exe") == "Gmail - Mozilla Firefox - firefox.exe"
+
+
+def test_windows_keys_are_idempotent_and_ignore_volatile_fragments():
+    key = _key("(4) Inbox - Gmail - Google Chrome", "chrome.exe")
+    assert key == _key("Inbox - Gmail - Google Chrome", "chrome.exe")
+    assert canonicalize(key, "chrome.exe") == key
+
+
+def test_other_applications_keep_the_process_name():
+    assert _key("*notes.txt - Notepad", "notepad.exe") == "notes.txt - Notepad - notepad.exe"
@@ -0,0 +1,74 @@
+# File: tests/test_config_manager.py
+import json
+import os
+import threading
+
+import pytest
+
+import config_manager
+from config_manager import SettingsService
+
+
+def _write(**overrides):
+    settings = config_manager.get_default_settings()
+    settings.update(overrides)
+    with open(config_manager.SETTINGS_FILE_PATH, "w") as f:
+        json.dump(settings, f)
+
+
+@pytest.fixture
+def service(settings_file):
+    # Polling only, so the test decides when the file is looked at
+    service = SettingsService(check_interval=0, use_inotify=False)
+    yield service
+    service.close()
+
+
+def test_snapshot_is_reused_until_the_file_changes(service):
+    snapshot = service.get()
+    assert service.get() is snapshot
+    assert service.reload_count == 1
+
+    _write(api_key="new-key", banned=["reddit"])
+    # Make sure the stamp differs even on filesystems with coarse mtimes
+    os.utime(config_manager.SETTINGS_FILE_PATH, ns=(0, 0))
+    changed = service.get()
+    assert changed is not snapshot
+    assert changed["api_key"] == "new-key"
+    assert changed["banned"] == ("reddit",)
+    assert service.reload_count == 2
+
+
+def test_subscribers_get_every_new_snapshot(service):
+    received = []
+    service.subscribe(received.append)
+    assert received == [service.get()]
+
+    _write(api_key="new-key")
+    service.reload(force=True)
+    assert [snapshot["api_key"] for snapshot in received] == ["test-key", "new-key"]
+
+    service.unsubscribe(received.append)
+    service.reload(force=True)
+    assert len(received) == 2
+
+
+def test_snapshots_are_read_only(service):
+    with pytest.raises(TypeError):
+        service.get()["api_key"] = "changed"
+
+
+@pytest.mark.skipif(config_manager.system_name != "Linux", reason="inotify is Linux only")
+def test_inotify_watch_reloads_and_closes(settings_file):
+    watch_threads = lambda: sum(thread.name == "keymind-settings-watch" for thread in threading.enumerate())
+    before = watch_threads()
+    service = SettingsService()
+    assert watch_threads() == before + 1
+    changed = threading.Event()
+    service.subscribe(lambda snapshot: snapshot["api_key"] == "watched" and changed.set())
+    try:
+        _write(api_key="watched")
+        assert changed.wait(5)
+    finally:
+        service.close()
+    assert watch_threads() == before
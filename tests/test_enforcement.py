@@ -0,0 +1,39 @@
+# File: tests/test_enforcement.py
+from app_logic.canonical import canonicalize
+from app_logic.enforcement import confirm_focus
+from app_logic.monitor import WindowMonitor, WindowTarget
+
+
+class FakeMonitor:
+    format_window_title = staticmethod(WindowMonitor.format_window_title)
+
+    def __init__(self, title, process_name, handle):
+        self.info = (title, process_name)
+        self.target = WindowTarget(handle, None)
+
+    def get_active_window_info(self):
+        return self.info
+
+    def get_active_window_target(self):
+        return self.target
+
+
+ACTIVITY = canonicalize("(3) Funny cats - YouTube - Google Chrome", "chrome")
+JUDGED = WindowTarget(7, None)
+
+
+def test_confirms_the_judged_window_with_its_current_title(settings_file):
+    monitor = FakeMonitor("(4) Funny cats - YouTube - Google Chrome", "chrome", 7)
+    assert confirm_focus(monitor, ACTIVITY, JUDGED) == "(4) Funny cats - YouTube - Google Chrome"
+
+
+def test_rejects_a_window_focused_since(settings_file):
+    assert confirm_focus(FakeMonitor("report.docx - Word", "winword.exe", 3), ACTIVITY, JUDGED) is None
+
+
+def test_rejects_the_judged_window_showing_something_else(settings_file):
+    assert confirm_focus(FakeMonitor("Lecture 3 - Coursera - Google Chrome", "chrome", 7), ACTIVITY, JUDGED) is None
+
+
+def test_rejects_another_window_with_the_same_activity(settings_file):
+    assert confirm_focus(FakeMonitor("Funny cats - YouTube - Google Chrome", "chrome", 8), ACTIVITY, JUDGED) is None
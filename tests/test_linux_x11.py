@@ -0,0 +1,153 @@
+# File: tests/test_linux_x11.py
+import os
+import time
+import shutil
+import threading
+import subprocess
+
+import pytest
+
+from app_logic import linux_x11
+from app_logic.process_cache import get_process_cache
+
+pytestmark = pytest.mark.skipif(not linux_x11.XLIB_AVAILABLE or shutil.which("Xvfb") is None,
+                                reason="needs python-xlib and Xvfb")
+
+TIMEOUT_SECONDS = 5.0
+
+
+@pytest.fixture
+def display_name():
+    """A private Xvfb server; yields its display name (":N")."""
+    read_fd, write_fd = os.pipe()
+    server = subprocess.Popen(["Xvfb", "-displayfd", str(write_fd), "-nolisten", "tcp", "-screen", "0", "640x480x24"],
+                              pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(write_fd)
+    try:
+        with os.fdopen(read_fd) as f:
+            number = f.readline().strip()
+        if not number:
+            pytest.skip("Xvfb did not start")
+        yield f":{number}"
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+class ScriptedWindowManager:
+    """Plays the window manager's part: client windows, their titles, the client list and the active window."""
+
+    def __init__(self, display_name):
+        from Xlib import Xatom, display as xdisplay
+        self._Xatom = Xatom
+        self.display = xdisplay.Display(display_name)
+        self.root = self.display.screen().root
+        atom = self.display.intern_atom
+        self._NET_ACTIVE_WINDOW = atom("_NET_ACTIVE_WINDOW")
+        self._NET_CLIENT_LIST = atom("_NET_CLIENT_LIST")
+        self._NET_WM_NAME = atom("_NET_WM_NAME")
+        self._NET_WM_PID = atom("_NET_WM_PID")
+        self._UTF8_STRING = atom("UTF8_STRING")
+        self.windows = []
+
+    def create_window(self, title, wm_class, pid=None):
+        window = self.root.create_window(0, 0, 100, 100, 0, self.display.screen().root_depth)
+        window.set_wm_class(wm_class.lower(), wm_class)
+        if pid is not None:
+            window.change_property(self._NET_WM_PID, self._Xatom.CARDINAL, 32, [pid])
+        self.set_title(window, title)
+        self.windows.append(window)
+        self.root.change_property(self._NET_CLIENT_LIST, self._Xatom.WINDOW, 32, [w.id for w in self.windows])
+        self.display.flush()
+        return window
+
+    def set_title(self, window, title):
+        window.change_property(self._NET_WM_NAME, self._UTF8_STRING, 8, title.encode())
+        self.display.flush()
+
+    def activate(self, window):
+        self.root.change_property(self._NET_ACTIVE_WINDOW, self._Xatom.WINDOW, 32, [window.id if window else 0])
+        self.display.flush()
+
+    def close(self):
+        self.display.close()
+
+
+@pytest.fixture
+def wm(display_name):
+    manager = ScriptedWindowManager(display_name)
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def watcher(display_name, wm):
+    # The first window is active before the watcher starts
+    wm.activate(wm.create_window("main.py - Editor", "Editor"))
+    watcher = linux_x11.X11WindowWatcher(display_name)
+    watcher.start()
+    yield watcher
+    watcher.stop()
+
+
+def _wait_for(predicate):
+    deadline = time.monotonic() + TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_watcher_reads_the_active_window_on_start(watcher):
+    assert watcher.get_active_window_info() == ("main.py - Editor", "Editor")
+
+
+def test_watcher_follows_focus_changes(wm, watcher):
+    changes = []
+    watcher.add_listener(lambda title, process_name: changes.append((title, process_name)))
+    pid = os.getpid()
+    browser = wm.create_window("Docs - Browser", "Browser", pid=pid)
+    wm.activate(browser)
+
+    # The process name comes from _NET_WM_PID when the process is known, else from WM_CLASS
+    expected = ("Docs - Browser", get_process_cache().name(pid) or "Browser")
+    assert _wait_for(lambda: watcher.get_active_window_info() == expected)
+    assert changes == [expected]
+    assert watcher.get_active_window_id() == browser.id
+    assert watcher.get_active_window_pid() == pid
+
+
+def test_watcher_follows_title_changes_of_the_active_window_only(wm, watcher):
+    changes = []
+    watcher.add_listener(lambda title, process_name: changes.append(title))
+    editor = wm.windows[0]
+    background = wm.create_window("Music - Player", "Player")
+
+    wm.set_title(background, "Next song - Player")
+    wm.set_title(editor, "*main.py - Editor")
+    assert _wait_for(lambda: watcher.get_active_window_info() == ("*main.py - Editor", "Editor"))
+    assert changes == ["*main.py - Editor"]
+
+
+def test_watcher_reports_no_active_window(wm, watcher):
+    wm.activate(None)
+    assert _wait_for(lambda: watcher.get_active_window_info() == (None, None))
+
+
+def test_window_list_listeners_see_new_windows(wm, watcher):
+    changed = threading.Event()
+    watcher.add_window_list_listener(changed.set)
+    wm.create_window("Chat - Messenger", "Messenger")
+    assert changed.wait(TIMEOUT_SECONDS)
+
+
+def test_query_lists_client_windows(display_name, wm):
+    wm.create_window("main.py - Editor", "Editor", pid=1234)
+    wm.create_window("Docs - Browser", "Browser")
+    query = linux_x11.X11Query(display_name)
+    try:
+        assert [(title, pid) for _, title, pid in query.list_windows()] == [("main.py - Editor", 1234),
+                                                                           ("Docs - Browser", None)]
+    finally:
+        query.close()
@@ -0,0 +1,47 @@
+# File: tests/test_matcher.py
+import random
+
+import pytest
+
+from app_logic.matcher import PatternMatcher
+
+
+def naive_match(lists, title):
+    """The original per-list any() loops: case-insensitive substring checks."""
+    return frozenset(label for label, patterns in lists.items()
+                     if any(pattern.lower() in title.lower() for pattern in patterns))
+
+
+def test_plain_patterns_agree_with_any_loops():
+    rng = random.Random(7)
+    # A small alphabet makes patterns overlap, prefix and suffix each other
+    word = lambda low, high: "".join(rng.choice("abcAB ") for _ in range(rng.randint(low, high)))
+    for _ in range(50):
+        lists = {label: [word(1, 5) for _ in range(rng.randint(0, 6))] for label in ("allowed", "banned", "browsers")}
+        matcher = PatternMatcher(lists)
+        for _ in range(40):
+            title = word(0, 30)
+            assert matcher.match(title) == naive_match(lists, title), (lists, title)
+
+
+def test_empty_pattern_matches_every_title():
+    matcher = PatternMatcher({"allowed": [""], "banned": ["x"]})
+    assert matcher.match("") == {"allowed"}
+    assert matcher.match("x") == {"allowed", "banned"}
+
+
+@pytest.mark.parametrize("rule, title, expected", [
+    ("glob:*.pdf - Adobe*", "Notes.PDF - Adobe Acrobat", True),
+    ("glob:*.pdf - Adobe*", "Open Notes.pdf in Adobe", False),
+    ("re:^\\(\\d+\\) ", "(3) Inbox - Gmail", True),
+    ("re:^\\(\\d+\\) ", "Inbox (3)", False),
+    ("domain:youtube.com", "music.youtube.com - Firefox", True),
+    ("domain:youtube.com", "notyoutube.com - Firefox", False),
+])
+def test_rule_prefixes(rule, title, expected):
+    assert PatternMatcher({"banned": [rule]}).matches(title, "banned") is expected
+
+
+def test_invalid_regex_does_not_disable_other_rules():
+    matcher = PatternMatcher({"banned": ["re:(unclosed", "re:reddit"]})
+    assert matcher.matches("reddit - Chrome", "banned")
@@ -0,0 +1,40 @@
+# File: tests/test_metrics.py
+import urllib.error
+import urllib.request
+
+import pytest
+
+from app_logic.metrics import MetricsServer, get_profiler
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = MetricsServer(0, str(tmp_path)).start()
+    yield f"http://127.0.0.1:{server.port}"
+    server.stop()
+
+
+def test_metrics_endpoint_serves_prometheus_text(server):
+    with urllib.request.urlopen(f"{server}/metrics", timeout=5) as response:
+        assert response.status == 200
+        assert response.headers["Content-Type"].startswith("text/plain")
+
+
+@pytest.mark.parametrize("seconds", ["abc", "nan", "inf", "-1", "601"])
+def test_profile_rejects_invalid_durations(server, seconds):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(f"{server}/profile?seconds={seconds}", timeout=5)
+    assert error.value.code == 400
+    assert not get_profiler().running
+
+
+def test_timed_profile_conflicts_with_running_profiler(server):
+    with urllib.request.urlopen(f"{server}/profile", timeout=5):
+        pass
+    try:
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{server}/profile?seconds=0", timeout=5)
+        assert error.value.code == 409
+        assert get_profiler().running
+    finally:
+        get_profiler().stop()
@@ -0,0 +1,82 @@
+# File: tests/test_monitor_thread.py
+from app_logic.monitor import WindowMonitor, WindowTarget
+from app_logic.monitor_thread import MonitorThread
+from app_logic.pipeline import FocusPipeline
+
+TASK = "Writing the quarterly report"
+
+
+class FakeMonitor:
+    format_window_title = staticmethod(WindowMonitor.format_window_title)
+
+    def __init__(self):
+        self.focus("report.docx - Word", "winword.exe", 1)
+
+    def focus(self, title, process_name, handle):
+        self.info = (title, process_name)
+        self.target = WindowTarget(handle, handle * 100)
+
+    def get_active_window_info(self):
+        return self.info
+
+    def get_active_window_target(self):
+        return self.target
+
+
+class FakePoller:
+    max_interval = 2.0
+
+    def tick(self, title):
+        return False, 0.5
+
+
+class FakeBatcher:
+    def __init__(self):
+        self.callbacks = {}
+
+    def submit(self, task, activity, callback, is_current=None, low_priority=False):
+        self.callbacks[activity] = callback
+
+
+class Clock:
+    now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _setup(settings_file):
+    settings_file(banned=[], allowed=[])
+    monitor, batcher, clock, closed = FakeMonitor(), FakeBatcher(), Clock(), []
+    thread = MonitorThread(monitor, None, FakePoller(), close=lambda title, target: closed.append((title, target)))
+    thread.pipeline = FocusPipeline(batcher=batcher, clock=clock, dwell_seconds=1.0,
+                                    on_ai_verdict=thread._handle_ai_verdict)
+    thread.pipeline.start(TASK)
+    # The distracting window is focused and held past the dwell time, so the AI is asked
+    monitor.focus("Funny cats - YouTube - Google Chrome", "chrome", 2)
+    thread._poll()
+    clock.now = 2.0
+    thread._poll()
+    (activity, callback), = batcher.callbacks.items()
+    return monitor, thread, callback, closed
+
+
+def test_late_verdict_closes_the_window_that_was_judged(settings_file):
+    monitor, thread, callback, closed = _setup(settings_file)
+    callback(0)
+    assert closed == [("Funny cats - YouTube - Google Chrome", WindowTarget(2, 200))]
+
+
+def test_late_verdict_never_closes_a_window_focused_since(settings_file):
+    monitor, thread, callback, closed = _setup(settings_file)
+    # Focus moves on before the next poll, so the pipeline still thinks the video is focused
+    monitor.focus("report.docx - Word", "winword.exe", 1)
+    callback(0)
+    assert closed == []
+
+
+def test_late_verdict_never_closes_another_window_with_the_same_title(settings_file):
+    monitor, thread, callback, closed = _setup(settings_file)
+    monitor.focus("Funny cats - YouTube - Google Chrome", "chrome", 3)
+    callback(0)
+    assert closed == []
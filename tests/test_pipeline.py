@@ -0,0 +1,93 @@
+# File: tests/test_pipeline.py
+import pytest
+
+from app_logic import preclassifier
+from app_logic.pipeline import FocusPipeline, SOURCE_AI, SOURCE_BANNED
+from app_logic.preclassifier import LocalClassifier
+
+TASK = "Studying linear algebra"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeBatcher:
+    def __init__(self, clock):
+        self.clock = clock
+        self.asked = []
+
+    def submit(self, task, activity, callback, is_current=None, low_priority=False):
+        self.asked.append((self.clock(), activity))
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def pipeline(settings_file, monkeypatch, clock):
+    settings_file(banned=["reddit"], allowed=[])
+    # An untrained local model never answers
+    monkeypatch.setattr(preclassifier, "_shared_classifier", LocalClassifier(persist=False))
+    pipeline = FocusPipeline(batcher=FakeBatcher(clock), clock=clock)
+    pipeline.configure({"check_dwell_seconds": 1.5, "check_cooldown_seconds": 60})
+    pipeline.start(TASK)
+    return pipeline
+
+
+def _poll(pipeline, clock, title, at):
+    clock.now = at
+    return pipeline.observe(title)
+
+
+def test_ai_is_asked_only_after_the_dwell_time(pipeline, clock):
+    assert _poll(pipeline, clock, "Lecture notes", 0.0) == ("Lecture notes", None, None)
+    assert pipeline.seconds_until_due() == pytest.approx(1.5)
+    assert _poll(pipeline, clock, "Lecture notes", 1.0) is None
+    decision = _poll(pipeline, clock, "Lecture notes", 1.5)
+    assert decision.source == SOURCE_AI
+    assert pipeline.batcher.asked == [(1.5, "Lecture notes")]
+
+
+def test_flicking_past_windows_costs_no_requests(pipeline, clock):
+    for at, title in enumerate(["Lecture notes", "Cat videos", "Chat", "Lecture notes"]):
+        _poll(pipeline, clock, title, at * 0.5)
+    assert pipeline.batcher.asked == []
+    # The dwell time restarts when the window is focused again
+    assert _poll(pipeline, clock, "Lecture notes", 2.9) is None
+    _poll(pipeline, clock, "Lecture notes", 3.0)
+    assert pipeline.batcher.asked == [(3.0, "Lecture notes")]
+
+
+def test_same_activity_is_asked_at_most_once_per_cooldown(pipeline, clock):
+    _poll(pipeline, clock, "Lecture notes", 0.0)
+    _poll(pipeline, clock, "Lecture notes", 1.5)
+    _poll(pipeline, clock, "Chat", 2.0)
+    _poll(pipeline, clock, "Lecture notes", 3.0)
+    # Not due after the dwell time, but once the cooldown since the last request has passed
+    assert pipeline.seconds_until_due() == pytest.approx(58.5)
+    _poll(pipeline, clock, "Lecture notes", 10.0)
+    assert pipeline.batcher.asked == [(1.5, "Lecture notes")]
+    _poll(pipeline, clock, "Lecture notes", 61.5)
+    assert pipeline.batcher.asked == [(1.5, "Lecture notes"), (61.5, "Lecture notes")]
+
+
+def test_list_matches_are_answered_without_dwell(pipeline, clock):
+    decision = _poll(pipeline, clock, "reddit - Google Chrome", 0.0)
+    assert (decision.relevance, decision.source) == (0, SOURCE_BANNED)
+    # Re-evaluated every cooldown while it stays focused
+    assert pipeline.seconds_until_due() == pytest.approx(60)
+    assert pipeline.batcher.asked == []
+
+
+def test_volatile_title_changes_keep_the_dwell_running(pipeline, clock):
+    _poll(pipeline, clock, "Inbox (2) - Mail", 0.0)
+    assert _poll(pipeline, clock, "Inbox (3) - Mail", 1.0) is None
+    _poll(pipeline, clock, "Inbox (3) - Mail", 1.5)
+    assert len(pipeline.batcher.asked) == 1
@@ -0,0 +1,55 @@
+# File: tests/test_preclassifier.py
+import pytest
+
+from app_logic.preclassifier import LocalClassifier
+
+TASK = "Studying linear algebra"
+
+
+def _trained(rounds=20, **kwargs):
+    model = LocalClassifier(persist=False, **kwargs)
+    for i in range(rounds):
+        model.learn(TASK, f"Linear algebra lecture {i} - YouTube", 1)
+        model.learn(TASK, f"Funny cat video {i} - YouTube", 0)
+    return model
+
+
+def test_answers_only_when_confident():
+    model = _trained(threshold=0.8, min_samples=10)
+    assert model.predict(TASK, "Linear algebra lecture 99 - YouTube") == 1
+    assert model.predict(TASK, "Funny cat video 99 - YouTube") == 0
+    # Nothing like it was seen: ask the AI
+    assert model.predict(TASK, "Weather forecast") is None
+    assert model.stats()["local_answers"] == 2
+    assert model.stats()["fallbacks"] == 1
+
+
+def test_falls_back_until_warmed_up():
+    model = _trained(rounds=5, threshold=0.8, min_samples=30)
+    assert model.samples == 10
+    assert model.predict(TASK, "Linear algebra lecture 99 - YouTube") is None
+
+
+def test_threshold_of_one_disables_local_answers():
+    model = _trained(min_samples=10)
+    model.configure({"local_classifier_threshold": 1})
+    assert model.predict(TASK, "Funny cat video 99 - YouTube") is None
+
+
+def test_only_definite_verdicts_are_learned():
+    model = LocalClassifier(persist=False)
+    model.learn(TASK, "Unsure", None)
+    assert model.samples == 0
+
+
+def test_model_survives_a_restart(tmp_path):
+    path = str(tmp_path / "preclassifier.json")
+    model = LocalClassifier(path=path)
+    model.learn(TASK, "Linear algebra lecture - YouTube", 1)
+    model.save()
+
+    reopened = LocalClassifier(path=path)
+    assert reopened.samples == 1
+    # Weights are rounded when saved
+    assert reopened.predict_proba(TASK, "Linear algebra lecture - YouTube") == \
+        pytest.approx(model.predict_proba(TASK, "Linear algebra lecture - YouTube"), abs=1e-4)
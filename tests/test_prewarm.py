@@ -0,0 +1,71 @@
+# File: tests/test_prewarm.py
+from app_logic.pipeline import FocusPipeline
+from app_logic.prewarm import Prewarmer
+
+TASK = "Studying linear algebra"
+
+
+class FakeMonitor:
+    def __init__(self, windows):
+        self.windows = windows
+
+    def list_windows(self):
+        return list(self.windows)
+
+    def add_window_list_listener(self, callback):
+        return False
+
+
+class FakeBatcher:
+    def __init__(self):
+        self.activities = []
+
+    def submit(self, task, activity, callback, is_current=None, low_priority=False):
+        self.activities.append(activity)
+
+
+def _prewarmer(windows, batcher):
+    prewarmer = Prewarmer(FakeMonitor(windows), batcher=batcher)
+    # As start(TASK) sets it, without the background thread
+    prewarmer._task = TASK
+    return prewarmer
+
+
+def test_prewarmed_keys_are_the_keys_the_pipeline_looks_up(settings_file):
+    windows = [
+        ("(2) Cat videos - YouTube - Google Chrome - chrome.exe", "chrome.exe"),
+        ("*notes.txt - Notepad - notepad.exe", "notepad.exe"),
+    ]
+    batcher = FakeBatcher()
+    prewarmer = _prewarmer(windows, batcher)
+    assert prewarmer.prewarm_once() == 2
+
+    pipeline = FocusPipeline(batcher=FakeBatcher(), prewarmer=prewarmer)
+    pipeline.start(TASK)
+    for title, process_name in windows:
+        pipeline.observe(title, now=0.0, process_name=process_name)
+        assert pipeline.current_key in batcher.activities
+
+
+def test_verdicts_cached_before_prewarming_are_not_counted_warm(settings_file):
+    from app_logic.verdict_cache import get_verdict_cache
+    from app_logic.pipeline import activity_key
+    old, new = ("Old tab - Reddit - Google Chrome", "chrome"), ("New tab - YouTube - Google Chrome", "chrome")
+    settings_file(banned=[], allowed=[])
+    # A verdict left by an earlier session
+    get_verdict_cache().put(TASK, activity_key(*old)[0], 0)
+
+    batcher = FakeBatcher()
+    prewarmer = _prewarmer([old, new], batcher)
+    assert prewarmer.prewarm_once() == 1
+    assert batcher.activities == [activity_key(*new)[0]]
+    # Only the prewarmed window's verdict arrives
+    get_verdict_cache().put(TASK, activity_key(*new)[0], 0)
+
+    pipeline = FocusPipeline(batcher=FakeBatcher(), prewarmer=prewarmer)
+    pipeline.start(TASK)
+    pipeline.observe(old[0], now=0.0, process_name=old[1])
+    pipeline.observe(new[0], now=1.0, process_name=new[1])
+    assert prewarmer.stats() == {"submitted": 1, "warm": 1, "cold": 0}
+    # Windows with a verdict are not looked up again
+    assert prewarmer.prewarm_once() == 0
@@ -0,0 +1,115 @@
+# File: tests/test_process_cache.py
+import contextlib
+import os
+
+import psutil
+import pytest
+
+from app_logic import process_cache
+from app_logic.process_cache import ProcessInfoCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeProcesses:
+    """Stands in for psutil.Process over a table of pid -> (create_time, name, ppid)."""
+
+    def __init__(self, table):
+        self.table = table
+        self.inspected = []
+
+    def Process(self, pid):
+        table = self.table
+        inspected = self.inspected
+
+        class Process:
+            def _entry(self):
+                if pid not in table:
+                    raise psutil.NoSuchProcess(pid)
+                return table[pid]
+
+            def create_time(self):
+                return self._entry()[0]
+
+            def name(self):
+                inspected.append(pid)
+                return self._entry()[1]
+
+            def exe(self):
+                return "/usr/bin/" + self._entry()[1]
+
+            def ppid(self):
+                return self._entry()[2]
+
+            def oneshot(self):
+                return contextlib.nullcontext()
+
+        return Process()
+
+    def pid_exists(self, pid):
+        return pid in self.table
+
+
+@pytest.fixture
+def processes(monkeypatch):
+    fake = FakeProcesses({1: (1.0, "init", 0), 100: (10.0, "bash", 1), 200: (20.0, "firefox", 100)})
+    monkeypatch.setattr(process_cache.psutil, "Process", fake.Process)
+    monkeypatch.setattr(process_cache.psutil, "pid_exists", fake.pid_exists)
+    return fake
+
+
+def test_hits_skip_the_os_until_revalidation(processes):
+    clock = FakeClock()
+    cache = ProcessInfoCache(revalidate_seconds=5, clock=clock)
+    info = cache.get(200)
+    assert (info.name, info.exe, info.parents) == ("firefox", "/usr/bin/firefox", ((100, "bash"), (1, "init")))
+
+    processes.table[200] = (20.0, "renamed", 100)
+    assert cache.name(200) == "firefox"
+    clock.now = 5
+    # Same (pid, create_time): still the cached entry after revalidating
+    assert cache.name(200) == "firefox"
+    assert processes.inspected == [200, 100, 1]
+
+
+def test_reused_pid_is_inspected_again(processes):
+    clock = FakeClock()
+    cache = ProcessInfoCache(revalidate_seconds=5, clock=clock)
+    assert cache.name(200) == "firefox"
+
+    processes.table[200] = (30.0, "python", 100)
+    clock.now = 5
+    assert cache.name(200) == "python"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_exited_process_is_evicted(processes):
+    clock = FakeClock()
+    cache = ProcessInfoCache(revalidate_seconds=5, clock=clock)
+    cache.get(200)
+    del processes.table[200]
+    clock.now = 5
+    assert cache.get(200) is None
+    assert cache.stats()["entries"] == 2
+
+
+def test_sweep_drops_exited_processes(processes):
+    clock = FakeClock()
+    cache = ProcessInfoCache(sweep_seconds=60, clock=clock)
+    cache.get(200)
+    del processes.table[200]
+    clock.now = 60
+    cache.get(100)
+    assert cache.stats()["entries"] == 2
+
+
+def test_reads_real_processes():
+    info = ProcessInfoCache().get(os.getpid())
+    assert info.name == psutil.Process().name()
+    assert info.create_time == psutil.Process().create_time()
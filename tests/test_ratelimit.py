@@ -0,0 +1,73 @@
+# File: tests/test_ratelimit.py
+import time
+from email.utils import formatdate
+
+import pytest
+
+from app_logic.ratelimit import Backoff, TokenBucket, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_a_burst_then_refills_at_the_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(requests_per_minute=60, burst=3, clock=clock)
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert bucket.available_at() == pytest.approx(1.0)
+    clock.now = 1.0
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+
+def test_bucket_burst_never_exceeds_the_per_minute_limit():
+    bucket = TokenBucket(requests_per_minute=1, burst=3, clock=FakeClock())
+    assert bucket.capacity == 1
+
+
+def test_refunded_token_can_be_used_again():
+    bucket = TokenBucket(requests_per_minute=60, burst=1, clock=FakeClock())
+    assert bucket.try_acquire()
+    bucket.refund()
+    assert bucket.try_acquire()
+
+
+def test_backoff_grows_exponentially_with_jitter_up_to_the_cap():
+    clock = FakeClock()
+    # Jitter picks from the upper half of each delay; rng=1 gives its maximum
+    backoff = Backoff(base_seconds=1, max_seconds=4, clock=clock, rng=lambda: 1.0)
+    assert [backoff.failure() for _ in range(4)] == [1, 2, 4, 4]
+    low = Backoff(base_seconds=1, max_seconds=4, clock=clock, rng=lambda: 0.0)
+    assert [low.failure() for _ in range(3)] == [0.5, 1, 2]
+
+
+def test_retry_after_replaces_the_computed_delay():
+    clock = FakeClock()
+    backoff = Backoff(base_seconds=1, clock=clock, rng=lambda: 0.5)
+    assert backoff.failure(retry_after=37) == 37.5
+    assert backoff.available_at() == 37.5
+    backoff.success()
+    assert backoff.available_at() == 0.0
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("120", 120.0),
+    ("37s", 37.0),
+    ("1.5s", 1.5),
+    (5, 5.0),
+    (-3, 0.0),
+    (None, None),
+    ("soon", None),
+])
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    assert parse_retry_after(formatdate(time.time() + 60, usegmt=True)) == pytest.approx(60, abs=2)
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
@@ -0,0 +1,55 @@
+# File: tests/test_scheduler.py
+import pytest
+
+from app_logic.scheduler import AdaptivePoller, is_lock_screen
+
+
+def test_backs_off_while_nothing_changes_and_snaps_back():
+    poller = AdaptivePoller(min_interval=0.2, max_interval=2.0, backoff=2.0)
+    delays = [poller.tick("Editor")[1] for _ in range(6)]
+    assert delays == pytest.approx([0.2, 0.4, 0.8, 1.6, 2.0, 2.0])
+    assert poller.tick("Browser") == (False, pytest.approx(0.2))
+
+
+@pytest.mark.parametrize("title", ["Windows Default Lock Screen - LockApp.exe", "xscreensaver", "i3lock"])
+def test_lock_screen_suspends_until_another_window(title):
+    assert is_lock_screen(title)
+    poller = AdaptivePoller(min_interval=0.2, max_interval=2.0)
+    poller.tick("Editor")
+    assert poller.tick(title) == (True, 2.0)
+    assert poller.suspend_reason == "screen locked"
+    # Back at the same window as before the lock: polled fast again
+    assert poller.tick("Editor") == (False, pytest.approx(0.2))
+
+
+def test_idle_user_suspends_and_resumes():
+    idle = [0.0]
+    poller = AdaptivePoller(min_interval=0.2, max_interval=2.0, idle_suspend_seconds=300,
+                            idle_source=lambda: idle[0], idle_check_interval=0)
+    assert poller.tick("Editor") == (False, pytest.approx(0.2))
+    idle[0] = 300
+    assert poller.tick("Editor") == (True, 2.0)
+    assert poller.suspend_reason == "user idle"
+    idle[0] = 1
+    assert poller.tick("Editor") == (False, pytest.approx(0.2))
+
+
+def test_unknown_idle_time_never_suspends():
+    poller = AdaptivePoller(idle_source=lambda: None, idle_check_interval=0)
+    assert poller.tick("Editor")[0] is False
+
+
+def test_idle_source_is_queried_at_most_once_per_interval():
+    calls = []
+    poller = AdaptivePoller(idle_source=lambda: calls.append(1) or 0, idle_check_interval=60)
+    for _ in range(5):
+        poller.tick("Editor")
+    assert len(calls) == 1
+
+
+def test_configure_applies_bounds_from_settings():
+    poller = AdaptivePoller()
+    poller.configure({"poll_interval_min_ms": 500, "poll_interval_max_ms": 100, "idle_suspend_seconds": 0})
+    # The maximum never drops below the minimum
+    assert (poller.min_interval, poller.max_interval) == (0.5, 0.5)
+    assert poller.idle_suspend_seconds == 0
@@ -0,0 +1,96 @@
+# File: tests/test_task_checker.py
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+from app_logic import preclassifier
+from app_logic.preclassifier import LocalClassifier
+
+TASK = "Studying linear algebra"
+
+
+class FakeStream:
+    """A streamed answer: yields chunks and records how many were read."""
+
+    def __init__(self, *chunks):
+        self.chunks = chunks
+        self.read = 0
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+
+class FakeRouter:
+    """Feeds a stream through stop_when the way a streaming backend does."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.requests = []
+
+    def generate_text(self, prompt, system=None, max_output_tokens=None, stop_when=None):
+        self.requests.append({"prompt": prompt, "system": system, "max_output_tokens": max_output_tokens})
+        text = ""
+        for chunk in self.stream:
+            text += chunk
+            if stop_when is not None and stop_when(text):
+                break
+        return text.strip()
+
+
+@pytest.fixture
+def task_checker(settings_file, monkeypatch):
+    # Imported after the config directory is redirected: the module sets up its log file on import
+    from app_logic import task_checker
+    monkeypatch.setattr(preclassifier, "_shared_classifier", LocalClassifier(persist=False))
+    return task_checker
+
+
+def test_verdict_is_used_as_soon_as_it_streams_in(task_checker, monkeypatch):
+    stream = FakeStream(" ", "1", "\n", "because")
+    router = FakeRouter(stream)
+    monkeypatch.setattr(task_checker, "get_router", lambda: router)
+
+    assert task_checker.check_relevance(TASK, "Linear algebra - Wikipedia") == 1
+    assert stream.read == 2
+    request, = router.requests
+    assert request["prompt"] == "Activity: Linear algebra - Wikipedia"
+    assert request["system"].endswith(f"Task: {TASK}")
+    assert request["max_output_tokens"] == 1
+
+    # Cached now: no second request
+    assert task_checker.check_relevance(TASK, "Linear algebra - Wikipedia") == 1
+    assert len(router.requests) == 1
+
+
+def test_unparseable_answer_is_not_cached(task_checker, monkeypatch):
+    router = FakeRouter(FakeStream("maybe"))
+    monkeypatch.setattr(task_checker, "get_router", lambda: router)
+
+    assert task_checker.check_relevance(TASK, "Cat videos") is None
+    assert task_checker.check_relevance(TASK, "Cat videos") is None
+    assert len(router.requests) == 2
+
+
+def test_gemini_client_stops_reading_the_stream(task_checker, monkeypatch):
+    class Chunk:
+        def __init__(self, text):
+            self.text = text
+
+    stream = FakeStream(Chunk("0"), Chunk(" and more"))
+    calls = []
+
+    class FakeModel:
+        def generate_content(self, prompt, **kwargs):
+            calls.append(kwargs)
+            return stream
+
+    client = task_checker.GeminiClient()
+    monkeypatch.setattr(client, "get_model", lambda system_instruction=None: FakeModel())
+    text = client.generate_text("Activity: Cat videos", timeout=5, max_output_tokens=1,
+                                stop_when=task_checker._has_verdict)
+    assert text == "0"
+    assert stream.read == 1
+    assert calls == [{"generation_config": {"max_output_tokens": 1}, "request_options": {"timeout": 5},
+                      "stream": True}]
@@ -0,0 +1,83 @@
+# File: tests/test_timeline.py
+import sqlite3
+import time
+
+import pytest
+
+from app_logic.timeline import TimelineStore, report
+
+TASK = "Studying linear algebra"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "timeline.db")
+
+
+def _rows(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT task, title, verdict, source, start, end FROM sessions ORDER BY start").fetchall()
+    finally:
+        conn.close()
+
+
+def test_sessions_are_written_on_close(db_path):
+    # Long flush interval: nothing reaches disk before close()
+    store = TimelineStore(db_path=db_path, flush_seconds=60)
+    store.switch(TASK, "Editor", verdict=1, source="allowed", now=100)
+    store.switch(TASK, "Cat videos", now=130)
+    store.set_verdict("Cat videos", 0, "ai")
+    # A verdict for a window that is no longer open changes nothing
+    store.set_verdict("Editor", 0, "ai")
+    store.close(now=150)
+
+    assert _rows(db_path) == [
+        (TASK, "Editor", 1, "allowed", 100, 130),
+        (TASK, "Cat videos", 0, "ai", 130, 150),
+    ]
+    assert store.sessions_written == 2
+
+
+def test_full_batches_are_written_without_waiting_for_the_flush(db_path):
+    store = TimelineStore(db_path=db_path, flush_seconds=60, batch_size=2)
+    for i in range(3):
+        store.switch(TASK, f"Window {i}", now=100 + i)
+    deadline = time.monotonic() + 5
+    while store.sessions_written < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store.sessions_written == 2
+    store.close(now=110)
+    assert len(_rows(db_path)) == 3
+
+
+def test_zero_length_sessions_are_not_recorded(db_path):
+    store = TimelineStore(db_path=db_path)
+    store.switch(TASK, "Flicker", now=100)
+    store.switch(TASK, "Editor", now=100)
+    store.close(now=110)
+    assert [row[1] for row in _rows(db_path)] == ["Editor"]
+
+
+def test_report_totals_time_per_task(db_path):
+    store = TimelineStore(db_path=db_path, flush_seconds=60)
+    store.switch(TASK, "Editor", verdict=1, now=1000)
+    store.switch(TASK, "Cat videos", verdict=0, now=1300)
+    store.switch(TASK, "New window", now=1400)
+    store.switch("Writing a report", "Word", verdict=1, now=1500)
+    store.close(now=2100)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = report(conn)
+        recent = report(conn, since=1450)
+    finally:
+        conn.close()
+
+    assert [(row["task"], row["focused_seconds"], row["distracted_seconds"], row["unchecked_seconds"],
+             row["sessions"]) for row in rows] == [
+        (TASK, 300, 100, 100, 3),
+        ("Writing a report", 600, 0, 0, 1),
+    ]
+    assert rows[0]["focus_rate"] == pytest.approx(0.75)
+    assert [row["task"] for row in recent] == ["Writing a report"]
@@ -0,0 +1,78 @@
+# File: tests/test_verdict_cache.py
+import pytest
+
+from app_logic import verdict_cache
+from app_logic.verdict_cache import VerdictCache
+
+TASK = "Studying linear algebra"
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(verdict_cache.time, "time", clock.time)
+    return clock
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = VerdictCache(db_path=str(tmp_path / "verdicts.db"), max_entries=2)
+    cache.put(TASK, "a", 1)
+    cache.put(TASK, "b", 0)
+    cache.get(TASK, "a")
+    cache.put(TASK, "c", 1)
+
+    assert set(cache._memory) == {verdict_cache.make_key(TASK, "a"), verdict_cache.make_key(TASK, "c")}
+    # The evicted verdict is still answered from disk
+    assert cache.get(TASK, "b") == 0
+    assert cache.stats()["disk_hits"] == 1
+    cache.close()
+
+
+def test_verdicts_expire_after_ttl(tmp_path, clock):
+    cache = VerdictCache(db_path=str(tmp_path / "verdicts.db"), ttl_seconds=60)
+    cache.put(TASK, "a", 1)
+    clock.now += 59
+    assert cache.get(TASK, "a") == 1
+    clock.now += 1
+    assert cache.get(TASK, "a") is None
+    assert cache.stats()["misses"] == 1
+    cache.close()
+
+
+def test_verdicts_survive_a_restart(tmp_path):
+    path = str(tmp_path / "verdicts.db")
+    cache = VerdictCache(db_path=path)
+    cache.put(TASK, "Linear  Algebra - Wikipedia", 1)
+    cache.put(TASK, "Cat videos", 0)
+    cache.put(TASK, "Unsure", None)
+    cache.close()
+
+    reopened = VerdictCache(db_path=path)
+    # Keys are normalized for whitespace and case
+    assert reopened.get(TASK.upper(), "linear algebra - wikipedia") == 1
+    assert reopened.get(TASK, "Cat videos") == 0
+    assert reopened.get(TASK, "Unsure") is None
+    assert reopened.stats()["disk_hits"] == 2
+    reopened.close()
+
+
+def test_invalidate_task_drops_both_tiers(tmp_path):
+    path = str(tmp_path / "verdicts.db")
+    cache = VerdictCache(db_path=path)
+    cache.put(TASK, "a", 1)
+    cache.put("Writing a report", "a", 0)
+    cache.invalidate_task(TASK)
+    cache.close()
+
+    reopened = VerdictCache(db_path=path)
+    assert reopened.get(TASK, "a") is None
+    assert reopened.get("Writing a report", "a") == 0
+    reopened.close()